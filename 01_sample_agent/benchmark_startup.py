@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# modules that must stay out of the import path of the CLI and quick estimates
+HEAVY_MODULES = ['boto3', 'botocore', 'strands', 'mcp', 'google.genai', 'pydantic', 'bedrock_agentcore']
+
+# runs in a fresh interpreter so every sample pays the full import cost
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from cost_estimator_agent.cost_estimator_agent import AWSCostEstimatorAgent
+imported = time.perf_counter()
+agent = AWSCostEstimatorAgent(use_result_cache=False)
+result = agent.estimate_costs(sys.argv[1])
+finished = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "first_estimate_seconds": finished - start,
+    "heavy_modules": [name for name in sys.argv[2:] if name in sys.modules],
+    "result_length": len(result),
+}))
+"""
+
+
+def measure_startup(architecture: str) -> dict:
+    # the key is resolved lazily, so startup must not depend on it being set
+    env = {key: value for key, value in os.environ.items() if key != 'GEMINI_API_KEY'}
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', PROBE, architecture, *HEAVY_MODULES],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    sample['process_seconds'] = time.perf_counter() - start
+    return sample
+
+
+def test_startup(architecture: str, runs: int, max_import_seconds: float, max_first_estimate_seconds: float, verbose: bool=True) -> bool:
+    if verbose:
+        print('⏱️Testing estimator startup')
+
+    try:
+        samples = [measure_startup(architecture) for _ in range(runs)]
+    except subprocess.CalledProcessError as e:
+        if verbose:
+            print(f"✖️ Test failed: {e.stderr[-500:]}")
+        return False
+
+    import_seconds = sorted(sample['import_seconds'] for sample in samples)[len(samples) // 2]
+    first_estimate_seconds = sorted(sample['first_estimate_seconds'] for sample in samples)[len(samples) // 2]
+    heavy_modules = sorted({name for sample in samples for name in sample['heavy_modules']})
+
+    if verbose:
+        print(f"📊Median import time: {import_seconds * 1000:.1f} ms (limit {max_import_seconds * 1000:.0f} ms)")
+        print(f"📊Median time to first quick estimate: {first_estimate_seconds * 1000:.1f} ms (limit {max_first_estimate_seconds * 1000:.0f} ms)")
+        print(f"📊Median process wall time: {sorted(s['process_seconds'] for s in samples)[len(samples) // 2] * 1000:.1f} ms")
+        if heavy_modules:
+            print(f"✖️ Heavy modules imported eagerly: {', '.join(heavy_modules)}")
+
+    return (
+        not heavy_modules
+        and import_seconds <= max_import_seconds
+        and first_estimate_seconds <= max_first_estimate_seconds
+        and all(sample['result_length'] > 0 for sample in samples)
+    )
+
+
+def parse_argument():
+    parser = argparse.ArgumentParser(description="Sample Agent: Measure estimator startup time")
+
+    parser.add_argument(
+        '--architecture',
+        type=str,
+        default="[quick] One EC2 t3.micro instance running 8 hours per day",
+        help='Architecture estimated right after import; [quick] keeps the model out of the measurement'
+    )
+
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters to measure (default: 5)')
+    parser.add_argument('--max-import-seconds', type=float, default=0.3, help='Allowed median import time (default: 0.3)')
+    parser.add_argument(
+        '--max-first-estimate-seconds',
+        type=float,
+        default=0.5,
+        help='Allowed median time from interpreter start to the first quick estimate (default: 0.5)'
+    )
+
+    parser.add_argument('--quiet', action='store_true', help='Disable verbose output')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_argument()
+    passed = test_startup(
+        args.architecture,
+        args.runs,
+        args.max_import_seconds,
+        args.max_first_estimate_seconds,
+        verbose=not args.quiet
+    )
+    print(f"  Startup: {'✅ PASS' if passed else '✖️ FAIL'}")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,44 @@
+"""
+In-process calculation backend for benchmarks
+
+Runs the generated calculation code with `exec` in the benchmark process,
+optionally after a fixed delay that stands in for the interpreter round trip.
+It is not isolated in any way and must only run scripted, trusted code.
+"""
+
+import contextlib
+import io
+import time
+import traceback
+
+from cost_estimator_agent.calculation_backend import CalculationBackend
+
+
+class StubCalculationBackend(CalculationBackend):
+    name = "stub"
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.running = False
+
+    def start(self) -> None:
+        self.running = True
+
+    def stop(self) -> None:
+        self.running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self.running
+
+    def execute(self, code: str) -> str:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                exec(compile(code, "<calculation>", "exec"), {})
+        except Exception:
+            output.write(traceback.format_exc(limit=-1))
+        return output.getvalue()
@@ -0,0 +1,81 @@
+"""
+Stdio MCP pricing server backed by fixture data
+
+Serves the same tool names and result shapes as the AWS Pricing MCP server
+(and the offline price index) from a JSON file, so benchmarks can start a
+real MCP subprocess without network access or AWS credentials.
+
+Usage:
+    $ python benchmarks/fixture_pricing_server.py benchmarks/fixtures/pricing.json
+"""
+
+import json
+import sys
+from typing import Any, Optional
+
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("fixture-aws-pricing", log_level="ERROR")
+products: list[dict[str, Any]] = []
+
+
+@mcp.tool()
+def get_pricing_service_codes() -> str:
+    """Get all AWS service codes available in the fixture data."""
+    return json.dumps(sorted({product["serviceCode"] for product in products}))
+
+
+@mcp.tool()
+def get_pricing_service_attributes(service_code: str) -> str:
+    """Get filterable attributes for a specific service code.
+
+    Args:
+        service_code: AWS service code, e.g. AmazonEC2
+    """
+    return json.dumps(sorted({
+        name
+        for product in products if product["serviceCode"] == service_code
+        for name in product["attributes"]
+    }))
+
+
+@mcp.tool()
+def get_pricing_attribute_values(service_code: str, attribute_names: list[str]) -> str:
+    """Get possible values for the given attributes of a service.
+
+    Args:
+        service_code: AWS service code, e.g. AmazonEC2
+        attribute_names: attribute names, e.g. ["instanceType", "operatingSystem"]
+    """
+    return json.dumps({
+        name: sorted({
+            product["attributes"][name]
+            for product in products
+            if product["serviceCode"] == service_code and name in product["attributes"]
+        })
+        for name in attribute_names
+    })
+
+
+@mcp.tool()
+def get_pricing(service_code: str, region: str, filters: Optional[list[dict[str, str]]] = None) -> str:
+    """Get pricing data for a service in a region with optional attribute filters.
+
+    Args:
+        service_code: AWS service code, e.g. AmazonEC2
+        region: AWS region code, e.g. us-east-1
+        filters: list of {"Field": attribute name, "Value": attribute value, "Type": "TERM_MATCH"}
+    """
+    return json.dumps([
+        {key: product[key] for key in ("sku", "productFamily", "attributes", "prices")}
+        for product in products
+        if product["serviceCode"] == service_code
+        and product["region"] == region
+        and all(product["attributes"].get(f["Field"]) == f["Value"] for f in filters or [])
+    ])
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as f:
+        products.extend(json.load(f)["products"])
+    mcp.run()
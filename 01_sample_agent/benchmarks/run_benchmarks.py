@@ -0,0 +1,255 @@
+"""
+Offline benchmarks for AWSCostEstimatorAgent
+
+Runs the estimator end to end with local stand-ins for every remote
+dependency: a ScriptedModel instead of Gemini, the fixture MCP pricing server
+instead of the AWS Pricing MCP server, and a StubCalculationBackend instead
+of the code interpreter. Measures cold and warm latency, throughput at
+several concurrency levels, memory and per-phase time, and compares the
+results against stored baselines.
+
+The baselines are absolute timings of the machine that wrote them, so they
+only mean something on that machine: run with --update-baseline once on a
+clean checkout before comparing a change against it.
+
+Usage:
+    $ python -m benchmarks.run_benchmarks
+    $ python -m benchmarks.run_benchmarks --update-baseline
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.calculation_stub import StubCalculationBackend
+from benchmarks.scripted_model import ScriptedModel
+from cost_estimator_agent.cost_estimator_agent import AWSCostEstimatorAgent
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS_PATH = os.path.join(BENCHMARK_DIR, "fixtures", "scenarios.json")
+PRICING_FIXTURE_PATH = os.path.join(BENCHMARK_DIR, "fixtures", "pricing.json")
+PRICING_SERVER_PATH = os.path.join(BENCHMARK_DIR, "fixture_pricing_server.py")
+BASELINES_PATH = os.path.join(BENCHMARK_DIR, "baselines.json")
+
+logger = logging.getLogger(__name__)
+
+
+class BenchmarkEstimator(AWSCostEstimatorAgent):
+    """The estimator wired to the local stand-ins; keeps every finished trace."""
+
+    def __init__(self, model: ScriptedModel, calculation_latency: float):
+        super().__init__(
+            use_pricing_cache=False,
+            use_result_cache=False,
+            pricing_source="mcp",
+            calculation_backend=StubCalculationBackend(calculation_latency),
+            trace_path=None,
+            # the scenario scripts replay conversations recorded without a pricing plan
+            use_pricing_planner=False
+        )
+        self.benchmark_model = model
+        self.traces = []
+
+    def _create_model(self) -> ScriptedModel:
+        return self.benchmark_model
+
+    def _pricing_server_command(self) -> tuple[str, list[str]]:
+        return sys.executable, [PRICING_SERVER_PATH, PRICING_FIXTURE_PATH]
+
+    def _get_aws_credentials(self) -> dict:
+        return {"AWS_REGION": self.region}
+
+    def _resolve_aws_identity(self) -> dict:
+        return {}
+
+    def _finish_trace(self, trace, status: str) -> None:
+        super()._finish_trace(trace, status)
+        self.traces.append(trace)
+
+
+def load_scenarios() -> list[dict]:
+    with open(SCENARIOS_PATH) as f:
+        return json.load(f)["scenarios"]
+
+
+def architecture(scenario: dict) -> str:
+    return f"[scenario:{scenario['name']}] {scenario['architecture']}"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def check_result(result: str) -> None:
+    if "Total" not in result:
+        raise RuntimeError(f"estimate did not finish: {result[:200]}")
+
+
+def measure_latency(estimator: BenchmarkEstimator, scenarios: list[dict], runs: int, prefix: str) -> dict:
+    metrics = {}
+    for scenario in scenarios:
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            check_result(estimator.estimate_costs(architecture(scenario)))
+            latencies.append(time.perf_counter() - start)
+        metrics[f"{prefix}.{scenario['name']}.p50_seconds"] = statistics.median(latencies)
+        metrics[f"{prefix}.{scenario['name']}.p95_seconds"] = percentile(latencies, 0.95)
+    return metrics
+
+
+def measure_throughput(estimator: BenchmarkEstimator, scenarios: list[dict], concurrency: int, estimates: int) -> float:
+    items = [{"architecture": architecture(scenarios[i % len(scenarios)])} for i in range(estimates)]
+
+    async def run() -> None:
+        async for result in estimator.estimate_costs_batch(items, concurrency):
+            if result["status"] != "success":
+                raise RuntimeError(result["result"])
+            check_result(result["result"])
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return estimates / (time.perf_counter() - start)
+
+
+def phase_metrics(traces: list) -> dict:
+    """Mean seconds per estimate spent in each phase, and the time not attributed to any of them.
+
+    Tool calls of one turn overlap, so with parallel tool calls the phases can add up to more
+    than the total and the unattributed time becomes negative.
+    """
+    metrics = {}
+    summaries = [trace.phase_summary() for trace in traces]
+    for phase in summaries[0]:
+        metrics[f"phase.{phase}_seconds"] = statistics.mean(summary[phase]["seconds"] for summary in summaries)
+    metrics["phase.unattributed_seconds"] = statistics.mean(
+        trace.total_seconds - sum(phase["seconds"] for phase in summary.values())
+        for trace, summary in zip(traces, summaries)
+    )
+    return metrics
+
+
+def run_benchmarks(args) -> dict:
+    scenarios = load_scenarios()
+    model = ScriptedModel(
+        {scenario["name"]: scenario["script"] for scenario in scenarios},
+        time_to_first_token=args.model_latency,
+    )
+    estimator = BenchmarkEstimator(model, args.calculation_latency)
+    metrics = {}
+
+    logger.info("⏱️ Measuring cold estimates")
+    metrics.update(measure_latency(estimator, scenarios, args.cold_runs, "cold"))
+
+    with estimator:
+        estimator.traces.clear()
+        logger.info("⏱️ Measuring warm estimates")
+        metrics.update(measure_latency(estimator, scenarios, args.runs, "warm"))
+        metrics.update(phase_metrics(estimator.traces))
+
+        for concurrency in args.concurrency:
+            logger.info(f"⏱️ Measuring throughput at concurrency {concurrency}")
+            metrics[f"throughput.concurrency_{concurrency}.estimates_per_second"] = measure_throughput(
+                estimator, scenarios, concurrency, concurrency * args.runs
+            )
+
+        tracemalloc.start()
+        measure_throughput(estimator, scenarios, max(args.concurrency), max(args.concurrency) * args.runs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    metrics["memory.traced_peak_mb"] = peak / (1024 * 1024)
+    # ru_maxrss is in KiB on Linux
+    metrics["memory.max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {name: round(value, 6) for name, value in metrics.items()}
+
+
+def higher_is_better(name: str) -> bool:
+    return name.endswith("_per_second")
+
+
+def compare(metrics: dict, baselines: dict, tolerance: float) -> list[str]:
+    """Names of the metrics that are worse than their baseline by more than the tolerance."""
+    regressions = []
+    for name, baseline in baselines.items():
+        value = metrics.get(name)
+        if value is None or name.startswith("phase."):
+            continue
+        if higher_is_better(name):
+            regressed = value < baseline * (1 - tolerance)
+        else:
+            regressed = value > baseline * (1 + tolerance)
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def print_report(metrics: dict, baselines: dict, regressions: list[str]) -> None:
+    print(f"\n{'metric':<50} {'value':>12} {'baseline':>12} {'change':>8}")
+    for name, value in metrics.items():
+        baseline = baselines.get(name)
+        change = f"{(value - baseline) / baseline * 100:+.0f}%" if baseline else ""
+        marker = " ✖️" if name in regressions else ""
+        print(f"{name:<50} {value:>12.4f} {baseline if baseline is not None else '':>12} {change:>8}{marker}")
+
+
+def parse_argument():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the AWS cost estimator")
+    parser.add_argument('--runs', type=int, default=5, help='Warm estimates per scenario and per concurrency level (default: 5)')
+    parser.add_argument('--cold-runs', type=int, default=2, help='Cold estimates per scenario (default: 2)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8], help='Concurrency levels (default: 1 4 8)')
+    parser.add_argument('--model-latency', type=float, default=0.0, help='Simulated time to first token in seconds (default: 0)')
+    parser.add_argument('--calculation-latency', type=float, default=0.0, help='Simulated interpreter latency in seconds (default: 0)')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed relative regression against the baseline (default: 0.5)')
+    parser.add_argument('--baseline', default=BASELINES_PATH, help='Baseline file')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--output', help='Write the measured metrics to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Show estimator logs')
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_argument()
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    # the estimator prints its tool list for every estimate
+    with contextlib.redirect_stdout(io.StringIO() if not args.verbose else sys.stdout):
+        metrics = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(metrics, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(metrics, f, indent=2)
+            f.write("\n")
+        print(f"📝 Baseline written to {args.baseline}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    regressions = compare(metrics, baselines, args.tolerance)
+    print_report(metrics, baselines, regressions)
+    if regressions:
+        print(f"\n✖️ {len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+        print(f"Baselines from another machine are not comparable, regenerate {args.baseline} with --update-baseline")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
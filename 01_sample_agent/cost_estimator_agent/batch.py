@@ -0,0 +1,89 @@
+"""
+Batch cost estimation CLI
+
+Reads architectures from a JSONL file and estimates them concurrently over one
+warm estimator session, appending each result to an output JSONL file as soon
+as it is ready.
+
+Each input line is either a JSON object with an `architecture` key (any other
+keys such as `id` are copied to the output) or a plain JSON string. Lines that
+are neither are reported as failed results with their line number.
+
+Usage:
+    $ python -m cost_estimator_agent.batch architectures.jsonl --output results.jsonl --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from typing import Generator
+
+from cost_estimator_agent.cost_estimator_agent import AWSCostEstimatorAgent
+from cost_estimator_agent.config import BATCH_MAX_CONCURRENCY, DEFAULT_REGION
+
+logger = logging.getLogger(__name__)
+
+
+def read_architectures(path: str) -> Generator[dict, None, None]:
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"id": line_number, "line": line_number, "error": f"Line {line_number} is not valid JSON: {e}"}
+                continue
+
+            if isinstance(item, str):
+                item = {"architecture": item}
+            if not isinstance(item, dict) or not isinstance(item.get("architecture"), str):
+                yield {
+                    "id": line_number,
+                    "line": line_number,
+                    "error": f"Line {line_number} is neither a string nor an object with an architecture"
+                }
+                continue
+            item.setdefault("id", line_number)
+            yield item
+
+
+async def run_batch(input_path: str, output_path: str, region: str, max_concurrency: int) -> dict:
+    agent = AWSCostEstimatorAgent(region=region)
+    summary = {"success": 0, "error": 0}
+
+    with open(output_path, "a") as output:
+        async for result in agent.estimate_costs_batch(read_architectures(input_path), max_concurrency):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            summary[result["status"]] += 1
+            logger.info(f"📝 {result['id']}: {result['status']} in {result['elapsed_seconds']}s")
+
+    return summary
+
+
+def parse_argument():
+    parser = argparse.ArgumentParser(description="Estimate AWS costs for every architecture in a JSONL file")
+    parser.add_argument('input', help='Input JSONL file')
+    parser.add_argument('--output', default='results.jsonl', help='Output JSONL file, appended to (default: results.jsonl)')
+    parser.add_argument('--region', default=DEFAULT_REGION, help=f'AWS region (default: {DEFAULT_REGION})')
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=BATCH_MAX_CONCURRENCY,
+        help=f'Maximum number of concurrent estimates (default: {BATCH_MAX_CONCURRENCY})'
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_argument()
+    summary = asyncio.run(run_batch(args.input, args.output, args.region, args.concurrency))
+    print(f"📈 Batch finished: {summary['success']} succeeded, {summary['error']} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+On-disk key/value cache used by the estimator
+
+Values are stored as JSON in a small SQLite database so that they survive
+between processes. Entries expire after a TTL and the store is bounded by
+evicting the least recently used entries.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """A TTL + LRU bounded JSON cache backed by SQLite."""
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = os.path.expanduser(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._evict(now)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Remove a single entry, or every entry when no key is given."""
+        with self._lock, self._connection:
+            if key is None:
+                self._connection.execute("DELETE FROM cache")
+            else:
+                self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _evict(self, now: float) -> None:
+        expired = self._connection.execute(
+            "DELETE FROM cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        overflow = max(count - self.max_entries, 0)
+        if overflow:
+            self._connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+        if expired or overflow:
+            self.evictions += expired + overflow
+            logger.debug(f"evicted {expired} expired and {overflow} least recently used entries from {self.path}")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            (size,) = self._connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,331 @@
+"""
+Calculation backends for execute_cost_calculation
+
+- CodeInterpreterBackend runs code in a remote AgentCore Code Interpreter session.
+- LocalCalculationBackend runs code in a pool of pre-forked local worker processes
+  with a memory limit and a per-calculation timeout. A worker that does not
+  stop at its timeout is replaced on its own, the calculations running on the
+  other workers are not affected.
+
+The local workers are NOT a security boundary. They run as the estimator's own
+user with its file system and network access; the trimmed builtins and the
+import allowlist only keep honest calculation code on the intended modules and
+are trivially bypassed (e.g. through `object.__subclasses__()`). Use the remote
+backend for code that is not trusted.
+"""
+
+import builtins
+import contextlib
+import io
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import traceback
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+from cost_estimator_agent.config import (
+    CODE_INTERPRETER_SESSION_TIMEOUT,
+    SESSION_HEALTH_CHECK_INTERVAL,
+    LOCAL_CALCULATION_WORKERS,
+    LOCAL_CALCULATION_TIMEOUT,
+    LOCAL_CALCULATION_MEMORY_MB,
+    LOCAL_CALCULATION_MODULES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CalculationBackend(ABC):
+    """Runs the Python code generated for execute_cost_calculation and returns its output."""
+
+    name: str
+
+    @abstractmethod
+    def start(self) -> None:
+        ...
+
+    @abstractmethod
+    def stop(self) -> None:
+        ...
+
+    @property
+    @abstractmethod
+    def is_running(self) -> bool:
+        ...
+
+    @abstractmethod
+    def execute(self, code: str) -> str:
+        ...
+
+    def is_healthy(self) -> bool:
+        """Cheap liveness probe used by warm sessions."""
+        if not self.is_running:
+            return False
+        try:
+            self.execute("pass")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name} calculation backend health check failed: {e}")
+            return False
+
+    def is_expiring(self) -> bool:
+        """Whether the backend should be recycled before its next use."""
+        return False
+
+    def isolated(self, code: str) -> str:
+        """`code` as it has to be executed to run in a namespace of its own."""
+        return code
+
+
+class CodeInterpreterBackend(CalculationBackend):
+    name = "remote"
+
+    def __init__(self, region: str):
+        self.region = region
+        self.code_interpreter = None
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        from bedrock_agentcore.tools.code_interpreter_client import CodeInterpreter
+
+        logger.info("Setting up AgentCore code interpreter")
+        self.code_interpreter = CodeInterpreter(self.region)
+        self.code_interpreter.start(session_timeout_seconds=CODE_INTERPRETER_SESSION_TIMEOUT)
+        self._started_at = time.monotonic()
+        logger.info("👍 AgentCore Codeintepreter session started")
+
+    def stop(self) -> None:
+        if not self.code_interpreter:
+            return
+        try:
+            self.code_interpreter.stop()
+            logger.info("✅ Code interpreter session stopped")
+        finally:
+            self.code_interpreter = None
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.code_interpreter and self.code_interpreter.session_id)
+
+    def is_expiring(self) -> bool:
+        # recycle the interpreter before AgentCore expires the session under a running estimate
+        age = time.monotonic() - self._started_at
+        return age > CODE_INTERPRETER_SESSION_TIMEOUT - SESSION_HEALTH_CHECK_INTERVAL
+
+    def isolated(self, code: str) -> str:
+        # the interpreter keeps one namespace for its whole session, which concurrent estimates share
+        return f"exec(compile({code!r}, '<calculation>', 'exec'), {{}})"
+
+    def execute(self, code: str) -> str:
+        response = self.code_interpreter.invoke("executeCode", {
+            "language": "python",
+            "code": code
+        })
+
+        results = []
+        for event in response.get("stream", []):
+            if "result" in event:
+                result = event["result"]
+                if "content" in result:
+                    for content_item in result["content"]:
+                        if content_item.get("type") == "text":
+                            results.append(content_item["text"])
+
+        return "\n".join(results)
+
+
+# Worker process state, populated by _init_worker in every pool process
+_worker_globals: dict = {}
+
+
+def _allowlisted_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if name.split(".")[0] not in LOCAL_CALCULATION_MODULES:
+        raise ImportError(f"import of '{name}' is not allowed in cost calculations")
+    return __import__(name, globals, locals, fromlist, level)
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    import resource
+
+    # guards against accidental file and interpreter access only, see the module docstring
+    calculation_builtins = {
+        name: getattr(builtins, name)
+        for name in dir(builtins)
+        if name not in ("open", "exec", "eval", "compile", "input", "breakpoint", "exit", "quit", "help")
+    }
+    calculation_builtins["__import__"] = _allowlisted_import
+    _worker_globals["__builtins__"] = calculation_builtins
+
+    # pre-import the arithmetic helpers so calculations do not pay for it
+    for module_name in LOCAL_CALCULATION_MODULES:
+        _worker_globals[module_name] = __import__(module_name)
+
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("calculation timed out")
+
+
+def _run_calculation(code: str, timeout: float) -> str:
+    output = io.StringIO()
+    namespace = dict(_worker_globals)
+
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(compile(code, "<calculation>", "exec"), namespace)
+    except BaseException:
+        output.write(traceback.format_exc(limit=-1))
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return output.getvalue()
+
+
+def _worker_main(connection, memory_limit_mb: int) -> None:
+    _init_worker(memory_limit_mb)
+    connection.send("ready")
+    while True:
+        try:
+            code, timeout = connection.recv()
+        except EOFError:
+            return
+        connection.send(_run_calculation(code, timeout))
+
+
+class _CalculationWorker:
+    """One worker process and the pipe its calculations are sent over."""
+
+    def __init__(self, context, memory_limit_mb: int):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def wait_ready(self) -> None:
+        try:
+            self.connection.recv()
+        except EOFError:
+            raise Exception(f"calculation worker exited during startup with code {self.process.exitcode}")
+
+    def run(self, code: str, timeout: float) -> Optional[str]:
+        """Output of the code, None when the worker did not answer within the grace period."""
+        self.connection.send((code, timeout))
+        # the worker interrupts itself on timeout; the grace period covers code that ignores the signal
+        if not self.connection.poll(timeout + 5):
+            return None
+        return self.connection.recv()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.connection.close()
+
+
+class LocalCalculationBackend(CalculationBackend):
+    name = "local"
+
+    def __init__(
+        self,
+        workers: int = LOCAL_CALCULATION_WORKERS,
+        timeout: float = LOCAL_CALCULATION_TIMEOUT,
+        memory_limit_mb: int = LOCAL_CALCULATION_MEMORY_MB
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.context = None
+        # workers waiting for a calculation; None while the pool is stopped
+        self.idle_workers: Optional[queue.Queue] = None
+        self.all_workers: set[_CalculationWorker] = set()
+        self._lock = threading.Lock()
+
+    def _spawn_worker(self) -> _CalculationWorker:
+        worker = _CalculationWorker(self.context, self.memory_limit_mb)
+        with self._lock:
+            self.all_workers.add(worker)
+        return worker
+
+    def _discard_worker(self, worker: _CalculationWorker) -> None:
+        with self._lock:
+            self.all_workers.discard(worker)
+        worker.kill()
+
+    def start(self) -> None:
+        logger.info(f"Setting up local calculation pool with {self.workers} workers")
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        idle_workers = queue.Queue()
+        # fork the workers now instead of on the first calculation
+        workers = [self._spawn_worker() for _ in range(self.workers)]
+        try:
+            for worker in workers:
+                worker.wait_ready()
+                idle_workers.put(worker)
+        except Exception as e:
+            logger.exception(f"✖️ Failed to start local calculation pool: {e}")
+            self.stop()
+            raise e
+        self.idle_workers = idle_workers
+        logger.info("👍 Local calculation pool started")
+
+    def stop(self) -> None:
+        self.idle_workers = None
+        with self._lock:
+            workers, self.all_workers = self.all_workers, set()
+        if not workers:
+            return
+        for worker in workers:
+            worker.kill()
+        logger.info("✅ Local calculation pool stopped")
+
+    @property
+    def is_running(self) -> bool:
+        return self.idle_workers is not None
+
+    def execute(self, code: str) -> str:
+        idle_workers = self.idle_workers
+        if idle_workers is None:
+            return "✖️ Local calculation pool is not running"
+
+        worker = idle_workers.get()
+        try:
+            output = worker.run(code, self.timeout)
+            error = f"TimeoutError: calculation did not finish within {self.timeout} seconds"
+        except (EOFError, OSError):
+            output = None
+            error = "✖️ Calculation worker exited unexpectedly"
+
+        if output is None:
+            # only this worker is replaced, calculations on the other workers keep running
+            self._discard_worker(worker)
+            if idle_workers is not self.idle_workers:
+                return error
+            logger.warning(f"⚠️ Replacing local calculation worker: {error}")
+            try:
+                worker = self._spawn_worker()
+                worker.wait_ready()
+            except Exception as e:
+                logger.exception(f"✖️ Failed to replace local calculation worker: {e}")
+                self._discard_worker(worker)
+                return error
+            output = error
+        idle_workers.put(worker)
+        return output
+
+
+def create_calculation_backend(backend: Union[str, CalculationBackend], region: str) -> CalculationBackend:
+    if isinstance(backend, CalculationBackend):
+        return backend
+    if backend == "remote":
+        return CodeInterpreterBackend(region)
+    if backend == "local":
+        return LocalCalculationBackend()
+    raise ValueError(f"Unknown calculation backend: {backend}")
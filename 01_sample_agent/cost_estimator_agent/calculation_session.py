@@ -0,0 +1,110 @@
+"""
+Per-estimate state of execute_cost_calculation
+
+Each execute_cost_calculation call used to start from an empty namespace, so
+the model embedded the unit prices it had fetched as literals again and
+recomputed results of earlier calls. A CalculationSession belongs to one
+estimate and keeps:
+    - `pricing`, a table of line items that is pushed once, by the pricing
+      planner or with the `pricing_table` argument of the tool
+    - the JSON-serializable variables left behind by earlier calls
+Both are prepended to the code of every call together with the
+`monthly_costs` helper, and the variables are read back from its output.
+The state travels with the code, so it works on every calculation backend,
+including pools whose calls land on different workers.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Optional
+
+from cost_estimator_agent.calculation_backend import CalculationBackend
+from cost_estimator_agent.config import CALCULATION_STATE_MAX_CHARS
+
+logger = logging.getLogger(__name__)
+
+STATE_MARKER = "__calculation_state__ "
+
+# quantity x unit price x usage of every line item in one call
+HELPER_SOURCE = '''
+def monthly_costs(rows=None):
+    """Set `monthly_cost` on every row (default: the `pricing` table), print them and return the total."""
+    rows = pricing if rows is None else rows
+    total = 0.0
+    for row in rows:
+        row["monthly_cost"] = round(row["quantity"] * row["unit_price"] * row.get("usage", 1), 2)
+        total += row["monthly_cost"]
+        print(f"{row['service']} | {row.get('configuration', '')} | ${row['unit_price']:g} per {row.get('unit', '')} | ${row['monthly_cost']:.2f}")
+    print(f"Total | | | ${total:.2f}")
+    return round(total, 2)
+'''
+
+STATE_EPILOGUE = f'''
+def _plain(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(type(value).__name__)
+
+_state = {{}}
+for _name, _value in list(globals().items()):
+    if _name.startswith("_"):
+        continue
+    try:
+        _encoded = _json.dumps(_value, default=_plain)
+    except (TypeError, ValueError):
+        continue
+    # the pricing table is always kept, monthly_costs() reads it
+    if _name == "pricing" or len(_encoded) <= {CALCULATION_STATE_MAX_CHARS}:
+        _state[_name] = _json.loads(_encoded)
+print()
+print({STATE_MARKER!r} + _json.dumps(_state))
+'''
+
+
+class CalculationSession:
+    """Variables and pricing table of one estimate, kept between its calculation calls."""
+
+    def __init__(self, backend: CalculationBackend):
+        self.backend = backend
+        self.state: dict[str, Any] = {"pricing": []}
+        # calls of one estimate build on each other's variables, so they run one at a time
+        self._lock = threading.Lock()
+
+    def load_pricing(self, rows: list[dict]) -> None:
+        """Add line items to the `pricing` table, replacing rows of the same service and configuration."""
+        with self._lock:
+            keys = {(row.get("service"), row.get("configuration")) for row in rows}
+            self.state["pricing"] = [
+                row for row in self.state.get("pricing", [])
+                if (row.get("service"), row.get("configuration")) not in keys
+            ] + [dict(row) for row in rows]
+
+    def program(self, code: str) -> str:
+        prelude = "\n".join([
+            "import json as _json",
+            HELPER_SOURCE,
+            f"globals().update(_json.loads({json.dumps(self.state)!r}))",
+            "",
+        ])
+        return self.backend.isolated(prelude + code + "\n" + STATE_EPILOGUE)
+
+    def _absorb(self, output: str) -> str:
+        """Output of the code without the state line; the state is only kept when the code ran to the end."""
+        text, marker, encoded = output.rpartition(STATE_MARKER)
+        if not marker:
+            return output
+        try:
+            state = json.loads(encoded.strip())
+            # code that rebinds `pricing` to something that cannot be carried over keeps the previous table
+            state.setdefault("pricing", self.state.get("pricing", []))
+            self.state = state
+        except ValueError as e:
+            logger.warning(f"⚠️ Calculation state could not be read back: {e}")
+        return text.rstrip("\n")
+
+    def execute(self, code: str, pricing_table: Optional[list[dict]] = None) -> str:
+        if pricing_table:
+            self.load_pricing(pricing_table)
+        with self._lock:
+            return self._absorb(self.backend.execute(self.program(code)))
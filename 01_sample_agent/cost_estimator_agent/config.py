@@ -39,6 +39,12 @@ WORKFLOW - IMPORTANT:
   - get_pricing_attribute_values for each attribute to get possible values
   - get_pricing for each service code with all attributes and values to get actual pricing data
 - THEN: Pass the pricing data to execute_cost_calculation for mathematical operations
+  - Pass the prices once as `pricing_table` rows (service, configuration, quantity, unit_price, unit, usage), then use the `pricing` variable
+  - `monthly_costs()` computes quantity x unit_price x usage (hours per month, 1 for GB-month) for every row and returns the total
+  - Variables stay defined for the next execute_cost_calculation call of the same estimate; do not recompute earlier results
+- Call tools that do not depend on each other (e.g. get_pricing for different services) together in a single turn; they run in parallel
+- If the request contains a PRICING PLAN, skip the discovery steps for the planned services: use its looked-up prices as they are,
+  call get_pricing with the given arguments for the remaining entries in one turn, then go on to execute_cost_calculation
 
 NEVER DO:
 - Search for extra pricing data for not listed services in the FIRST step
@@ -56,13 +62,36 @@ Please analyze this architecture and provide an AWS cost estimate:
 {architecture_description}
 """
 
+# Appended to the estimation prompt by the pricing planner
+PRICING_PLAN_PROMPT = """
+PRICING PLAN for {region} (service codes and filters resolved from a local catalog):
+{planned_calls}
+{uncovered}"""
+
+# Appended after the pricing plan when its looked-up line items were loaded into the calculation session
+PRICING_TABLE_PROMPT = """- The looked-up line items are preloaded as the `pricing` table of execute_cost_calculation:
+  `print(monthly_costs())` prices all of them in one call.
+"""
+
 # Model configuration
 #DEFAULT_MODEL = "us.anthropic.claude-3-7-sonnet-20250219-v1:0" 
 #DEFAULT_MODEL = "amazon.nova-micro-v1:0"
 #DEFAULT_MODEL = "anthropic.claude-3-5-sonnet-20240620-v1:0"
 DEFAULT_MODEL = "gemini-2.0-flash"
+# Keep SYSTEM_PROMPT and the tool declarations in Gemini cached content; prefixes below the
+# model's minimum cacheable size are detected on the first request and sent inline instead
+GEMINI_CACHE_PREFIX = True
+GEMINI_CACHE_TTL_SECONDS = 60 * 60
 
-GEMINI_API_KEY = os.environ['GEMINI_API_KEY']
+def get_gemini_api_key() -> str:
+    return os.environ['GEMINI_API_KEY']
+
+
+def __getattr__(name: str):
+    # resolved on access, so importing the config (--help, quick estimates, tests) does not need the key
+    if name == 'GEMINI_API_KEY':
+        return get_gemini_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # AWS regions
 DEFAULT_REGION = "us-east-1"
@@ -70,5 +99,134 @@ DEFAULT_REGION = "us-east-1"
 # AWS regions
 DEFAULT_PROFILE = "default"
 
+# Warm session configuration
+# Seconds between health checks of a warm session's code interpreter and MCP client
+SESSION_HEALTH_CHECK_INTERVAL = 60
+# Lifetime of a code interpreter session; warm sessions are recycled shortly before it expires
+CODE_INTERPRETER_SESSION_TIMEOUT = 900
+
+# AWS Pricing MCP server, started over stdio
+PRICING_MCP_COMMAND = "uvx"
+PRICING_MCP_ARGS = ["awslabs.aws-pricing-mcp-server@latest"]
+
+# Shared pricing MCP daemon
+# Streamable HTTP URL of a running `cost_estimator_agent.pricing_daemon`; when set, every estimator
+# in the process shares one connection to it instead of starting its own MCP server
+PRICING_DAEMON_URL = os.environ.get("COST_ESTIMATOR_PRICING_DAEMON_URL")
+PRICING_DAEMON_HOST = "127.0.0.1"
+PRICING_DAEMON_PORT = 8765
+PRICING_DAEMON_START_TIMEOUT = 120
+
+# Pricing tool result cache
+PRICING_CACHE_PATH = "~/.cache/aws_cost_estimator/pricing_cache.sqlite3"
+PRICING_CACHE_TTL_SECONDS = 24 * 60 * 60
+PRICING_CACHE_MAX_ENTRIES = 2000
+PRICING_CACHE_TOOLS = (
+    "get_pricing_service_codes",
+    "get_pricing_service_attributes",
+    "get_pricing_attribute_values",
+    "get_pricing",
+)
+
+# Pricing tool result shaping
+# Attributes kept from price-list records; everything else is dropped before the model sees it
+PRICING_RESULT_ATTRIBUTES = (
+    "instanceType", "operatingSystem", "tenancy", "preInstalledSw", "licenseModel", "capacitystatus",
+    "vcpu", "memory", "storage", "regionCode", "location", "usagetype",
+    "volumeApiName", "volumeType", "storageClass", "databaseEngine", "deploymentOption", "cacheEngine",
+)
+PRICING_RESULT_TERM_TYPES = ("OnDemand",)
+PRICING_RESULT_MAX_PRODUCTS = 20
+PRICING_RESULT_MAX_VALUES = 50
+
+# Conversation management
+# Consumed pricing results are digested, oldest first, while a request is estimated above this many tokens
+CONVERSATION_TOKEN_BUDGET = 6000
+# Tool results that always stay in full
+CONVERSATION_KEEP_FULL_TOOLS = ("execute_cost_calculation",)
+CONVERSATION_CHARS_PER_TOKEN = 4
+
+# Offline price index
+# "mcp": AWS Pricing MCP server, "local": offline price index, "auto": price index with MCP fallback
+DEFAULT_PRICING_SOURCE = "mcp"
+PRICE_INDEX_PATH = "~/.cache/aws_cost_estimator/price_index.sqlite3"
+PRICE_INDEX_MAX_AGE_DAYS = 30
+PRICE_INDEX_MMAP_SIZE = 1024 * 1024 * 1024
+PRICE_INDEX_MAX_RESULTS = 100
+PRICE_LIST_OFFER_URL = "https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/{service_code}/current/{region}/index.json"
+
+# Batch estimation
+BATCH_MAX_CONCURRENCY = 4
+
+# Maximum number of tool calls from one model turn that run at the same time
+MAX_PARALLEL_TOOL_CALLS = 4
+
+# Calculation backend for execute_cost_calculation
+# "remote": AgentCore Code Interpreter, "local": pool of local worker processes; the local workers
+# limit memory and time but are not a security boundary, only use them for trusted code
+DEFAULT_CALCULATION_BACKEND = "remote"
+LOCAL_CALCULATION_WORKERS = 2
+LOCAL_CALCULATION_TIMEOUT = 10
+LOCAL_CALCULATION_MEMORY_MB = 1024
+# standard library only: every module listed here is pre-imported and must be installed
+LOCAL_CALCULATION_MODULES = (
+    "math",
+    "statistics",
+    "decimal",
+    "fractions",
+    "json",
+    "datetime",
+    "itertools",
+    "functools",
+    "collections",
+)
+# Variables of an estimate's calculations that are carried over to its next calculation,
+# larger values are dropped, except for the pricing table
+CALCULATION_STATE_MAX_CHARS = 20000
+
+# Quick estimates
+QUICK_OPTION = "[quick]"
+HOURS_PER_MONTH = 730
+
+# Multi-region comparison
+# Price lookups of a region comparison that run at the same time
+REGION_COMPARISON_MAX_CONCURRENCY = 8
+
+# Pricing pre-resolution planner
+# Map the architecture to get_pricing calls and look their prices up before the agent loop starts
+USE_PRICING_PLANNER = True
+PRICING_PLANNER_MAX_CONCURRENCY = 8
+
+# Whole-estimate result cache
+RESULT_CACHE_PATH = "~/.cache/aws_cost_estimator/result_cache.sqlite3"
+RESULT_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+RESULT_CACHE_MAX_ENTRIES = 500
+
+# Startup
+# Upper bound on how long resolved AWS credentials and caller identities are reused
+CREDENTIAL_CACHE_SECONDS = 15 * 60
+
+# Instrumentation
+# JSON lines file every finished estimate trace is appended to, unset to disable
+TRACE_EXPORT_PATH = os.environ.get("COST_ESTIMATOR_TRACE_PATH")
+
+# Record and replay
+# JSON lines file every model stream, pricing tool call and calculation is appended to, unset to disable
+RECORD_PATH = os.environ.get("COST_ESTIMATOR_RECORD_PATH")
+# Recording to answer from instead of the model API, the pricing server and the calculation backend
+REPLAY_PATH = os.environ.get("COST_ESTIMATOR_REPLAY_PATH")
+# Wait for the recorded durations while replaying, to reproduce end-to-end latencies
+REPLAY_REALTIME = os.environ.get("COST_ESTIMATOR_REPLAY_REALTIME") == "1"
+
+# Estimation server
+# Warm estimator sessions kept by the server, each serves one request at a time
+SERVER_POOL_SIZE = 4
+# Requests that may wait for a free estimator before new ones are rejected with 503
+SERVER_MAX_QUEUE = 16
+# Deadline of one request, including the time spent waiting for an estimator
+SERVER_REQUEST_TIMEOUT_SECONDS = 300
+SERVER_RETRY_AFTER_SECONDS = 5
+SERVER_PORT = 8080
+
 # Logging configuration
 LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
@@ -0,0 +1,125 @@
+"""
+Tool-result-aware conversation management
+
+An estimate is a loop of pricing lookups followed by calculations, and the
+whole history is re-sent to the model on every turn. Once the model has
+answered after a pricing result, the result has been consumed: its prices
+are either in a later calculation or no longer needed verbatim. Those
+results are replaced with short digests whenever the conversation exceeds
+its token budget, oldest first. Calculation outputs and the results the
+model has not seen yet are always kept in full.
+
+strands only calls `apply_management` at the end of an invocation, so the
+manager also registers itself as a hook and compacts before every model call.
+"""
+
+import json
+import logging
+from typing import Any, Optional
+
+from strands.agent.conversation_manager import ConversationManager, SlidingWindowConversationManager
+from strands.experimental.hooks.events import BeforeModelInvocationEvent
+from strands.hooks import HookRegistry
+from strands.types.content import Messages
+
+from cost_estimator_agent.config import (
+    CONVERSATION_TOKEN_BUDGET,
+    CONVERSATION_KEEP_FULL_TOOLS,
+    CONVERSATION_CHARS_PER_TOKEN,
+)
+from cost_estimator_agent.result_shaping import digest_payload
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PREFIX = "[digest of an earlier result]"
+
+
+def estimate_tokens(messages: Messages) -> int:
+    return len(json.dumps(messages, ensure_ascii=False, default=str)) // CONVERSATION_CHARS_PER_TOKEN
+
+
+def _digest_content(tool_name: str, content: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    digests = []
+    for block in content:
+        if "json" in block:
+            payload = block["json"]
+        else:
+            try:
+                payload = json.loads(block.get("text", ""))
+            except ValueError:
+                payload = block.get("text", "")
+        if isinstance(payload, str):
+            digests.append(payload if len(payload) <= 200 else f"{payload[:200]}... ({len(payload)} characters)")
+        else:
+            digests.append(digest_payload(tool_name, payload))
+    return [{"text": f"{DIGEST_PREFIX}\n" + "\n".join(map(str, digests))}]
+
+
+class ToolResultConversationManager(ConversationManager):
+    """Digest consumed pricing tool results to keep each request under a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = CONVERSATION_TOKEN_BUDGET,
+        keep_full_tools: tuple[str, ...] = CONVERSATION_KEEP_FULL_TOOLS
+    ):
+        self.token_budget = token_budget
+        self.keep_full_tools = keep_full_tools
+        self.digested_count = 0
+        # last resort when digests alone do not fit the model's context window
+        self.fallback = SlidingWindowConversationManager()
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any) -> None:
+        registry.add_callback(BeforeModelInvocationEvent, lambda event: self.apply_management(event.agent))
+
+    def _consumed_tool_results(self, messages: Messages) -> list[tuple[str, dict[str, Any]]]:
+        """(tool name, toolResult) of results the model has already answered to, oldest first."""
+        tool_names: dict[str, str] = {}
+        results = []
+        last_assistant = max((i for i, message in enumerate(messages) if message["role"] == "assistant"), default=-1)
+
+        for index, message in enumerate(messages):
+            for content in message["content"]:
+                if "toolUse" in content:
+                    tool_names[content["toolUse"]["toolUseId"]] = content["toolUse"]["name"]
+                elif "toolResult" in content and index < last_assistant:
+                    tool_result = content["toolResult"]
+                    name = tool_names.get(tool_result["toolUseId"], "")
+                    if name in self.keep_full_tools:
+                        continue
+                    if any(block.get("text", "").startswith(DIGEST_PREFIX) for block in tool_result["content"]):
+                        continue
+                    results.append((name, tool_result))
+        return results
+
+    def _digest(self, messages: Messages, token_budget: Optional[int]) -> int:
+        digested = 0
+        tokens = estimate_tokens(messages)
+        for name, tool_result in self._consumed_tool_results(messages):
+            if token_budget is not None and tokens <= token_budget:
+                break
+            digest = _digest_content(name, tool_result["content"])
+            saved = estimate_tokens(tool_result["content"]) - estimate_tokens(digest)
+            # small results are already as short as their digest
+            if saved <= 0:
+                continue
+            tokens -= saved
+            tool_result["content"] = digest
+            digested += 1
+        self.digested_count += digested
+        return digested
+
+    def apply_management(self, agent: Any, **kwargs: Any) -> None:
+        before = estimate_tokens(agent.messages)
+        if before <= self.token_budget:
+            return
+
+        digested = self._digest(agent.messages, self.token_budget)
+        if digested:
+            logger.info(f"🗜️ Digested {digested} tool results: ~{before} → ~{estimate_tokens(agent.messages)} tokens")
+
+    def reduce_context(self, agent: Any, e: Optional[Exception] = None, **kwargs: Any) -> None:
+        if self._digest(agent.messages, token_budget=None):
+            logger.info("🗜️ Digested all consumed tool results after a context overflow")
+            return
+        self.fallback.reduce_context(agent, e, **kwargs)
@@ -1,24 +1,62 @@
+import asyncio
 import logging
+import threading
+import time
 import traceback
-import boto3
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
-from contextlib import contextmanager
-from typing import Generator, AsyncGenerator
-from strands import Agent, tool
-from strands.models import BedrockModel
-from strands.tools.mcp import MCPClient
-from strands.handlers.callback_handler import null_callback_handler
-from mcp import stdio_client, StdioServerParameters
-from bedrock_agentcore.tools.code_interpreter_client import CodeInterpreter
-from models.gemini import GeminiModel
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Generator, AsyncGenerator, Iterable, Optional, Union
+from cost_estimator_agent.cache_store import DiskCache
+from cost_estimator_agent.calculation_backend import CalculationBackend, create_calculation_backend
+from cost_estimator_agent.calculation_session import CalculationSession
+from cost_estimator_agent.quick_estimate import parse_line_items, quick_estimate
+from cost_estimator_agent.result_cache import EstimateResultCache
+from cost_estimator_agent.startup import StartupOrchestrator, CredentialCache
+from cost_estimator_agent.instrumentation import EstimateTrace, MetricsCollector
+from cost_estimator_agent.result_shaping import SHAPERS
+
+# strands, mcp, google-genai and boto3 take about a second to import, so they are imported
+# on first use; quick estimates and --help never load them
+if TYPE_CHECKING:
+    from strands import Agent
+    from strands.models.model import Model
+    from strands.tools.mcp import MCPClient
+    from models.gemini import GeminiModel
+    from cost_estimator_agent.price_index import PriceIndex
+    from cost_estimator_agent.incremental_estimate import ItemizedEstimate
+    from cost_estimator_agent.recording import Recording, SessionRecorder
 
 from cost_estimator_agent.config import(
     SYSTEM_PROMPT,
     COST_ESTIMATION_PROMPT,
+    PRICING_TABLE_PROMPT,
     DEFAULT_MODEL,
+    GEMINI_CACHE_PREFIX,
+    GEMINI_CACHE_TTL_SECONDS,
     DEFAULT_REGION,
     LOG_FORMAT,
-    GEMINI_API_KEY
+    get_gemini_api_key,
+    SESSION_HEALTH_CHECK_INTERVAL,
+    PRICING_CACHE_PATH,
+    PRICING_CACHE_TTL_SECONDS,
+    PRICING_CACHE_MAX_ENTRIES,
+    PRICING_CACHE_TOOLS,
+    DEFAULT_PRICING_SOURCE,
+    BATCH_MAX_CONCURRENCY,
+    MAX_PARALLEL_TOOL_CALLS,
+    DEFAULT_CALCULATION_BACKEND,
+    QUICK_OPTION,
+    TRACE_EXPORT_PATH,
+    PRICING_MCP_COMMAND,
+    PRICING_MCP_ARGS,
+    PRICING_DAEMON_URL,
+    USE_PRICING_PLANNER,
+    RECORD_PATH,
+    REPLAY_PATH,
+    REPLAY_REALTIME,
+    CREDENTIAL_CACHE_SECONDS
 )
 
 logging.basicConfig(
@@ -30,53 +68,142 @@ logging.basicConfig(
 logging.getLogger('strands').setLevel(logging.ERROR)
 logger = logging.getLogger(__name__)
 
+
+def _parse_line_item(line: str) -> Optional[list[str]]:
+    """Cells of a markdown cost table row, e.g. `| EC2 | t3.micro | $0.0104 | $2.50 |`."""
+    line = line.strip()
+    if not (line.startswith("|") and line.endswith("|") and "$" in line):
+        return None
+
+    cells = [cell.strip() for cell in line.strip("|").split("|")]
+    if len(cells) < 2 or all(set(cell) <= set("-: ") for cell in cells):
+        return None
+    return cells
+
 class AWSCostEstimatorAgent:
-    def __init__(self, region:str=DEFAULT_REGION):
+    """Estimate AWS costs for an architecture description.
+
+    By default every `estimate_costs` call bootstraps and tears down its own calculation backend,
+    pricing MCP server and model client. Use the agent as a context manager (or call
+    `start_session`/`stop_session`) to keep those components warm and reuse them across estimates;
+    concurrent estimates without a warm session share one session that the last of them stops;
+    each estimate still gets a fresh `Agent` with its own conversation history.
+
+    With `record_path`, every model stream, pricing tool call and calculation is appended to a
+    recording; with `replay_path`, a recording answers them instead of the live services.
+    """
+
+    def __init__(
+        self,
+        region:str=DEFAULT_REGION,
+        use_pricing_cache: bool=True,
+        use_result_cache: bool=True,
+        shape_pricing_results: bool=True,
+        pricing_source: str=DEFAULT_PRICING_SOURCE,
+        max_parallel_tool_calls: int=MAX_PARALLEL_TOOL_CALLS,
+        calculation_backend: Union[str, CalculationBackend]=DEFAULT_CALCULATION_BACKEND,
+        trace_path: Optional[str]=TRACE_EXPORT_PATH,
+        pricing_daemon_url: Optional[str]=PRICING_DAEMON_URL,
+        use_pricing_planner: bool=USE_PRICING_PLANNER,
+        record_path: Optional[str]=RECORD_PATH,
+        replay_path: Optional[str]=REPLAY_PATH
+    ):
         self.region = region
-        self.code_interpreter = None
+        self.recorder: Optional["SessionRecorder"] = None
+        self.replay: Optional["Recording"] = None
+        if replay_path:
+            from cost_estimator_agent.recording import Recording, ReplayCalculationBackend
+
+            self.replay = Recording(replay_path, realtime=REPLAY_REALTIME)
+            calculation_backend = ReplayCalculationBackend(self.replay)
+        self.calculation_backend = create_calculation_backend(calculation_backend, region)
+        if record_path:
+            from cost_estimator_agent.recording import RecordingCalculationBackend, SessionRecorder
+
+            self.recorder = SessionRecorder(record_path)
+            self.calculation_backend = RecordingCalculationBackend(self.calculation_backend, self.recorder)
+        if self.recorder or self.replay:
+            # every request has to reach the recording, a cache hit would leave it out
+            use_pricing_cache = use_result_cache = False
+        self.max_parallel_tool_calls = max_parallel_tool_calls
+        self.pricing_source = pricing_source
+        self.price_index = None
+        self.pricing_cache = DiskCache(
+            PRICING_CACHE_PATH,
+            ttl_seconds=PRICING_CACHE_TTL_SECONDS,
+            max_entries=PRICING_CACHE_MAX_ENTRIES
+        ) if use_pricing_cache else None
+        self.result_cache = EstimateResultCache() if use_result_cache else None
+        self.shape_pricing_results = shape_pricing_results
+        self.aws_pricing_client = None
+        self.pricing_daemon_url = pricing_daemon_url
+        self.use_pricing_planner = use_pricing_planner
+        self.pricing_tools = []
+        self.model = None
+        self.startup_timings = {}
+        self.trace_path = trace_path
+        self.metrics = MetricsCollector()
+        self.last_trace: Optional[EstimateTrace] = None
+        self.session_active = False
+        self._last_health_check = 0.0
+        # when the AWS credentials handed to the session's MCP server stop being valid
+        self._credentials_expire_at: Optional[float] = None
+        # estimates currently using the session's components; a restart or stop waits until there are none
+        self._session_condition = threading.Condition()
+        self._active_estimates = 0
+        # set for sessions that estimates started on demand, and by stop_session while estimates run
+        self._stop_when_idle = False
+        # one calculation session per agent, i.e. per estimate, dropped together with the agent
+        self._calculation_sessions: "weakref.WeakKeyDictionary[Agent, CalculationSession]" = weakref.WeakKeyDictionary()
+        self._calculation_sessions_lock = threading.Lock()
         logger.info(f"Initializing AWS Cost Estimation Agent in region: {region}")
 
-    def _setup_code_interpreter(self) -> None:
+    def __enter__(self) -> "AWSCostEstimatorAgent":
+        self.start_session()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop_session()
+
+    async def __aenter__(self) -> "AWSCostEstimatorAgent":
+        await self.start_session_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop_session_async()
+
+    def _setup_calculation_backend(self) -> None:
         try:
-            logger.info("Setting up AgentCore code interpreter")
-            self.code_interpreter = CodeInterpreter(self.region)
-            self.code_interpreter.start()
-            logger.info("👍 AgentCore Codeintepreter session started")
+            self.calculation_backend.start()
         except Exception as e:
-            logger.exception(f"✖️ Failed to setup code interpreter: {e}")
+            logger.exception(f"✖️ Failed to setup {self.calculation_backend.name} calculation backend: {e}")
             raise e
 
     def _get_aws_credentials(self) -> dict:
         try:
             logger.info("💪 Getting current AWS credentials")
-            session = boto3.Session()
-            credentials = session.get_credentials()
-
-            if credentials is None:
-                raise Exception("✖️ No AWS credentials found")
+            # frozen credentials are handed to the MCP server process, reuse them until they expire
+            return CredentialCache.credentials(self.region)
+        except Exception as e:
+            logger.exception(f"❌ Failed to get AWS credentials: {e}")
+            raise
 
-            sts_client = boto3.client('sts', region_name=self.region)
-            identity = sts_client.get_caller_identity()
+    def _resolve_aws_identity(self) -> dict:
+        try:
+            identity = CredentialCache.identity(self.region)
             logger.info(f"💁‍♂️ Using AWS identity: {identity.get('Arn', 'Unknown')}")
-
-            # ❓ what is frozen_credentials?
-            frozen_credentials = credentials.get_frozen_credentials()
-            credential_dict = {
-                "AWS_ACCESS_KEY_ID": frozen_credentials.access_key,
-                "AWS_SECRET_ACCESS_KEY": frozen_credentials.secret_key,
-                "AWS_REGION": self.region
-            }
-
-            # ❓ this dict will not be used
-            if frozen_credentials.token:
-                credential_dict["AWS_SESSION_TOKEN"] = frozen_credentials.token
-
-            return credential_dict
+            return identity
         except Exception as e:
-            logger.exception(f"❌ Failed to get AWS credentials: {e}")
+            logger.exception(f"❌ Failed to resolve AWS identity: {e}")
             raise
 
-    def _setup_aws_pricing_client(self) -> MCPClient:
+    def _pricing_server_command(self) -> tuple[str, list[str]]:
+        return PRICING_MCP_COMMAND, PRICING_MCP_ARGS
+
+    def _setup_aws_pricing_client(self) -> "MCPClient":
+        from mcp import stdio_client, StdioServerParameters
+        from strands.tools.mcp import MCPClient
+
         try:
             logger.info("🤖 Setting up AWS Pricing MCP Client...")
             aws_credentials = self._get_aws_credentials()
@@ -86,10 +213,11 @@ class AWSCostEstimatorAgent:
                 **aws_credentials
             }
 
+            command, args = self._pricing_server_command()
             aws_pricing_client = MCPClient(
                 lambda: stdio_client(StdioServerParameters(
-                    command = "uvx",
-                    args=["awslabs.aws-pricing-mcp-server@latest"],
+                    command=command,
+                    args=args,
                     env=environemnt_variables
                 ))
             )
@@ -99,30 +227,65 @@ class AWSCostEstimatorAgent:
             logger.info(f"✖️ Failed to setup AWS Pricinig MCP Client: {e}")
             raise e
 
-    @tool
-    def execute_cost_calculation(self, calculation_code: str, description: str="") -> str:
-        if not self.code_interpreter:
-            return "✖️ Code interpreter not initialized"
+    def _open_price_index(self) -> Optional["PriceIndex"]:
+        from cost_estimator_agent.price_index import PriceIndex
+
+        if self.pricing_source != "mcp" and self.price_index is None:
+            self.price_index = PriceIndex.open_if_fresh()
+        return self.price_index
+
+    def _setup_local_pricing_tools(self) -> Optional[list]:
+        """Pricing tools backed by the offline price index, or None to use the MCP server."""
+        if self.pricing_source == "mcp":
+            return None
+
+        if self._open_price_index() is None:
+            if self.pricing_source == "local":
+                raise Exception("✖️ Local price index is missing or stale")
+            logger.info("↩️ Falling back to AWS Pricing MCP server")
+            return None
+
+        from cost_estimator_agent.price_index import LocalPricingTools
+
+        logger.info("🗂️ Using local price index for pricing lookups")
+        return self._wrap_pricing_tools(LocalPricingTools(self.price_index).tools(), use_cache=False)
+
+    def _calculation_session(self, agent: "Agent") -> CalculationSession:
+        with self._calculation_sessions_lock:
+            if agent not in self._calculation_sessions:
+                self._calculation_sessions[agent] = CalculationSession(self.calculation_backend)
+            return self._calculation_sessions[agent]
+
+    def execute_cost_calculation(
+        self,
+        calculation_code: str,
+        description: str="",
+        pricing_table: Optional[list[dict]]=None,
+        # the invoking Agent, injected by strands; not annotated, strands resolves the annotations at runtime
+        agent=None
+    ) -> str:
+        """Run Python code that calculates costs and return what it prints.
+
+        Variables stay defined for the next call. The `pricing` list holds the line items passed as
+        `pricing_table`, and `monthly_costs(rows=pricing)` prices all of them and returns the total.
+
+        Args:
+            calculation_code: Python code that prints its results
+            description: What the calculation is for
+            pricing_table: Line items to add to `pricing`, each with service, configuration, quantity,
+                unit_price, unit and usage (hours per month, 1 for GB-month)
+        """
+        if not self.calculation_backend.is_running:
+            return "✖️ Calculation backend not initialized"
         
         try:
             logger.info(f"🌟 Executing calculation: {description}")
             logger.info(f"Code to execute: \n{calculation_code}")
 
-            response = self.code_interpreter.invoke("executeCode", {
-                "language": "python",
-                "code": calculation_code
-            })
-
-            results = []
-            for event in response.get("stream", []):
-                if "result" in event:
-                    result = event["result"]
-                    if "content" in result:
-                        for content_item in result["content"]:
-                            if content_item.get("type") == "text":
-                                results.append(content_item["text"])
-
-            result_text = "\n".join(results)
+            if agent is not None:
+                result_text = self._calculation_session(agent).execute(calculation_code, pricing_table)
+            else:
+                result_text = self.calculation_backend.execute(calculation_code)
             logger.info(f"✅ Calculation completed successfully: {result_text}")
 
             return result_text
@@ -130,87 +293,779 @@ class AWSCostEstimatorAgent:
         except Exception as e:
             logger.exception(f"❌ Calculation failed: {e}")
 
+    def _create_model(self) -> "GeminiModel":
+        from models.gemini import GeminiModel
+
+        # this bedrock model tried to suit nova model, but it did not work.
+        # model = BedrockModel(
+        #     model_id = DEFAULT_MODEL,
+        #     region_name = self.region,
+        #     temprature=0.0, # this is recommended by [aws guide](https://docs.aws.amazon.com/nova/latest/userguide/prompting-tool-troubleshooting.html)
+        #     streaming=False,
+        #     max_tokens=3000, # this is recommended by [aws guide](https://docs.aws.amazon.com/nova/latest/userguide/prompting-tool-troubleshooting.html)
+        #     top_p=1.0 # this is recommended by [aws guide](https://docs.aws.amazon.com/nova/latest/userguide/prompting-tool-troubleshooting.html)
+        # )
+        return GeminiModel(
+            {
+                'api_key': get_gemini_api_key()
+            },
+            model_id=DEFAULT_MODEL,
+            cache_prefix=GEMINI_CACHE_PREFIX,
+            cache_ttl_seconds=GEMINI_CACHE_TTL_SECONDS
+        )
+
+    def _create_session_model(self) -> "Model":
+        if self.replay:
+            from models.recording import ReplayModel
+
+            return ReplayModel(self.replay)
+        if self.recorder:
+            from models.recording import RecordingModel
+
+            return RecordingModel(self._create_model(), self.recorder)
+        return self._create_model()
+
+    def _wrap_pricing_tools(self, pricing_tools: list, use_cache: bool=True) -> list:
+        from cost_estimator_agent.recording import RecordingTool
+        from cost_estimator_agent.tool_wrappers import CachedPricingTool, ShapedPricingTool
+
+        wrapped_tools = []
+        for pricing_tool in pricing_tools:
+            # the raw results are recorded, replaying them still goes through the cache and shaping
+            if self.recorder:
+                pricing_tool = RecordingTool(pricing_tool, self.recorder)
+            # raw results are cached and shaped on the way out, so changing the shaping needs no cache flush
+            if use_cache and self.pricing_cache and pricing_tool.tool_name in PRICING_CACHE_TOOLS:
+                pricing_tool = CachedPricingTool(pricing_tool, self.pricing_cache, self.region)
+            if self.shape_pricing_results and pricing_tool.tool_name in SHAPERS:
+                pricing_tool = ShapedPricingTool(pricing_tool)
+            wrapped_tools.append(pricing_tool)
+        return wrapped_tools
+
+    def pricing_cache_stats(self) -> dict:
+        """Hit/miss counters of the pricing tool result cache."""
+        return self.pricing_cache.stats() if self.pricing_cache else {}
+
+    def _create_agent(
+        self,
+        model: "GeminiModel",
+        pricing_tools: list,
+        callback_handler=None,
+        trace: Optional[EstimateTrace]=None
+    ) -> "Agent":
+        from strands import Agent, tool
+        from models.instrumented import InstrumentedModel
+        from cost_estimator_agent.conversation_manager import ToolResultConversationManager
+        from cost_estimator_agent.tool_wrappers import instrument_tools, limit_concurrency
+
+        all_tools = [tool(self.execute_cost_calculation)] + pricing_tools
+        if trace:
+            model = InstrumentedModel(model, trace)
+            all_tools = instrument_tools(all_tools, trace, "execute_cost_calculation")
+
+        # the semaphore binds to the event loop of the agent's invocation, so build it per agent
+        all_tools = limit_concurrency(all_tools, self.max_parallel_tool_calls)
+
+        pprint(f"🔨 All tools: {all_tools}")
+
+        conversation_manager = ToolResultConversationManager()
+        return Agent(
+            model=model,
+            tools=all_tools,
+            system_prompt=SYSTEM_PROMPT,
+            conversation_manager=conversation_manager,
+            hooks=[conversation_manager],
+            **({'callback_handler': callback_handler} if callback_handler else {})
+        )
+
+    def _open_pricing_tools(self) -> tuple[list, Optional["MCPClient"]]:
+        """Pricing tools and the MCP client started for them, if any; the caller has to stop the client."""
+        if self.replay:
+            logger.info(f"📼 Replaying pricing tools from {self.replay.path}")
+            return self._wrap_pricing_tools(self.replay.pricing_tools()), None
+
+        pricing_tools = self._setup_local_pricing_tools()
+        if pricing_tools is not None:
+            return pricing_tools, None
+
+        if self.pricing_daemon_url:
+            from cost_estimator_agent.shared_pricing_client import SharedPricingClient
+
+            # the connection is shared with every other estimator of the process and outlives this session
+            pricing_tools = self._wrap_pricing_tools(SharedPricingClient.get(self.pricing_daemon_url).list_tools())
+            logger.info(f"Found {len(pricing_tools)} AWS pricing tools on the pricing daemon")
+            return pricing_tools, None
+
+        aws_pricing_client = self._setup_aws_pricing_client()
+        aws_pricing_client.start()
+        try:
+            pricing_tools = self._wrap_pricing_tools(aws_pricing_client.list_tools_sync())
+        except Exception as e:
+            self._stop_mcp_client(aws_pricing_client)
+            raise e
+        logger.info(f"Found {len(pricing_tools)} AWS pricing tools")
+        return pricing_tools, aws_pricing_client
+
+    def _setup_pricing_tools(self) -> list:
+        pricing_tools, self.aws_pricing_client = self._open_pricing_tools()
+        return pricing_tools
+
+    @asynccontextmanager
+    async def _pricing_tools_for_call(self) -> AsyncGenerator[list, None]:
+        """The warm session's pricing tools, or tools started for this call only.
+
+        Without a warm session, concurrent calls each start and stop their own MCP client, so they
+        never touch the session's `aws_pricing_client`.
+        """
+        async with self._shared_session_async(start=False) as joined:
+            if joined is not None:
+                yield self.pricing_tools
+                return
+
+        pricing_tools, aws_pricing_client = await asyncio.to_thread(self._open_pricing_tools)
+        try:
+            yield pricing_tools
+        finally:
+            if aws_pricing_client:
+                await asyncio.to_thread(self._stop_mcp_client, aws_pricing_client)
+
+    def start_session(self) -> None:
+        """Bootstrap the code interpreter, pricing MCP client, tool list and model once and keep them warm."""
+        with self._session_condition:
+            # also keeps a session that running estimates started on demand
+            self._stop_when_idle = False
+            self._start_session()
+
+    def _start_session(self) -> None:
+        if self.session_active:
+            return
+
+        try:
+            self._start_components()
+            self.session_active = True
+            logger.info("✅ Session is ready")
+        except Exception as e:
+            logger.exception(f"✖️ Session setup failed: {e}")
+            self._stop_session()
+            raise e
+
+    def _start_components(self) -> None:
+        logger.info("🔥 Starting AWS Cost Estimation session...")
+        steps = {
+            "calculation_backend": self._setup_calculation_backend,
+            "pricing_tools": self._setup_pricing_tools,
+            "model": self._create_session_model,
+        }
+        # the STS lookup only validates the credentials, so it does not hold up the other steps;
+        # a replay talks to no AWS service
+        needs_aws = self.calculation_backend.name == "remote" or (self.pricing_source != "local" and not self.pricing_daemon_url)
+        if needs_aws and not self.replay:
+            steps["aws_identity"] = self._resolve_aws_identity
+
+        orchestrator = StartupOrchestrator()
+        try:
+            results = orchestrator.run(steps)
+        finally:
+            self.startup_timings = orchestrator.timings
+        logger.info(f"⏱️ Startup timings: {self.startup_timings}")
+
+        self.pricing_tools = results["pricing_tools"]
+        self.model = results["model"]
+        self._last_health_check = time.monotonic()
+        if self.aws_pricing_client:
+            # credentials that did not come from the cache (e.g. overridden) get the cache lifetime
+            self._credentials_expire_at = CredentialCache.expires_at(self.region) or time.time() + CREDENTIAL_CACHE_SECONDS
+        else:
+            self._credentials_expire_at = None
+
+    async def start_session_async(self) -> None:
+        """`start_session` off the event loop; the interpreter, MCP and STS clients only have blocking APIs."""
+        await asyncio.to_thread(self.start_session)
+
+    async def stop_session_async(self) -> None:
+        await asyncio.to_thread(self.stop_session)
+
+    def stop_session(self) -> None:
+        """Tear down the components created by `start_session`, once the estimates using them have finished."""
+        with self._session_condition:
+            if self._active_estimates:
+                logger.info(f"⏳ Stopping session after {self._active_estimates} running estimates")
+                self._stop_when_idle = True
+                return
+            self._stop_session()
+
+    def _stop_session(self) -> None:
+        self.session_active = False
+        self._stop_when_idle = False
+        self._stop_components()
+
+    def _stop_components(self) -> None:
+        self.pricing_tools = []
+        self.model = None
+        self._stop_pricing_client()
+        self.cleanup()
+
+    @staticmethod
+    def _stop_mcp_client(aws_pricing_client: "MCPClient") -> None:
+        try:
+            aws_pricing_client.stop(None, None, None)
+            logger.info("✅ AWS Pricing MCP Client stopped")
+        except Exception as e:
+            logger.warning(f"⚠️ Error stopping AWS Pricing MCP Client: {e}")
+
+    def _stop_pricing_client(self) -> None:
+        if self.aws_pricing_client:
+            aws_pricing_client, self.aws_pricing_client = self.aws_pricing_client, None
+            self._stop_mcp_client(aws_pricing_client)
+
+    def _is_session_healthy(self) -> bool:
+        if not self.calculation_backend.is_running:
+            return False
+
+        if self.calculation_backend.is_expiring():
+            logger.info(f"⌛ {self.calculation_backend.name} calculation backend is about to expire")
+            return False
+
+        if self._credentials_expire_at is not None and time.time() >= self._credentials_expire_at:
+            logger.info("⌛ AWS credentials of the pricing MCP server are about to expire")
+            return False
+
+        if time.monotonic() - self._last_health_check < SESSION_HEALTH_CHECK_INTERVAL:
+            return True
+
+        try:
+            if self.aws_pricing_client:
+                self.aws_pricing_client.list_tools_sync()
+            if not self.calculation_backend.is_healthy():
+                return False
+            self._last_health_check = time.monotonic()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Warm session health check failed: {e}")
+            return False
+
+    def _acquire_session(self, start: bool) -> Optional[bool]:
+        """Register an estimate on the session, restarting it first if it is unhealthy.
+
+        Without an active session, one is started for the estimate if `start` is set and stopped again
+        when the last estimate using it is released; otherwise None is returned. Concurrent estimates
+        share the session's components, so a restart waits until every estimate that still uses them
+        has called `_release_session`. Returns whether the session was started or restarted.
+        """
+        restarted = False
+        with self._session_condition:
+            if not self.session_active:
+                if not start:
+                    return None
+                logger.info("🚀Initializing AWS Cost Estimation Agent...")
+                self._start_session()
+                self._stop_when_idle = True
+                restarted = True
+
+            while not self._is_session_healthy():
+                if self._active_estimates:
+                    logger.info(f"⏳ Waiting for {self._active_estimates} running estimates before restarting session")
+                    self._session_condition.wait()
+                    continue
+
+                logger.info("♻️ Restarting session")
+                # the session stays active while it restarts, so new estimates wait here instead of
+                # starting components of their own
+                self._stop_components()
+                try:
+                    self._start_components()
+                except Exception as e:
+                    logger.exception(f"✖️ Session restart failed: {e}")
+                    self._stop_session()
+                    raise e
+                restarted = True
+            self._active_estimates += 1
+        return restarted
+
+    def _release_session(self) -> None:
+        with self._session_condition:
+            self._active_estimates -= 1
+            if not self._active_estimates and self._stop_when_idle:
+                self._stop_session()
+            self._session_condition.notify_all()
+
     @contextmanager
-    def _estimation_agent(self) -> Generator[Agent, None, None]:
-        try:
-            logger.info("🚀Initializing AWS Cost Estimation Agent...")
-            self._setup_code_interpreter()
-            aws_pricing_client = self._setup_aws_pricing_client()
-
-            with aws_pricing_client:
-                pricing_tools = aws_pricing_client.list_tools_sync()
-                logger.info(f"Found {len(pricing_tools)} AWS pricing tools")
-                all_tools = [self.execute_cost_calculation] + pricing_tools
-
-                pprint(f"🔨 All tools: {all_tools}")
-
-                # this bedrock model tried to suit nova model, but it did not work.
-                # model = BedrockModel(
-                #     model_id = DEFAULT_MODEL,
-                #     region_name = self.region,
-                #     temprature=0.0, # this is recommended by [aws guide](https://docs.aws.amazon.com/nova/latest/userguide/prompting-tool-troubleshooting.html)
-                #     streaming=False,
-                #     max_tokens=3000, # this is recommended by [aws guide](https://docs.aws.amazon.com/nova/latest/userguide/prompting-tool-troubleshooting.html)
-                #     top_p=1.0 # this is recommended by [aws guide](https://docs.aws.amazon.com/nova/latest/userguide/prompting-tool-troubleshooting.html)
-                # )
-                model = GeminiModel(
-                    {
-                        'api_key': GEMINI_API_KEY
-                    },
-                    model_config = {
-                        'model_name': DEFAULT_MODEL,
-                        'model_id': DEFAULT_MODEL
-                    }
-                )
+    def _shared_session(self, start: bool=True) -> Generator[Optional[bool], None, None]:
+        """Use the session for one estimate; yields whether it was (re)started, None if there is none."""
+        restarted = self._acquire_session(start)
+        try:
+            yield restarted
+        finally:
+            if restarted is not None:
+                self._release_session()
+
+    @asynccontextmanager
+    async def _shared_session_async(self, start: bool=True) -> AsyncGenerator[Optional[bool], None]:
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._acquire_session, start))
+        try:
+            restarted = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # the thread still registers the estimate, release it once it has
+            acquiring.add_done_callback(
+                lambda future: future.exception() is None and future.result() is not None and self._release_session()
+            )
+            raise
+        try:
+            yield restarted
+        finally:
+            if restarted is not None and self._stop_when_idle:
+                # releasing the last estimate stops the session's components, which blocks
+                await asyncio.to_thread(self._release_session)
+            elif restarted is not None:
+                self._release_session()
+
+    @contextmanager
+    def _estimation_agent(
+        self,
+        callback_handler=None,
+        trace: Optional[EstimateTrace]=None
+    ) -> Generator["Agent", None, None]:
+        try:
+            with self._shared_session() as started:
+                if started and trace:
+                    trace.add_setup_timings(self.startup_timings)
+                yield self._create_agent(self.model, self.pricing_tools, callback_handler, trace)
+        except Exception as e:
+            logger.exception(f"✖️ Session estimation failed: {e}")
+            raise e
+
+    @asynccontextmanager
+    async def _estimation_agent_async(
+        self,
+        callback_handler=None,
+        trace: Optional[EstimateTrace]=None
+    ) -> AsyncGenerator["Agent", None]:
+        """`_estimation_agent` for estimates that run on the caller's event loop."""
+        try:
+            async with self._shared_session_async() as started:
+                if started and trace:
+                    trace.add_setup_timings(self.startup_timings)
+                yield self._create_agent(self.model, self.pricing_tools, callback_handler, trace)
+        except Exception as e:
+            logger.exception(f"✖️ Session estimation failed: {e}")
+            raise e
+
+    @staticmethod
+    def _result_text(result) -> str:
+        if result.message and result.message.get("content"):
+            text_parts = []
+            for content_block in result.message["content"]:
+                if isinstance(content_block, dict) and "text" in content_block:
+                    text_parts.append(content_block["text"])
+
+            return "".join(text_parts) if text_parts else "No text content found."
+        else:
+            return "No estimation result."
+
+    def pricing_data_version(self) -> str:
+        """Version of the pricing data an estimate is based on, part of the result cache key."""
+        if self._open_price_index() is not None:
+            (publication_date,) = self.price_index.connection.execute(
+                "SELECT MAX(publication_date) FROM services"
+            ).fetchone()
+            return f"index-{publication_date}"
+        # the MCP server always serves current prices, so let cached estimates roll over monthly
+        return f"mcp-{time.strftime('%Y-%m')}"
+
+    def _result_cache_key_args(self, architecture_description: str) -> tuple:
+        return (architecture_description, self.region, DEFAULT_MODEL, self.pricing_data_version())
+
+    def _cached_result(self, architecture_description: str) -> Optional[str]:
+        if not self.result_cache:
+            return None
+
+        cached = self.result_cache.get(*self._result_cache_key_args(architecture_description))
+        if cached is not None:
+            logger.info("💾 Returning cached estimate")
+        return cached
+
+    def _cache_result(self, architecture_description: str, result) -> None:
+        if self.result_cache and result.stop_reason == "end_turn":
+            self.result_cache.set(
+                *self._result_cache_key_args(architecture_description),
+                self._result_text(result)
+            )
+
+    def invalidate_result_cache(self, architecture_description: Optional[str] = None) -> None:
+        """Forget the cached estimate of one architecture, or all cached estimates."""
+        if not self.result_cache:
+            return
+        if architecture_description is None:
+            self.result_cache.invalidate()
+        else:
+            self.result_cache.invalidate(*self._result_cache_key_args(architecture_description))
+
+    def _finish_trace(self, trace: EstimateTrace, status: str) -> None:
+        trace.finish(status)
+        self.last_trace = trace
+        self.metrics.record(trace)
+        logger.info(f"⏱️ Estimate {status} in {trace.total_seconds:.2f}s: {trace.phase_summary()}")
+
+        if self.trace_path:
+            try:
+                trace.write_jsonl(self.trace_path)
+            except OSError as e:
+                logger.warning(f"⚠️ Failed to export estimate trace: {e}")
+
+    def metrics_text(self) -> str:
+        """Metrics of all estimates of this agent in the Prometheus text format."""
+        return self.metrics.to_prometheus()
+
+    async def _estimation_prompt(self, architecture_description: str, trace: EstimateTrace, agent: "Agent") -> str:
+        """The estimation prompt, followed by the pricing plan with its prices looked up when the planner is enabled."""
+        prompt = COST_ESTIMATION_PROMPT.format(
+            architecture_description=architecture_description
+        )
+        if not self.use_pricing_planner:
+            return prompt
+
+        from cost_estimator_agent.pricing_planner import plan_pricing, resolve_plan
+        from cost_estimator_agent.tool_wrappers import instrument_tools
+
+        plan = plan_pricing(architecture_description, self.region)
+        if plan is None:
+            logger.info("🧭 Pricing planner could not resolve the architecture")
+            return prompt
+
+        await resolve_plan(plan, instrument_tools(self.pricing_tools, trace, "execute_cost_calculation"))
+        logger.info(f"🧭 Pricing plan: {len(plan.calls)} get_pricing calls, {plan.resolved} prices looked up")
+        prompt += plan.to_prompt()
+
+        pricing_rows = plan.pricing_rows()
+        if pricing_rows:
+            self._calculation_session(agent).load_pricing(pricing_rows)
+            prompt += PRICING_TABLE_PROMPT
+        return prompt
+
+    def _estimate(self, architecture_description: str) -> str:
+        trace = EstimateTrace(architecture_description, self.region)
+        status = "error"
+        try:
+            cached = self._cached_result(architecture_description)
+            if cached is not None:
+                status = "cached"
+                return cached
+
+            with self._estimation_agent(trace=trace) as agent:
+                # the caller may already run an event loop, so plan on a helper thread as Agent.__call__ does
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    prompt = executor.submit(asyncio.run, self._estimation_prompt(architecture_description, trace, agent)).result()
+
+                result = agent(prompt)
+
+                logger.info("✅ Cost estimation completed")
+                if self.pricing_cache:
+                    logger.info(f"💾 Pricing cache stats: {self.pricing_cache_stats()}")
+                self._cache_result(architecture_description, result)
+                status = "success"
+                return self._result_text(result)
+        finally:
+            self._finish_trace(trace, status)
+
+    async def _estimate_async(self, architecture_description: str) -> str:
+        trace = EstimateTrace(architecture_description, self.region)
+        status = "error"
+        try:
+            cached = self._cached_result(architecture_description)
+            if cached is not None:
+                status = "cached"
+                return cached
+
+            async with self._estimation_agent_async(trace=trace) as agent:
+                prompt = await self._estimation_prompt(architecture_description, trace, agent)
+
+                result = await agent.invoke_async(prompt)
+
+                logger.info("✅ Cost estimation completed")
+                if self.pricing_cache:
+                    logger.info(f"💾 Pricing cache stats: {self.pricing_cache_stats()}")
+                self._cache_result(architecture_description, result)
+                status = "success"
+                return self._result_text(result)
+        finally:
+            self._finish_trace(trace, status)
+
+    def estimate_costs_quick(self, architecture_description: str) -> Optional[str]:
+        """Price the architecture from the local price table without the model, or None if it is not recognized."""
+        trace = EstimateTrace(architecture_description, self.region)
+        estimate = quick_estimate(architecture_description, self.region)
+        if estimate is None:
+            logger.info("⏩ Quick estimate could not parse the architecture")
+            return None
+
+        self._finish_trace(trace, "quick")
+        logger.info(f"⏩ Quick estimate completed: ${estimate.total:.2f}/month")
+        return estimate.to_markdown()
+
+    async def estimate_costs_regions(self, architecture_description: str, regions: list[str]) -> Optional[str]:
+        """Compare the architecture's monthly cost across regions, or None if it is not recognized.
+
+        The architecture is parsed once without the model and the prices of all regions are looked up
+        concurrently with the pricing tools, so no agent loop runs. Only the pricing tools are started
+        when there is no warm session.
+        """
+        from cost_estimator_agent.region_comparison import compare_regions
+        from cost_estimator_agent.tool_wrappers import instrument_tools
+
+        # parsed at the base prices, the regions themselves need not have a local price factor
+        line_items, _ = parse_line_items(architecture_description, DEFAULT_REGION)
+        if not line_items:
+            logger.info("🌍 Region comparison could not parse the architecture")
+            return None
 
-                agent = Agent(
-                    model=model,
-                    tools=all_tools,
-                    system_prompt=SYSTEM_PROMPT
+        logger.info(f"🌍 Comparing regions: {', '.join(regions)}")
+        trace = EstimateTrace(architecture_description, ",".join(regions))
+        status = "error"
+        try:
+            async with self._pricing_tools_for_call() as pricing_tools:
+                comparison = await compare_regions(
+                    architecture_description,
+                    regions,
+                    instrument_tools(pricing_tools, trace, "execute_cost_calculation")
                 )
+            status = "regions"
+            logger.info(f"✅ Region comparison completed, cheapest: {comparison.cheapest_region()}")
+            return comparison.to_markdown()
+        except Exception as e:
+            logger.exception(f"✖️ Region comparison failed: {e}")
+            raise e
+        finally:
+            self._finish_trace(trace, status)
+
+    async def estimate_costs_itemized(
+        self,
+        architecture_description: str,
+        previous: Optional["ItemizedEstimate"]=None
+    ) -> Optional["ItemizedEstimate"]:
+        """Price the architecture's line items with the pricing tools, or None if it is not recognized.
+
+        No agent loop runs. With the estimate of the previous version of the architecture as `previous`,
+        unchanged components keep their unit prices and only changed ones are looked up; the pricing
+        tools are not even started when nothing has to be looked up.
+        """
+        from cost_estimator_agent.incremental_estimate import itemize
+        from cost_estimator_agent.tool_wrappers import instrument_tools
+
+        line_items, _ = parse_line_items(architecture_description, DEFAULT_REGION)
+        if not line_items:
+            logger.info("🔁 Itemized estimate could not parse the architecture")
+            return None
 
-                yield agent
+        trace = EstimateTrace(architecture_description, self.region)
+        status = "error"
+        # the pricing tools are only opened when something has to be looked up
+        pricing_tools_scope = AsyncExitStack()
+
+        async def load_pricing_tools() -> list:
+            pricing_tools = await pricing_tools_scope.enter_async_context(self._pricing_tools_for_call())
+            return instrument_tools(pricing_tools, trace, "execute_cost_calculation")
+
+        try:
+            async with pricing_tools_scope:
+                estimate = await itemize(architecture_description, load_pricing_tools, self.region, previous)
+            status = "reestimated" if previous is not None else "itemized"
+            logger.info(f"✅ Itemized estimate completed: ${estimate.total:.2f}/month")
+            return estimate
         except Exception as e:
-            logger.exception(f"✖️ Component setup failed: {e}")
+            logger.exception(f"✖️ Itemized estimate failed: {e}")
             raise e
         finally:
-            self.cleanup()
-    
+            self._finish_trace(trace, status)
+
+    async def reestimate_costs(self, previous: "ItemizedEstimate", architecture_description: str) -> Optional["ItemizedEstimate"]:
+        """Estimate an edited architecture, looking up only the components that changed since `previous`."""
+        logger.info(f"🔁 Re-estimating edited architecture: {architecture_description}")
+        return await self.estimate_costs_itemized(architecture_description, previous)
+
     def estimate_costs(self, architecture_description: str) -> str:
         logger.info("💹 Starting cost estimation...")
         logger.info(f"Architecture: {architecture_description}")
 
         try:
-            with self._estimation_agent() as agent:
-                prompt = COST_ESTIMATION_PROMPT.format(
-                    architecture_description=architecture_description
-                )
+            if QUICK_OPTION in architecture_description:
+                result = self.estimate_costs_quick(architecture_description)
+                if result:
+                    return result
 
-                result = agent(prompt)
+            return self._estimate(architecture_description)
+        except Exception as e:
+            logger.exception(f"✖️ Cost estimation failed: {e}")
+            error_details = traceback.format_exc()
+            return f"🆖 Cost estimation failed: {e}\n\n Stacktrace:\n{error_details}"
 
-                logger.info("✅ Cost estimation completed")
-                if result.message and result.message.get("content"):
-                    text_parts = []
-                    for content_block in result.message["content"]:
-                        if isinstance(content_block, dict) and "text" in content_block:
-                            text_parts.append(content_block["text"])
+    async def estimate_costs_async(self, architecture_description: str) -> str:
+        """`estimate_costs` on the caller's event loop, without a helper thread and event loop per call.
 
-                    return "".join(text_parts) if text_parts else "No text content found."
-                else:
-                    return "No estimation result."
+        Concurrent calls can share one warm session (`async with agent:`).
+        """
+        logger.info("💹 Starting cost estimation...")
+        logger.info(f"Architecture: {architecture_description}")
+
+        try:
+            if QUICK_OPTION in architecture_description:
+                result = self.estimate_costs_quick(architecture_description)
+                if result:
+                    return result
+
+            return await self._estimate_async(architecture_description)
         except Exception as e:
             logger.exception(f"✖️ Cost estimation failed: {e}")
             error_details = traceback.format_exc()
             return f"🆖 Cost estimation failed: {e}\n\n Stacktrace:\n{error_details}"
 
+    async def estimate_costs_stream(self, architecture_description: str) -> AsyncGenerator[dict, None]:
+        """Estimate costs and yield progress events as they are produced.
+
+        Events are dicts with a `type` of:
+            - "text": a text delta of the report (`data`)
+            - "tool_start": the model requested a tool call (`name`, `toolUseId`, `input`)
+            - "tool_finish": a tool call returned (`toolUseId`, `status`)
+            - "line_item": a complete cost table row of the report (`cells`)
+            - "result": the full report text (`data`), always the last event
+        """
+        logger.info("💹 Starting streaming cost estimation...")
+        logger.info(f"Architecture: {architecture_description}")
+
+        trace = EstimateTrace(architecture_description, self.region)
+        cached = self._cached_result(architecture_description)
+        if cached is not None:
+            self._finish_trace(trace, "cached")
+            yield {"type": "result", "data": cached}
+            return
+
+        from strands.handlers.callback_handler import null_callback_handler
+
+        status = "error"
+        try:
+            async with self._estimation_agent_async(callback_handler=null_callback_handler, trace=trace) as agent:
+                prompt = await self._estimation_prompt(architecture_description, trace, agent)
+
+                line_buffer = ""
+                async for event in agent.stream_async(prompt):
+                    if "data" in event:
+                        yield {"type": "text", "data": event["data"]}
+
+                        line_buffer += event["data"]
+                        *lines, line_buffer = line_buffer.split("\n")
+                        for line in lines:
+                            cells = _parse_line_item(line)
+                            if cells:
+                                yield {"type": "line_item", "cells": cells}
+
+                    elif "message" in event:
+                        # a finished message ends the current line of the report
+                        line_buffer = ""
+                        for content in event["message"].get("content", []):
+                            if "toolUse" in content:
+                                tool_use = content["toolUse"]
+                                yield {
+                                    "type": "tool_start",
+                                    "name": tool_use["name"],
+                                    "toolUseId": tool_use["toolUseId"],
+                                    "input": tool_use["input"],
+                                }
+                            elif "toolResult" in content:
+                                tool_result = content["toolResult"]
+                                yield {
+                                    "type": "tool_finish",
+                                    "toolUseId": tool_result["toolUseId"],
+                                    "status": tool_result["status"],
+                                }
+
+                    elif "result" in event:
+                        cells = _parse_line_item(line_buffer)
+                        if cells:
+                            yield {"type": "line_item", "cells": cells}
+
+                        logger.info("✅ Cost estimation completed")
+                        self._cache_result(architecture_description, event["result"])
+                        status = "success"
+                        yield {"type": "result", "data": self._result_text(event["result"])}
+        except Exception as e:
+            logger.exception(f"✖️ Streaming cost estimation failed: {e}")
+            raise
+        finally:
+            self._finish_trace(trace, status)
+
+    async def _estimate_batch_item(self, item: dict, semaphore: asyncio.Semaphore) -> dict:
+        async with semaphore:
+            started_at = time.time()
+            start = time.perf_counter()
+            if "error" in item:
+                # items that could not be read, e.g. malformed input lines, fail without an estimate
+                logger.warning(f"⚠️ Batch item {item.get('id')} is invalid: {item['error']}")
+                result = f"🆖 Cost estimation failed: {item['error']}"
+                status = "error"
+            else:
+                try:
+                    # the same dispatch as estimate_costs_async, which would turn failures into result text
+                    result = None
+                    if QUICK_OPTION in item["architecture"]:
+                        result = self.estimate_costs_quick(item["architecture"])
+                    if result is None:
+                        result = await self._estimate_async(item["architecture"])
+                    status = "success"
+                except Exception as e:
+                    logger.exception(f"✖️ Batch item {item.get('id')} failed: {e}")
+                    result = f"🆖 Cost estimation failed: {e}"
+                    status = "error"
+
+            return {
+                **item,
+                "status": status,
+                "result": result,
+                "started_at": started_at,
+                "elapsed_seconds": round(time.perf_counter() - start, 3),
+            }
+
+    async def estimate_costs_batch(
+        self,
+        items: Iterable[dict],
+        max_concurrency: int = BATCH_MAX_CONCURRENCY
+    ) -> AsyncGenerator[dict, None]:
+        """Estimate many architectures concurrently and yield each result as soon as it completes.
+
+        `items` is consumed lazily, so it can be a generator over a large JSONL file. Each item must
+        have an `architecture` key, or an `error` key for items that could not be read, which fail
+        without an estimate; other keys (e.g. `id`) are passed through to the result together with
+        `status`, `result` and per-item timings. All items share one warm session.
+        """
+        started_session = not self.session_active
+        if started_session:
+            await self.start_session_async()
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        pending = set()
+        try:
+            for item in items:
+                pending.add(asyncio.create_task(self._estimate_batch_item(item, semaphore)))
+
+                # keep at most max_concurrency items in flight so large inputs are streamed, not loaded
+                if len(pending) >= max_concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if started_session:
+                await self.stop_session_async()
+
     def cleanup(self) -> None:
         logger.info("🧹Cleaning up resources..")
-        if self.code_interpreter:
+        if self.calculation_backend.is_running:
             try:
-                self.code_interpreter.stop()
-                logger.info("✅ Code interpreter session stopped")
+                self.calculation_backend.stop()
             except Exception as e:
-                logger.warining(f"⚠️ Error stopping Code interpreter: {e}")
-            finally:
-                self.code_interpreter = None
+                logger.warning(f"⚠️ Error stopping {self.calculation_backend.name} calculation backend: {e}")
 
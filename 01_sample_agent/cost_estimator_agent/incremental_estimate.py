@@ -0,0 +1,159 @@
+"""
+Incremental re-estimation
+
+An adjusted architecture used to be estimated from scratch. An itemized
+estimate keeps the line items of the `[quick]` parser together with the unit
+prices that were looked up for them. When the architecture is edited, the new
+description is parsed and compared with the previous line items by
+`LineItem.key`: components whose key and region are unchanged keep their unit
+price (only their quantity or hours are recalculated), and only added or
+replaced components are looked up with `get_pricing`.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, Optional
+
+from strands.types.tools import AgentTool
+
+from cost_estimator_agent.quick_estimate import LineItem, REGION_PRICE_FACTORS, detect_region, parse_line_items
+from cost_estimator_agent.region_comparison import lookup_unit_price, pricing_query
+from cost_estimator_agent.config import DEFAULT_REGION, REGION_COMPARISON_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ItemizedEstimate:
+    architecture: str
+    region: str
+    line_items: list[LineItem] = field(default_factory=list)
+    # price source of each line item: "pricing": looked up, "reused": taken over from the previous
+    # estimate, "table": approximated from the local price table
+    sources: list[str] = field(default_factory=list)
+    unpriced: list[str] = field(default_factory=list)
+    previous: Optional["ItemizedEstimate"] = field(default=None, repr=False)
+
+    @property
+    def total(self) -> float:
+        return sum(item.monthly_cost for item in self.line_items)
+
+    def _price_source(self, key: tuple) -> Optional[tuple[float, str]]:
+        for item, source in zip(self.line_items, self.sources):
+            if item.key == key:
+                return item.unit_price, source
+        return None
+
+    def changes(self) -> dict[str, list[str]]:
+        """Line items added, removed, resized or unchanged compared with the previous estimate."""
+        changes = {"added": [], "removed": [], "resized": [], "unchanged": []}
+        if self.previous is None:
+            return changes
+
+        previous_items = {item.key: item for item in self.previous.line_items}
+        current_items = {item.key: item for item in self.line_items}
+        for key, item in current_items.items():
+            name = " ".join(key)
+            before = previous_items.get(key)
+            if before is None or self.previous.region != self.region:
+                changes["added"].append(name)
+            elif (before.quantity, before.usage_per_month) != (item.quantity, item.usage_per_month):
+                changes["resized"].append(f"{name} (${before.monthly_cost:.2f} -> ${item.monthly_cost:.2f})")
+            else:
+                changes["unchanged"].append(name)
+        for key, item in previous_items.items():
+            if key not in current_items or self.previous.region != self.region:
+                changes["removed"].append(f"{' '.join(key)} (${item.monthly_cost:.2f})")
+        return changes
+
+    def to_markdown(self) -> str:
+        lines = [
+            "## Architecture Description",
+            f"- {self.architecture.replace('[quick]', '').strip()}",
+            f"- Region: {self.region}",
+            "",
+            "| Service | Configuration | Unit Price | Monthly Cost |",
+            "|---------|--------------|------------|--------------|",
+        ]
+        for item, source in zip(self.line_items, self.sources):
+            quantity = f"{item.quantity:g} x " if item.unit == "hour" and item.quantity != 1 else ""
+            marker = "*" if source == "table" else ""
+            lines.append(
+                f"| {item.service} | {quantity}{item.configuration} | ${item.unit_price:.4f}{marker} per {item.unit} | ${item.monthly_cost:.2f} |"
+            )
+        lines.append(f"| **Total** | | | **${self.total:.2f}** |")
+
+        if self.previous is not None:
+            lines += ["", "## Changes from the Previous Estimate"]
+            for change, names in self.changes().items():
+                if names and change != "unchanged":
+                    lines.append(f"- {change.capitalize()}: {', '.join(names)}")
+            previous_total = self.previous.total
+            difference = f" ({(self.total / previous_total - 1) * 100:+.1f}%)" if previous_total else ""
+            lines.append(f"- Monthly total: ${previous_total:.2f} -> ${self.total:.2f}{difference}")
+            lines.append(f"- Unit prices reused for {self.sources.count('reused')} of {len(self.line_items)} line items")
+
+        lines += ["", "## Discussion Points"]
+        if "table" in self.sources:
+            lines.append("- *: the price could not be looked up and is approximated from the local us-east-1 price table.")
+        lines.append("- Data transfer, requests and free tier are not included.")
+        for text in self.unpriced:
+            lines.append(f"- Not priced: {text}")
+        return "\n".join(lines)
+
+
+async def itemize(
+    architecture: str,
+    load_pricing_tools: Callable[[], Awaitable[list[AgentTool]]],
+    region: str = DEFAULT_REGION,
+    previous: Optional[ItemizedEstimate] = None,
+    max_concurrency: int = REGION_COMPARISON_MAX_CONCURRENCY
+) -> Optional[ItemizedEstimate]:
+    """Price the architecture's line items, reusing the unit prices of `previous` for unchanged components.
+
+    `load_pricing_tools` is only awaited when a component has to be looked up. Returns None when nothing
+    in the architecture could be recognized.
+    """
+    region = detect_region(architecture, region)
+    # parsed against the base region of the local price table, which is also the fallback
+    line_items, unpriced = parse_line_items(architecture, DEFAULT_REGION)
+    if not line_items:
+        return None
+
+    reusable = previous if previous is not None and previous.region == region else None
+    # (unit price, source) of each line item, None where it has to be priced
+    prices: list[Optional[tuple[float, str]]] = []
+    for item in line_items:
+        reused = reusable._price_source(item.key) if reusable else None
+        # table approximations are looked up again, the lookup may succeed this time
+        prices.append((reused[0], "reused") if reused and reused[1] != "table" else None)
+
+    queries = {pricing_query(item) for item, price in zip(line_items, prices) if price is None} - {None}
+    found = {}
+    if queries:
+        get_pricing = next((tool for tool in await load_pricing_tools() if tool.tool_name == "get_pricing"), None)
+        if get_pricing is None:
+            logger.warning("⚠️ No get_pricing tool, pricing changed components from the local price table")
+        else:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            queries = list(queries)
+            results = await asyncio.gather(*(lookup_unit_price(get_pricing, query, region, semaphore) for query in queries))
+            found = dict(zip(queries, results))
+    logger.info(f"🔁 Reused {sum(price is not None for price in prices)} unit prices, looked up {len(found)}")
+
+    estimate = ItemizedEstimate(architecture, region, unpriced=list(unpriced), previous=previous)
+    factor = REGION_PRICE_FACTORS.get(region)
+    for item, price in zip(line_items, prices):
+        if price is None:
+            looked_up = found.get(pricing_query(item))
+            if looked_up is not None:
+                price = (looked_up, "pricing")
+            elif factor is not None:
+                price = (round(item.unit_price * factor, 6), "table")
+            else:
+                estimate.unpriced.append(f"{item.service} {item.configuration}")
+                continue
+        estimate.line_items.append(replace(item, unit_price=price[0]))
+        estimate.sources.append(price[1])
+    return estimate
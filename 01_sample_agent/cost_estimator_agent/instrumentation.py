@@ -0,0 +1,204 @@
+"""
+Per-estimate latency and token instrumentation
+
+An EstimateTrace collects timed spans for one estimate:
+- "setup": bootstrap steps of the estimator session
+- "model": each model call, with time to first token and token usage
+- "tool": each pricing tool call
+- "calculation": each execute_cost_calculation call
+
+Finished traces can be appended to a JSON lines file, and MetricsCollector
+aggregates them into the Prometheus text exposition format.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Generator, Optional
+
+PHASES = ("setup", "model", "tool", "calculation")
+
+
+@dataclass
+class Span:
+    phase: str
+    name: str
+    started_at: float
+    duration_seconds: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class EstimateTrace:
+    """Timed spans of one estimate; spans may be added from tool threads concurrently."""
+
+    def __init__(self, architecture: str, region: str):
+        self.trace_id = uuid.uuid4().hex
+        self.architecture = architecture
+        self.region = region
+        self.started_at = time.time()
+        self.status: Optional[str] = None
+        self.total_seconds: Optional[float] = None
+        self.spans: list[Span] = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, phase: str, name: str, duration_seconds: float, started_at: Optional[float] = None, **attributes) -> None:
+        span = Span(
+            phase=phase,
+            name=name,
+            started_at=started_at if started_at is not None else time.time() - duration_seconds,
+            duration_seconds=round(duration_seconds, 6),
+            attributes=attributes
+        )
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, phase: str, name: str, **attributes) -> Generator[dict, None, None]:
+        """Time the block; attributes set on the yielded dict are stored with the span."""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException:
+            attributes.setdefault("status", "error")
+            raise
+        finally:
+            self.add_span(phase, name, time.perf_counter() - start, started_at, **attributes)
+
+    def add_setup_timings(self, timings: dict[str, float]) -> None:
+        for name, seconds in timings.items():
+            if name != "total":
+                self.add_span("setup", name, seconds)
+
+    def finish(self, status: str) -> "EstimateTrace":
+        self.status = status
+        self.total_seconds = round(time.perf_counter() - self._start, 6)
+        return self
+
+    def phase_summary(self) -> dict[str, dict[str, float]]:
+        summary = {phase: {"count": 0, "seconds": 0.0} for phase in PHASES}
+        for span in self.spans:
+            phase = summary.setdefault(span.phase, {"count": 0, "seconds": 0.0})
+            phase["count"] += 1
+            phase["seconds"] = round(phase["seconds"] + span.duration_seconds, 6)
+        return summary
+
+    def token_usage(self) -> dict[str, int]:
+        usage = {"input": 0, "output": 0}
+        for span in self.spans:
+            if span.phase == "model":
+                usage["input"] += span.attributes.get("input_tokens", 0)
+                usage["output"] += span.attributes.get("output_tokens", 0)
+        return usage
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "architecture": self.architecture,
+            "region": self.region,
+            "started_at": self.started_at,
+            "status": self.status,
+            "total_seconds": self.total_seconds,
+            "phases": self.phase_summary(),
+            "tokens": self.token_usage(),
+            "spans": [asdict(span) for span in self.spans],
+        }
+
+    def write_jsonl(self, path: str) -> None:
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+
+
+def _labels(**labels: str) -> str:
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsCollector:
+    """Aggregates finished traces into Prometheus counters and summaries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.estimates: dict[str, int] = {}
+        self.estimate_seconds = {"sum": 0.0, "count": 0}
+        self.span_seconds: dict[tuple[str, str], dict[str, float]] = {}
+        self.span_errors: dict[tuple[str, str], int] = {}
+        self.time_to_first_token = {"sum": 0.0, "count": 0}
+        self.tokens = {"input": 0, "output": 0}
+
+    def record(self, trace: EstimateTrace) -> None:
+        with self._lock:
+            self.estimates[trace.status] = self.estimates.get(trace.status, 0) + 1
+            self.estimate_seconds["sum"] += trace.total_seconds or 0.0
+            self.estimate_seconds["count"] += 1
+
+            for span in trace.spans:
+                key = (span.phase, span.name)
+                seconds = self.span_seconds.setdefault(key, {"sum": 0.0, "count": 0})
+                seconds["sum"] += span.duration_seconds
+                seconds["count"] += 1
+                if span.attributes.get("status") == "error":
+                    self.span_errors[key] = self.span_errors.get(key, 0) + 1
+                if "time_to_first_token_seconds" in span.attributes:
+                    self.time_to_first_token["sum"] += span.attributes["time_to_first_token_seconds"]
+                    self.time_to_first_token["count"] += 1
+
+            for direction, count in trace.token_usage().items():
+                self.tokens[direction] += count
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP cost_estimator_estimates_total Finished estimates by status.",
+                "# TYPE cost_estimator_estimates_total counter",
+            ]
+            lines += [
+                f"cost_estimator_estimates_total{_labels(status=status)} {count}"
+                for status, count in sorted(self.estimates.items())
+            ]
+
+            lines += [
+                "# HELP cost_estimator_estimate_seconds Total time of an estimate.",
+                "# TYPE cost_estimator_estimate_seconds summary",
+                f"cost_estimator_estimate_seconds_sum {self.estimate_seconds['sum']:.6f}",
+                f"cost_estimator_estimate_seconds_count {self.estimate_seconds['count']}",
+                "# HELP cost_estimator_phase_seconds Time spent per phase and step.",
+                "# TYPE cost_estimator_phase_seconds summary",
+            ]
+            for (phase, name), seconds in sorted(self.span_seconds.items()):
+                labels = _labels(phase=phase, name=name)
+                lines.append(f"cost_estimator_phase_seconds_sum{labels} {seconds['sum']:.6f}")
+                lines.append(f"cost_estimator_phase_seconds_count{labels} {seconds['count']}")
+
+            lines += [
+                "# HELP cost_estimator_phase_errors_total Failed calls per phase and step.",
+                "# TYPE cost_estimator_phase_errors_total counter",
+            ]
+            lines += [
+                f"cost_estimator_phase_errors_total{_labels(phase=phase, name=name)} {count}"
+                for (phase, name), count in sorted(self.span_errors.items())
+            ]
+
+            lines += [
+                "# HELP cost_estimator_model_time_to_first_token_seconds Time from model request to first streamed token.",
+                "# TYPE cost_estimator_model_time_to_first_token_seconds summary",
+                f"cost_estimator_model_time_to_first_token_seconds_sum {self.time_to_first_token['sum']:.6f}",
+                f"cost_estimator_model_time_to_first_token_seconds_count {self.time_to_first_token['count']}",
+                "# HELP cost_estimator_model_tokens_total Model tokens by direction.",
+                "# TYPE cost_estimator_model_tokens_total counter",
+            ]
+            lines += [
+                f"cost_estimator_model_tokens_total{_labels(direction=direction)} {count}"
+                for direction, count in self.tokens.items()
+            ]
+            return "\n".join(lines) + "\n"
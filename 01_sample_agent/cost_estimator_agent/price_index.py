@@ -0,0 +1,346 @@
+"""
+Offline AWS price index
+
+Turns AWS price list offer files (the bulk `index.json` files published under
+https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/) into a compact
+SQLite index, and exposes it through local `@tool` functions with the same
+shape as the AWS Pricing MCP tools described in `SYSTEM_PROMPT`.
+
+Usage:
+    $ python -m cost_estimator_agent.price_index download AmazonEC2 --region us-east-1 --output ./offers
+    $ python -m cost_estimator_agent.price_index ingest ./offers/*.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+import urllib.request
+from typing import Any, Iterable, Optional
+
+from strands import tool
+
+from cost_estimator_agent.config import (
+    PRICE_INDEX_PATH,
+    PRICE_INDEX_MAX_AGE_DAYS,
+    PRICE_INDEX_MMAP_SIZE,
+    PRICE_INDEX_MAX_RESULTS,
+    PRICE_LIST_OFFER_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    service_code TEXT PRIMARY KEY,
+    publication_date TEXT,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    service_code TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    region TEXT,
+    product_family TEXT,
+    attributes TEXT NOT NULL,
+    PRIMARY KEY (service_code, sku)
+);
+CREATE TABLE IF NOT EXISTS attributes (
+    service_code TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prices (
+    service_code TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    term_type TEXT NOT NULL,
+    unit TEXT,
+    price_per_unit TEXT,
+    currency TEXT,
+    description TEXT,
+    begin_range TEXT,
+    end_range TEXT
+);
+CREATE INDEX IF NOT EXISTS products_region ON products (service_code, region);
+CREATE INDEX IF NOT EXISTS attributes_lookup ON attributes (service_code, name, value);
+CREATE INDEX IF NOT EXISTS attributes_sku ON attributes (service_code, sku);
+CREATE INDEX IF NOT EXISTS prices_sku ON prices (service_code, sku);
+"""
+
+
+class PriceIndex:
+    """Read/write access to the SQLite price index."""
+
+    def __init__(self, path: str = PRICE_INDEX_PATH, read_only: bool = False):
+        self.path = os.path.expanduser(path)
+        if read_only:
+            self.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.executescript(SCHEMA)
+
+        # let SQLite serve reads straight from the page cache instead of read() syscalls
+        self.connection.execute(f"PRAGMA mmap_size = {PRICE_INDEX_MMAP_SIZE}")
+
+    @classmethod
+    def open_if_fresh(cls, path: str = PRICE_INDEX_PATH, max_age_days: float = PRICE_INDEX_MAX_AGE_DAYS) -> Optional["PriceIndex"]:
+        """Open the index read-only, or return None when it is missing or stale."""
+        if not os.path.exists(os.path.expanduser(path)):
+            logger.info(f"🗂️ Price index not found: {path}")
+            return None
+
+        index = cls(path, read_only=True)
+        age_days = index.age_days()
+        if age_days is None or age_days > max_age_days:
+            logger.info(f"🗂️ Price index is stale ({age_days} days old): {path}")
+            index.close()
+            return None
+
+        return index
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def age_days(self) -> Optional[float]:
+        """Age of the oldest ingested service in days."""
+        (oldest,) = self.connection.execute("SELECT MIN(ingested_at) FROM services").fetchone()
+        if oldest is None:
+            return None
+        return (time.time() - oldest) / 86400
+
+    def ingest_offer_file(self, path: str) -> int:
+        """Load one price list offer file, replacing earlier data for the same region and service."""
+        logger.info(f"📥 Ingesting price list: {path}")
+        with open(path) as f:
+            offer = json.load(f)
+
+        service_code = offer["offerCode"]
+        products = offer.get("products", {})
+        regions = {
+            product.get("attributes", {}).get("regionCode") or product.get("attributes", {}).get("location")
+            for product in products.values()
+        }
+
+        with self.connection:
+            for region in regions:
+                skus = "SELECT sku FROM products WHERE service_code = ? AND region IS ?"
+                self.connection.execute(f"DELETE FROM attributes WHERE service_code = ? AND sku IN ({skus})", (service_code, service_code, region))
+                self.connection.execute(f"DELETE FROM prices WHERE service_code = ? AND sku IN ({skus})", (service_code, service_code, region))
+                self.connection.execute("DELETE FROM products WHERE service_code = ? AND region IS ?", (service_code, region))
+
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        service_code,
+                        sku,
+                        product.get("attributes", {}).get("regionCode") or product.get("attributes", {}).get("location"),
+                        product.get("productFamily"),
+                        json.dumps(product.get("attributes", {}), separators=(",", ":")),
+                    )
+                    for sku, product in products.items()
+                ),
+            )
+            self.connection.executemany(
+                "INSERT INTO attributes VALUES (?, ?, ?, ?)",
+                (
+                    (service_code, sku, name, value)
+                    for sku, product in products.items()
+                    for name, value in product.get("attributes", {}).items()
+                ),
+            )
+            self.connection.executemany(
+                "INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._price_rows(service_code, offer.get("terms", {})),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO services VALUES (?, ?, ?)",
+                (service_code, offer.get("publicationDate"), time.time()),
+            )
+
+        logger.info(f"✅ Ingested {len(products)} {service_code} products")
+        return len(products)
+
+    @staticmethod
+    def _price_rows(service_code: str, terms: dict) -> Iterable[tuple]:
+        for term_type, skus in terms.items():
+            for sku, offers in skus.items():
+                for offer_term in offers.values():
+                    for dimension in offer_term.get("priceDimensions", {}).values():
+                        for currency, price in dimension.get("pricePerUnit", {}).items():
+                            yield (
+                                service_code,
+                                sku,
+                                term_type,
+                                dimension.get("unit"),
+                                price,
+                                currency,
+                                dimension.get("description"),
+                                dimension.get("beginRange"),
+                                dimension.get("endRange"),
+                            )
+
+    def service_codes(self) -> list[str]:
+        return [row[0] for row in self.connection.execute("SELECT service_code FROM services ORDER BY service_code")]
+
+    def service_attributes(self, service_code: str) -> list[str]:
+        return [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT DISTINCT name FROM attributes WHERE service_code = ? ORDER BY name", (service_code,)
+            )
+        ]
+
+    def attribute_values(self, service_code: str, attribute_names: list[str]) -> dict[str, list[str]]:
+        return {
+            name: [
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT DISTINCT value FROM attributes WHERE service_code = ? AND name = ? ORDER BY value",
+                    (service_code, name),
+                )
+            ]
+            for name in attribute_names
+        }
+
+    def pricing(
+        self,
+        service_code: str,
+        region: str,
+        filters: Optional[list[dict[str, str]]] = None,
+        max_results: int = PRICE_INDEX_MAX_RESULTS,
+    ) -> list[dict[str, Any]]:
+        query = "SELECT p.sku, p.product_family, p.attributes FROM products p WHERE p.service_code = ? AND p.region = ?"
+        params: list[Any] = [service_code, region]
+        for price_filter in filters or []:
+            query += " AND p.sku IN (SELECT sku FROM attributes WHERE service_code = ? AND name = ? AND value = ?)"
+            params += [service_code, price_filter["Field"], price_filter["Value"]]
+        query += " LIMIT ?"
+        params.append(max_results)
+
+        results = []
+        for sku, product_family, attributes in self.connection.execute(query, params).fetchall():
+            results.append({
+                "sku": sku,
+                "productFamily": product_family,
+                "attributes": json.loads(attributes),
+                "prices": [
+                    {
+                        "termType": term_type,
+                        "unit": unit,
+                        "pricePerUnit": {currency: price},
+                        "description": description,
+                        "beginRange": begin_range,
+                        "endRange": end_range,
+                    }
+                    for term_type, unit, price, currency, description, begin_range, end_range in self.connection.execute(
+                        "SELECT term_type, unit, price_per_unit, currency, description, begin_range, end_range "
+                        "FROM prices WHERE service_code = ? AND sku = ?",
+                        (service_code, sku),
+                    )
+                ],
+            })
+        return results
+
+
+class LocalPricingTools:
+    """Pricing tools backed by a `PriceIndex`, named like the AWS Pricing MCP tools."""
+
+    def __init__(self, index: PriceIndex):
+        self.index = index
+
+    def tools(self) -> list:
+        return [
+            self.get_pricing_service_codes,
+            self.get_pricing_service_attributes,
+            self.get_pricing_attribute_values,
+            self.get_pricing,
+        ]
+
+    @tool
+    def get_pricing_service_codes(self) -> str:
+        """Get all AWS service codes available in the local price index."""
+        return json.dumps(self.index.service_codes())
+
+    @tool
+    def get_pricing_service_attributes(self, service_code: str) -> str:
+        """Get filterable attributes for a specific service code.
+
+        Args:
+            service_code: AWS service code, e.g. AmazonEC2
+        """
+        return json.dumps(self.index.service_attributes(service_code))
+
+    @tool
+    def get_pricing_attribute_values(self, service_code: str, attribute_names: list[str]) -> str:
+        """Get possible values for the given attributes of a service.
+
+        Args:
+            service_code: AWS service code, e.g. AmazonEC2
+            attribute_names: attribute names, e.g. ["instanceType", "operatingSystem"]
+        """
+        return json.dumps(self.index.attribute_values(service_code, attribute_names))
+
+    @tool
+    def get_pricing(self, service_code: str, region: str, filters: Optional[list[dict[str, str]]] = None) -> str:
+        """Get pricing data for a service in a region with optional attribute filters.
+
+        Args:
+            service_code: AWS service code, e.g. AmazonEC2
+            region: AWS region code, e.g. us-east-1
+            filters: list of {"Field": attribute name, "Value": attribute value, "Type": "TERM_MATCH"}
+        """
+        return json.dumps(self.index.pricing(service_code, region, filters))
+
+
+def download_offer_file(service_code: str, region: str, output_dir: str) -> str:
+    url = PRICE_LIST_OFFER_URL.format(service_code=service_code, region=region)
+    path = os.path.join(output_dir, f"{service_code}-{region}.json")
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info(f"🌐 Downloading {url}")
+    urllib.request.urlretrieve(url, path)
+    return path
+
+
+def parse_argument():
+    parser = argparse.ArgumentParser(description="Build the offline AWS price index")
+    parser.add_argument('--index', default=PRICE_INDEX_PATH, help=f'Index path (default: {PRICE_INDEX_PATH})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    download = subparsers.add_parser('download', help='Download price list offer files')
+    download.add_argument('service_codes', nargs='+', help='Service codes, e.g. AmazonEC2 AmazonS3')
+    download.add_argument('--region', nargs='+', default=['us-east-1'], help='Regions to download')
+    download.add_argument('--output', default='.', help='Directory for the downloaded files')
+    download.add_argument('--ingest', action='store_true', help='Ingest the files after downloading')
+
+    ingest = subparsers.add_parser('ingest', help='Ingest price list offer files into the index')
+    ingest.add_argument('paths', nargs='+', help='Offer files (index.json)')
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_argument()
+
+    paths = args.paths if args.command == 'ingest' else [
+        download_offer_file(service_code, region, args.output)
+        for service_code in args.service_codes
+        for region in args.region
+    ]
+
+    if args.command == 'ingest' or args.ingest:
+        index = PriceIndex(args.index)
+        try:
+            for path in paths:
+                index.ingest_offer_file(path)
+        finally:
+            index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Shared AWS Pricing MCP daemon
+
+Every estimator session starts its own AWS Pricing MCP server over stdio,
+which means a process spawn, a `uvx` package resolution and cold boto3
+clients per session and per worker process. The daemon runs one long-lived
+server as its child and serves its tools over streamable HTTP on localhost,
+so all estimators and processes on the host share the warm server.
+
+The child is restarted when a call to it fails, and recycled once the frozen
+AWS credentials it was started with reach the credential cache lifetime.
+
+Usage:
+    $ python -m cost_estimator_agent.pricing_daemon --port 8765
+    $ export COST_ESTIMATOR_PRICING_DAEMON_URL=http://127.0.0.1:8765/mcp
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, AsyncGenerator, Optional
+
+import uvicorn
+from mcp import ClientSession, StdioServerParameters, stdio_client, types
+from mcp.server.fastmcp.server import StreamableHTTPASGIApp
+from mcp.server.lowlevel import Server
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from cost_estimator_agent.startup import CredentialCache
+from cost_estimator_agent.config import (
+    DEFAULT_REGION,
+    PRICING_MCP_COMMAND,
+    PRICING_MCP_ARGS,
+    PRICING_DAEMON_HOST,
+    PRICING_DAEMON_PORT,
+    PRICING_DAEMON_START_TIMEOUT,
+    CREDENTIAL_CACHE_SECONDS,
+    LOG_FORMAT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamPricingServer:
+    """The AWS Pricing MCP server as one long-lived stdio child, restarted on failure."""
+
+    def __init__(
+        self,
+        region: str = DEFAULT_REGION,
+        command: str = PRICING_MCP_COMMAND,
+        args: list[str] = PRICING_MCP_ARGS,
+        max_age_seconds: float = CREDENTIAL_CACHE_SECONDS
+    ):
+        self.region = region
+        self.command = command
+        self.args = args
+        self.max_age_seconds = max_age_seconds
+        self.tools: list[types.Tool] = []
+        self.started_at = 0.0
+        self.restarts = 0
+        self._session: Optional[ClientSession] = None
+        self._ready = asyncio.Event()
+        self._restart = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), PRICING_DAEMON_START_TIMEOUT)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def _credentials(self) -> dict:
+        try:
+            return CredentialCache.credentials(self.region)
+        except Exception as e:
+            # servers that need no AWS access (e.g. fixture servers) still start
+            logger.warning(f"⚠️ Starting AWS Pricing MCP server without AWS credentials: {e}")
+            return {"AWS_REGION": self.region}
+
+    async def _run(self) -> None:
+        # the stdio transport must be entered and exited by the same task, so one task owns the child
+        while True:
+            try:
+                credentials = await asyncio.to_thread(self._credentials)
+                parameters = StdioServerParameters(
+                    command=self.command,
+                    args=self.args,
+                    env={"FASTMCP_LOG_LEVEL": "ERROR", **credentials}
+                )
+                async with stdio_client(parameters) as (read_stream, write_stream):
+                    async with ClientSession(read_stream, write_stream) as session:
+                        await session.initialize()
+                        self.tools = (await session.list_tools()).tools
+                        self._session = session
+                        self.started_at = time.monotonic()
+                        self._ready.set()
+                        logger.info(f"✅ AWS Pricing MCP server is ready with {len(self.tools)} tools")
+                        await self._restart.wait()
+            except Exception as e:
+                logger.warning(f"⚠️ AWS Pricing MCP server failed, restarting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self._session = None
+                self._ready.clear()
+                self._restart.clear()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def request_restart(self, session: ClientSession) -> None:
+        """Restart the child, unless the session that failed has already been replaced."""
+        if self._session is session:
+            self.restarts += 1
+            self._session = None
+            self._ready.clear()
+            self._restart.set()
+
+    async def session(self) -> ClientSession:
+        session = self._session
+        if session is not None and time.monotonic() - self.started_at > self.max_age_seconds:
+            logger.info("♻️ Recycling AWS Pricing MCP server to refresh its credentials")
+            self.request_restart(session)
+        await asyncio.wait_for(self._ready.wait(), PRICING_DAEMON_START_TIMEOUT)
+        return self._session
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> types.CallToolResult:
+        session = await self.session()
+        try:
+            return await session.call_tool(name, arguments)
+        except Exception as e:
+            logger.warning(f"♻️ Restarting AWS Pricing MCP server after a failed {name} call: {e}")
+            self.request_restart(session)
+
+        session = await self.session()
+        return await session.call_tool(name, arguments)
+
+
+def create_app(upstream: UpstreamPricingServer) -> Starlette:
+    server = Server("aws-pricing-daemon")
+
+    @server.list_tools()
+    async def list_tools() -> list[types.Tool]:
+        await upstream.session()
+        return upstream.tools
+
+    # the upstream server validates its own arguments
+    @server.call_tool(validate_input=False)
+    async def call_tool(name: str, arguments: dict[str, Any]) -> types.CallToolResult:
+        return await upstream.call_tool(name, arguments)
+
+    # stateless, so clients never see their session expire while the daemon keeps running
+    session_manager = StreamableHTTPSessionManager(app=server, json_response=True, stateless=True)
+
+    async def health(request) -> JSONResponse:
+        return JSONResponse({
+            "ready": upstream.ready,
+            "tools": len(upstream.tools),
+            "restarts": upstream.restarts,
+            "uptime_seconds": round(time.monotonic() - upstream.started_at, 1) if upstream.started_at else 0,
+        })
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app) -> AsyncGenerator[None, None]:
+        logger.info(f"🔥 Starting AWS Pricing MCP server: {upstream.command} {' '.join(upstream.args)}")
+        await upstream.start()
+        async with session_manager.run():
+            try:
+                yield
+            finally:
+                await upstream.stop()
+
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=StreamableHTTPASGIApp(session_manager)),
+            Route("/health", health, methods=["GET"]),
+        ],
+        lifespan=lifespan
+    )
+
+
+def parse_argument():
+    parser = argparse.ArgumentParser(description="Serve one shared AWS Pricing MCP server over local HTTP")
+    parser.add_argument('--host', default=PRICING_DAEMON_HOST, help=f'Host to bind to (default: {PRICING_DAEMON_HOST})')
+    parser.add_argument('--port', type=int, default=PRICING_DAEMON_PORT, help=f'Port to serve on (default: {PRICING_DAEMON_PORT})')
+    parser.add_argument('--region', default=DEFAULT_REGION, help=f'AWS region of the credentials (default: {DEFAULT_REGION})')
+    parser.add_argument(
+        'command',
+        nargs=argparse.REMAINDER,
+        help=f'Pricing MCP server command (default: {PRICING_MCP_COMMAND} {" ".join(PRICING_MCP_ARGS)})'
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_argument()
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    command, *command_args = args.command or [PRICING_MCP_COMMAND, *PRICING_MCP_ARGS]
+    upstream = UpstreamPricingServer(args.region, command, command_args)
+    logger.info(f"🔌 Pricing daemon listening on http://{args.host}:{args.port}/mcp")
+    uvicorn.run(create_app(upstream), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
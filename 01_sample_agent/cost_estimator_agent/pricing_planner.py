@@ -0,0 +1,159 @@
+"""
+Pre-resolution of pricing lookups
+
+Following the WORKFLOW of `SYSTEM_PROMPT`, the model spends its first turns
+discovering service codes, filter attributes and attribute values, which are
+the same for every request. Before the agent loop starts, the planner maps the
+architecture description to `get_pricing` calls from a local catalog: line
+items of the `[quick]` parser use the queries of the region comparison, other
+recognized services use `SERVICE_CATALOG`. Calls with a known price unit are
+looked up concurrently, and the model receives the ready-made calls together
+with their prices, so it can go straight to the calculation.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from strands.types.tools import AgentTool
+
+from cost_estimator_agent.quick_estimate import INSTANCE_TYPE_PATTERN, LineItem, detect_region, parse_line_items
+from cost_estimator_agent.region_comparison import PRICING_QUERIES, PricingQuery, lookup_unit_price, pricing_query
+from cost_estimator_agent.config import DEFAULT_REGION, PRICING_PLAN_PROMPT, PRICING_PLANNER_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# services the quick estimate parser recognizes but cannot size: (keyword pattern, [(component, service
+# code, filters)]); their results have several priced dimensions, so the model reads the prices itself
+SERVICE_CATALOG = [
+    (r"\blambda\b", [
+        ("Lambda duration", "AWSLambda", {"group": "AWS-Lambda-Duration"}),
+        ("Lambda requests", "AWSLambda", {"group": "AWS-Lambda-Requests"}),
+    ]),
+    (r"\bdynamodb\b", [
+        ("DynamoDB on-demand requests", "AmazonDynamoDB", {"productFamily": "Amazon DynamoDB PayPerRequest Throughput"}),
+        ("DynamoDB storage", "AmazonDynamoDB", {"productFamily": "Database Storage"}),
+    ]),
+    (r"\belasticache\b", [("ElastiCache", "AmazonElastiCache", {"cacheEngine": "Redis"})]),
+    (r"\bcloudfront\b", [("CloudFront data transfer", "AmazonCloudFront", {"transferType": "CloudFront Outbound"})]),
+    (r"\bnlb\b|network load balancer", [("Network Load Balancer", "AWSELB", {"productFamily": "Load Balancer-Network"})]),
+    (r"\balb\b|(?<!network )load balancer", [("Application Load Balancer", "AWSELB", {"productFamily": "Load Balancer-Application"})]),
+    (r"\bnat\b", [("NAT Gateway", "AmazonEC2", {"productFamily": "NAT Gateway"})]),
+    (r"\bredshift\b", [("Redshift", "AmazonRedshift", {"productFamily": "Compute Instance"})]),
+]
+
+
+@dataclass
+class PlannedCall:
+    component: str
+    query: PricingQuery
+    # how much of the component the architecture uses, None when the model has to read it from the description
+    usage: Optional[str] = None
+    unit_price: Optional[float] = None
+    line_item: Optional[LineItem] = None
+
+
+@dataclass
+class PricingPlan:
+    region: str
+    calls: list[PlannedCall] = field(default_factory=list)
+    # clauses the catalog does not cover; the model prices them with the full workflow
+    uncovered: list[str] = field(default_factory=list)
+
+    @property
+    def resolved(self) -> int:
+        return sum(call.unit_price is not None for call in self.calls)
+
+    def pricing_rows(self) -> list[dict]:
+        """Looked-up line items as rows of the `pricing` table of a calculation session."""
+        return [
+            {
+                "service": call.line_item.service,
+                "configuration": call.line_item.configuration,
+                "quantity": call.line_item.quantity,
+                "unit_price": call.unit_price,
+                "unit": call.query.unit,
+                "usage": call.line_item.usage_per_month,
+            }
+            for call in self.calls
+            if call.line_item is not None and call.unit_price is not None
+        ]
+
+    def to_prompt(self) -> str:
+        lines = []
+        for call in self.calls:
+            usage = f", {call.usage}" if call.usage else ""
+            arguments = json.dumps(call.query.tool_input(self.region))
+            price = (
+                f"looked up: ${call.unit_price:g} per {call.query.unit}" if call.unit_price is not None
+                else "call get_pricing with these arguments"
+            )
+            lines.append(f"- {call.component}{usage}: get_pricing {arguments} => {price}")
+
+        uncovered = f"- Not covered by the plan, use the full workflow for: {'; '.join(self.uncovered)}" if self.uncovered else ""
+        return PRICING_PLAN_PROMPT.format(region=self.region, planned_calls="\n".join(lines), uncovered=uncovered)
+
+
+def _instance_query(instance_type: str) -> PricingQuery:
+    # an instance type missing from the local price table still has a known query, only its usage is unknown
+    service = "RDS" if instance_type.startswith("db.") else "EC2"
+    service_code, filters, unit = PRICING_QUERIES[service]
+    return PricingQuery(service_code, tuple((name, value.format(name=instance_type)) for name, value in filters.items()), unit)
+
+
+def plan_pricing(architecture: str, region: str = DEFAULT_REGION) -> Optional[PricingPlan]:
+    """Map the architecture to ready-made get_pricing calls, or None when the catalog covers nothing in it."""
+    region = detect_region(architecture, region)
+    # parsed against the base region of the local price table, only the line items themselves are used
+    line_items, unpriced = parse_line_items(architecture, DEFAULT_REGION)
+
+    plan = PricingPlan(region)
+    for item in line_items:
+        query = pricing_query(item)
+        if query is None:
+            plan.uncovered.append(f"{item.service} {item.configuration}")
+            continue
+        usage = f"{item.quantity:g} x {item.usage_per_month:g} hours/month" if item.unit == "hour" else f"{item.quantity:g} GB-month"
+        plan.calls.append(PlannedCall(f"{item.service} ({item.configuration})", query, usage, line_item=item))
+
+    for text in unpriced:
+        if INSTANCE_TYPE_PATTERN.fullmatch(text):
+            query = _instance_query(text)
+            plan.calls.append(PlannedCall(f"{'RDS' if text.startswith('db.') else 'EC2'} ({text})", query))
+            continue
+
+        planned = False
+        for pattern, entries in SERVICE_CATALOG:
+            if re.search(pattern, text):
+                for component, service_code, filters in entries:
+                    if not any(call.component == component for call in plan.calls):
+                        plan.calls.append(PlannedCall(component, PricingQuery(service_code, tuple(filters.items()), None)))
+                planned = True
+        if not planned:
+            plan.uncovered.append(text)
+
+    return plan if plan.calls else None
+
+
+async def resolve_plan(
+    plan: PricingPlan,
+    pricing_tools: list[AgentTool],
+    max_concurrency: int = PRICING_PLANNER_MAX_CONCURRENCY
+) -> PricingPlan:
+    """Look up the price of every planned call with a known price unit, at the same time."""
+    get_pricing = next((tool for tool in pricing_tools if tool.tool_name == "get_pricing"), None)
+    if get_pricing is None:
+        logger.warning("⚠️ No get_pricing tool, the model looks up the planned prices itself")
+        return plan
+
+    # identical line items (e.g. two clauses with the same instance type) share one lookup
+    queries = list(dict.fromkeys(call.query for call in plan.calls if call.query.unit is not None))
+    semaphore = asyncio.Semaphore(max_concurrency)
+    prices = await asyncio.gather(*(lookup_unit_price(get_pricing, query, plan.region, semaphore) for query in queries))
+    found = dict(zip(queries, prices))
+    for call in plan.calls:
+        call.unit_price = found.get(call.query)
+    return plan
@@ -0,0 +1,267 @@
+"""
+Deterministic quick estimates
+
+Handles the `[quick]` option of `SYSTEM_PROMPT` without calling the model or
+any pricing service: common architecture phrasing is parsed into line items
+and priced from a local on-demand price table.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from cost_estimator_agent.config import DEFAULT_REGION, HOURS_PER_MONTH
+
+# Snapshot of on-demand list prices in us-east-1 (USD)
+PRICE_TABLE_VERSION = "2025-08-us-east-1"
+
+EC2_HOURLY_PRICES = {
+    "t3.nano": 0.0052, "t3.micro": 0.0104, "t3.small": 0.0208, "t3.medium": 0.0416,
+    "t3.large": 0.0832, "t3.xlarge": 0.1664, "t3.2xlarge": 0.3328,
+    "t3a.micro": 0.0094, "t3a.small": 0.0188, "t3a.medium": 0.0376, "t3a.large": 0.0752,
+    "t4g.micro": 0.0084, "t4g.small": 0.0168, "t4g.medium": 0.0336, "t4g.large": 0.0672,
+    "m5.large": 0.096, "m5.xlarge": 0.192, "m5.2xlarge": 0.384,
+    "m6i.large": 0.096, "m6i.xlarge": 0.192, "m7g.large": 0.0816,
+    "c5.large": 0.085, "c5.xlarge": 0.17, "c6i.large": 0.085,
+    "r5.large": 0.126, "r5.xlarge": 0.252, "r6i.large": 0.126,
+}
+
+# RDS for MySQL, Single-AZ
+RDS_HOURLY_PRICES = {
+    "db.t3.micro": 0.017, "db.t3.small": 0.034, "db.t3.medium": 0.068,
+    "db.t4g.micro": 0.016, "db.t4g.small": 0.032,
+    "db.m5.large": 0.171, "db.r5.large": 0.25,
+}
+
+# per GB-month
+STORAGE_PRICES = {
+    "gp3": 0.08, "gp2": 0.10, "io1": 0.125, "st1": 0.045, "sc1": 0.015,
+    "s3": 0.023, "rds": 0.115,
+}
+
+# rough multipliers against us-east-1 for regions outside the snapshot
+REGION_PRICE_FACTORS = {
+    "us-east-1": 1.0, "us-east-2": 1.0, "us-west-2": 1.0, "us-west-1": 1.12,
+    "eu-west-1": 1.1, "eu-central-1": 1.15, "ap-northeast-1": 1.3, "ap-southeast-1": 1.25,
+}
+
+QUICK_LABELS = {
+    "en": {
+        "headings": ("Architecture Description", "Service", "Configuration", "Unit Price", "Monthly Cost", "Total", "Discussion Points"),
+        "source": "Quick estimate from on-demand list prices ({version}), assuming {hours} hours per month.",
+        "excluded": "Data transfer, requests and free tier are not included.",
+        "approximated": "Prices for {region} are approximated from us-east-1.",
+        "unpriced": "Not priced: {text}",
+    },
+    "ja": {
+        "headings": ("アーキテクチャ", "サービス", "構成", "単価", "月額", "合計", "検討事項"),
+        "source": "オンデマンド価格表 ({version}) による概算です。1か月を{hours}時間として計算しています。",
+        "excluded": "データ転送、リクエスト料金、無料利用枠は含まれていません。",
+        "approximated": "{region} の価格は us-east-1 からの概算です。",
+        "unpriced": "未計上: {text}",
+    },
+}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+INSTANCE_TYPE_PATTERN = re.compile(r"\b((?:db\.)?[a-z][a-z0-9-]*\d[a-z0-9-]*\.(?:nano|micro|small|medium|large|\d*xlarge))\b")
+COUNT_WORD = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+# a count right before the instance type: "2 t3.micro", "2x ec2 t3.micro", "two instances of t3.micro"
+COUNT_PATTERN = re.compile(r"\b" + COUNT_WORD + r"\s*(?:x\s*|instances?\s+(?:of\s+)?)?(?:(?:ec2|rds)\s+)?$")
+# a count right after it: "t3.micro x 2", "t3.micro 2 instances", "t3.micro (2 instances)"
+TRAILING_COUNT_PATTERN = re.compile(
+    r"^\s*(?:instances?\s*)?(?:x\s*(\d+)\b|\(?\s*" + COUNT_WORD + r"\s+(?:instances?|servers?|nodes?)\b)"
+)
+HOURS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(?:hours?|hrs?|h)\s*(?:per|a|/|each)\s*day|(?:1日|一日)\s*(\d+(?:\.\d+)?)\s*時間")
+COUNT_PATTERN_JA = re.compile(r"(\d+)\s*台")
+# RDS_HOURLY_PRICES are MySQL prices, other engines are left unpriced
+RDS_ENGINE_PATTERN = re.compile(r"\b(mysql|postgres(?:ql)?|sql server|mssql|oracle|mariadb|aurora|db2)\b")
+STORAGE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(gb|gib|tb|tib)\b(?:\s+(?:of\s+)?([a-z0-9]+))?")
+REGION_PATTERN = re.compile(r"\b((?:us|eu|ap|ca|sa|me|af)-[a-z]+-\d)\b")
+CLAUSE_SEPARATORS = re.compile(r",|;|\n|、|\band\b|\bwith\b|\bplus\b|\+")
+SERVICE_MENTION = re.compile(
+    r"\b(ec2|rds|s3|ebs|instance|server|database|bucket|storage|cluster|lambda|redshift|elasticache"
+    r"|dynamodb|cloudfront|load balancer|alb|nlb|nat)\b"
+)
+
+
+@dataclass
+class LineItem:
+    service: str
+    configuration: str
+    quantity: float
+    unit: str
+    unit_price: float
+    usage_per_month: float
+
+    @property
+    def monthly_cost(self) -> float:
+        return self.quantity * self.unit_price * self.usage_per_month
+
+    @property
+    def key(self) -> tuple:
+        """Identity of the priced component, independent of how much of it is used."""
+        return (self.service, self.configuration.split(",")[0])
+
+
+@dataclass
+class QuickEstimate:
+    architecture: str
+    region: str
+    line_items: list[LineItem] = field(default_factory=list)
+    unpriced: list[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        return sum(item.monthly_cost for item in self.line_items)
+
+    def to_markdown(self) -> str:
+        japanese = bool(re.search(r"[぀-ヿ一-鿿]", self.architecture))
+        labels = QUICK_LABELS["ja" if japanese else "en"]
+        architecture, service, configuration, unit_price, monthly_cost, total, discussion = labels["headings"]
+
+        lines = [
+            f"## {architecture}",
+            f"- {self.architecture.replace('[quick]', '').strip()}",
+            f"- Region: {self.region}",
+            "",
+            f"| {service} | {configuration} | {unit_price} | {monthly_cost} |",
+            "|---------|--------------|------------|--------------|",
+        ]
+        for item in self.line_items:
+            quantity = f"{item.quantity:g} x " if item.unit == "hour" and item.quantity != 1 else ""
+            lines.append(
+                f"| {item.service} | {quantity}{item.configuration} | ${item.unit_price:.4f} per {item.unit} | ${item.monthly_cost:.2f} |"
+            )
+        lines += [
+            f"| **{total}** | | | **${self.total:.2f}** |",
+            "",
+            f"## {discussion}",
+            "- " + labels["source"].format(version=PRICE_TABLE_VERSION, hours=HOURS_PER_MONTH),
+            "- " + labels["excluded"],
+        ]
+        if self.region not in ("us-east-1", "us-east-2", "us-west-2"):
+            lines.append("- " + labels["approximated"].format(region=self.region))
+        for text in self.unpriced:
+            lines.append("- " + labels["unpriced"].format(text=text))
+        return "\n".join(lines)
+
+
+def _count_value(word: str) -> int:
+    return int(word) if word.isdigit() else NUMBER_WORDS[word]
+
+
+def _count(text: str, start: int, end: int) -> int:
+    match = COUNT_PATTERN.search(text[:start])
+    if match:
+        return _count_value(match.group(1))
+
+    match = TRAILING_COUNT_PATTERN.search(text[end:])
+    if match:
+        return _count_value(match.group(1) or match.group(2))
+
+    match = COUNT_PATTERN_JA.search(text, start)
+    return int(match.group(1)) if match else 1
+
+
+def _rds_engine(clause: str, text: str) -> str:
+    """The database engine of a clause, or of the whole architecture if it names only one."""
+    match = RDS_ENGINE_PATTERN.search(clause)
+    if match:
+        return match.group(1)
+    engines = {match.group(1) for match in RDS_ENGINE_PATTERN.finditer(text)}
+    return engines.pop() if len(engines) == 1 else "mysql"
+
+
+def _hours_per_month(text: str) -> float:
+    match = HOURS_PATTERN.search(text)
+    if match:
+        return float(match.group(1) or match.group(2)) * HOURS_PER_MONTH / 24
+    return HOURS_PER_MONTH
+
+
+def parse_line_items(architecture: str, region: str) -> tuple[list[LineItem], list[str]]:
+    """Split an architecture description into priced line items and clauses that could not be priced."""
+    factor = REGION_PRICE_FACTORS.get(region)
+    line_items: list[LineItem] = []
+    unpriced: list[str] = []
+    text = architecture.lower().replace("[quick]", "")
+    shared_hours = _hours_per_month(text)
+    # storage mentioned right after a database ("a db.t3.micro with 20 GB") belongs to the database
+    previous_service = None
+
+    for clause in CLAUSE_SEPARATORS.split(text):
+        clause = clause.strip()
+        if not clause:
+            continue
+
+        priced = False
+        for match in INSTANCE_TYPE_PATTERN.finditer(clause):
+            instance_type = match.group(1)
+            count = _count(clause, match.start(), match.end())
+            hours = _hours_per_month(clause) if HOURS_PATTERN.search(clause) else shared_hours
+            table, service = (
+                (RDS_HOURLY_PRICES, "RDS") if instance_type.startswith("db.") else (EC2_HOURLY_PRICES, "EC2")
+            )
+            previous_service = service
+            engine = _rds_engine(clause, text) if service == "RDS" else "mysql"
+            if engine != "mysql":
+                unpriced.append(f"{instance_type} ({engine})")
+                priced = True
+            elif instance_type in table and factor is not None:
+                line_items.append(LineItem(
+                    service=service,
+                    configuration=f"{instance_type}, {hours * 24 / HOURS_PER_MONTH:g} hours/day",
+                    quantity=count,
+                    unit="hour",
+                    unit_price=round(table[instance_type] * factor, 6),
+                    usage_per_month=hours,
+                ))
+                priced = True
+            else:
+                unpriced.append(instance_type)
+                priced = True
+
+        for match in STORAGE_PATTERN.finditer(clause):
+            size = float(match.group(1)) * (1024 if match.group(2).startswith("t") else 1)
+            kind = match.group(3) or ""
+            if "s3" in clause:
+                storage, service = "s3", "S3"
+            elif "rds" in clause or "database" in clause or (previous_service == "RDS" and not kind.startswith(("gp", "io", "ebs"))):
+                storage, service = "rds", "RDS Storage"
+            else:
+                storage, service = (kind if kind in STORAGE_PRICES else "gp3"), "EBS"
+            if factor is None:
+                unpriced.append(match.group(0))
+                continue
+            line_items.append(LineItem(
+                service=service,
+                configuration=f"{storage}, {size:g} GB",
+                quantity=size,
+                unit="GB-month",
+                unit_price=round(STORAGE_PRICES[storage] * factor, 6),
+                usage_per_month=1,
+            ))
+            priced = True
+
+        if not priced and SERVICE_MENTION.search(clause):
+            unpriced.append(clause)
+
+    return line_items, unpriced
+
+
+def detect_region(architecture: str, default: str = DEFAULT_REGION) -> str:
+    match = REGION_PATTERN.search(architecture.lower())
+    return match.group(1) if match else default
+
+
+def quick_estimate(architecture: str, region: Optional[str] = None) -> Optional[QuickEstimate]:
+    """Price an architecture from the local table, or None when nothing in it could be recognized."""
+    region = detect_region(architecture, region or DEFAULT_REGION)
+    line_items, unpriced = parse_line_items(architecture, region)
+    if not line_items:
+        return None
+    return QuickEstimate(architecture=architecture, region=region, line_items=line_items, unpriced=unpriced)
@@ -0,0 +1,250 @@
+"""
+Record and replay of estimator sessions
+
+A SessionRecorder appends every model stream (request key and response
+chunks), every pricing tool call and every calculation of an estimator, with
+timestamps and durations, to a JSON lines file. Raw MCP results are recorded
+below the pricing cache and result shaping, so replaying a recording still
+runs the estimator's own code path on top of it.
+
+A Recording loaded from such a file stands in for the live services: the
+model, the pricing tools and the calculation backend answer from the recorded
+entries, matched by a hash of their request. A request that was not recorded
+(e.g. because a newer version changed the prompt) is answered with the next
+unused entry of its kind, so versions can be compared on the same traffic.
+
+Record types, one JSON object per line:
+    {"kind": "tool_spec", "t": ..., "name": ..., "spec": {...}}
+    {"kind": "model", "t": ..., "key": ..., "seconds": ..., "chunks": [[offset_seconds, event], ...]}
+    {"kind": "structured_output", "t": ..., "key": ..., "name": <output model>, "seconds": ..., "chunks": [...]}
+    {"kind": "tool", "t": ..., "key": ..., "name": ..., "input": {...}, "seconds": ..., "result": {...}}
+    {"kind": "calculation", "t": ..., "key": ..., "code": ..., "seconds": ..., "output": ...}
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional
+
+from strands.types.tools import AgentTool, ToolGenerator, ToolResult, ToolSpec, ToolUse
+
+from cost_estimator_agent.calculation_backend import CalculationBackend
+from cost_estimator_agent.tool_wrappers import DelegatingTool, normalize_arguments
+
+logger = logging.getLogger(__name__)
+
+
+class MissingRecordingError(Exception):
+    """Raised when a replay needs a model response the recording does not have."""
+
+
+def request_key(*parts: Any) -> str:
+    payload = json.dumps(list(parts), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class SessionRecorder:
+    """Append-only JSON lines file of everything the estimator exchanged with its services."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._recorded_specs: set[str] = set()
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, **fields: Any) -> None:
+        line = json.dumps({"kind": kind, "t": round(time.time(), 6), **fields}, separators=(",", ":"), default=str)
+        # one write per record under a lock keeps lines of concurrent estimates whole
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def record_tool_spec(self, tool: AgentTool) -> None:
+        with self._lock:
+            if tool.tool_name in self._recorded_specs:
+                return
+            self._recorded_specs.add(tool.tool_name)
+        self.record("tool_spec", name=tool.tool_name, spec=tool.tool_spec)
+
+
+class Recording:
+    """Entries of a SessionRecorder file, handed out once each."""
+
+    def __init__(self, path: str, realtime: bool = False):
+        self.path = os.path.expanduser(path)
+        # sleep for the recorded durations, to reproduce end-to-end latencies
+        self.realtime = realtime
+        self.tool_specs: dict[str, ToolSpec] = {}
+        self.entries: dict[str, list[dict]] = defaultdict(list)
+        self._by_key: dict[tuple[str, str], list[int]] = defaultdict(list)
+        self._used: dict[str, set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["kind"] == "tool_spec":
+                    self.tool_specs[entry["name"]] = entry["spec"]
+                    continue
+                self._by_key[(entry["kind"], entry["key"])].append(len(self.entries[entry["kind"]]))
+                self.entries[entry["kind"]].append(entry)
+        logger.info(f"📼 Loaded recording {self.path}: " + ", ".join(f"{len(v)} {k}" for k, v in self.entries.items()))
+
+    def take(self, kind: str, key: str, name: Optional[str] = None) -> Optional[dict]:
+        """The recorded entry of the request, or the next unused entry of its kind (and tool name)."""
+        with self._lock:
+            used = self._used[kind]
+            for index in self._by_key.get((kind, key), []):
+                if index not in used:
+                    used.add(index)
+                    return self.entries[kind][index]
+
+            for index, entry in enumerate(self.entries[kind]):
+                if index not in used and (name is None or entry.get("name") == name):
+                    used.add(index)
+                    logger.warning(f"⚠️ No recorded {kind} for this request, replaying the next {kind} entry")
+                    return entry
+        return None
+
+    def pricing_tools(self) -> list[AgentTool]:
+        return [ReplayTool(spec, self) for spec in self.tool_specs.values()]
+
+
+class RecordingTool(DelegatingTool):
+    """Record every call of a pricing tool and its result."""
+
+    def __init__(self, tool: AgentTool, recorder: SessionRecorder):
+        super().__init__(tool)
+        self.recorder = recorder
+        recorder.record_tool_spec(tool)
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        start = time.perf_counter()
+        event = None
+        async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+            yield event
+
+        if isinstance(event, dict):
+            tool_input = tool_use.get("input") or {}
+            self.recorder.record(
+                "tool",
+                key=request_key(self.tool_name, normalize_arguments(tool_input)),
+                name=self.tool_name,
+                input=tool_input,
+                seconds=round(time.perf_counter() - start, 6),
+                result={"status": event.get("status"), "content": event.get("content", [])},
+            )
+
+
+class ReplayTool(AgentTool):
+    """A pricing tool that answers from a Recording."""
+
+    def __init__(self, spec: ToolSpec, recording: Recording):
+        super().__init__()
+        self.spec = spec
+        self.recording = recording
+
+    @property
+    def tool_name(self) -> str:
+        return self.spec["name"]
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self.spec
+
+    @property
+    def tool_type(self) -> str:
+        return "replay"
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        tool_input = tool_use.get("input") or {}
+        entry = self.recording.take("tool", request_key(self.tool_name, normalize_arguments(tool_input)), self.tool_name)
+        if entry is None:
+            yield ToolResult(
+                toolUseId=tool_use["toolUseId"],
+                status="error",
+                content=[{"text": f"No recorded result of {self.tool_name} to replay"}],
+            )
+            return
+
+        if self.recording.realtime:
+            await asyncio.sleep(entry["seconds"])
+        yield ToolResult(toolUseId=tool_use["toolUseId"], status=entry["result"]["status"], content=entry["result"]["content"])
+
+
+class RecordingCalculationBackend(CalculationBackend):
+    """Record the code and output of every calculation of the wrapped backend."""
+
+    def __init__(self, backend: CalculationBackend, recorder: SessionRecorder):
+        self.backend = backend
+        self.recorder = recorder
+        self.name = backend.name
+
+    def start(self) -> None:
+        self.backend.start()
+
+    def stop(self) -> None:
+        self.backend.stop()
+
+    @property
+    def is_running(self) -> bool:
+        return self.backend.is_running
+
+    def is_healthy(self) -> bool:
+        return self.backend.is_healthy()
+
+    def is_expiring(self) -> bool:
+        return self.backend.is_expiring()
+
+    def isolated(self, code: str) -> str:
+        # isolated only on execution, so the recorded code is the same on every backend and in a replay
+        return code
+
+    def execute(self, code: str) -> str:
+        start = time.perf_counter()
+        output = self.backend.execute(self.backend.isolated(code))
+        self.recorder.record(
+            "calculation",
+            key=request_key(code),
+            code=code,
+            seconds=round(time.perf_counter() - start, 6),
+            output=output,
+        )
+        return output
+
+
+class ReplayCalculationBackend(CalculationBackend):
+    """A calculation backend that answers from a Recording."""
+
+    name = "replay"
+
+    def __init__(self, recording: Recording):
+        self.recording = recording
+        self.running = False
+
+    def start(self) -> None:
+        self.running = True
+
+    def stop(self) -> None:
+        self.running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self.running
+
+    def is_healthy(self) -> bool:
+        return self.running
+
+    def execute(self, code: str) -> str:
+        entry = self.recording.take("calculation", request_key(code))
+        if entry is None:
+            return "✖️ No recorded calculation to replay"
+        if self.recording.realtime:
+            time.sleep(entry["seconds"])
+        return entry["output"]
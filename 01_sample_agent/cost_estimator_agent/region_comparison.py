@@ -0,0 +1,237 @@
+"""
+Multi-region cost comparison
+
+Comparing regions with the agent means one full model loop per region,
+although only the unit prices differ. The architecture is instead parsed once
+into line items with the `[quick]` parser, every line item is turned into a
+`get_pricing` query, and the queries for all requested regions are sent to
+the pricing tools concurrently. Prices that cannot be looked up fall back to
+the local price table, approximated for the region.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from strands.types.tools import AgentTool
+
+from cost_estimator_agent.quick_estimate import LineItem, REGION_PRICE_FACTORS, parse_line_items
+from cost_estimator_agent.result_shaping import shape_pricing
+from cost_estimator_agent.config import DEFAULT_REGION, REGION_COMPARISON_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# (service code, attribute filters, price unit) of each quick estimate service; "{name}" is the
+# instance type or storage kind of the line item
+PRICING_QUERIES = {
+    "EC2": ("AmazonEC2", {
+        "instanceType": "{name}",
+        "operatingSystem": "Linux",
+        "tenancy": "Shared",
+        "preInstalledSw": "NA",
+        "capacitystatus": "Used",
+    }, "Hrs"),
+    "RDS": ("AmazonRDS", {
+        "instanceType": "{name}",
+        "databaseEngine": "MySQL",
+        "deploymentOption": "Single-AZ",
+    }, "Hrs"),
+    "EBS": ("AmazonEC2", {"volumeApiName": "{name}"}, "GB-Mo"),
+    "RDS Storage": ("AmazonRDS", {
+        "volumeType": "General Purpose",
+        "databaseEngine": "MySQL",
+        "deploymentOption": "Single-AZ",
+    }, "GB-Mo"),
+    "S3": ("AmazonS3", {"storageClass": "General Purpose", "volumeType": "Standard"}, "GB-Mo"),
+}
+
+
+@dataclass(frozen=True)
+class PricingQuery:
+    service_code: str
+    filters: tuple[tuple[str, str], ...]
+    # price unit to read from the result, None when the result has several priced dimensions
+    unit: Optional[str]
+
+    def tool_input(self, region: str) -> dict[str, Any]:
+        return {
+            "service_code": self.service_code,
+            "region": region,
+            "filters": [{"Field": name, "Value": value, "Type": "TERM_MATCH"} for name, value in self.filters],
+        }
+
+
+def pricing_query(item: LineItem) -> Optional[PricingQuery]:
+    if item.service not in PRICING_QUERIES:
+        return None
+    service_code, filters, unit = PRICING_QUERIES[item.service]
+    name = item.key[1]
+    return PricingQuery(service_code, tuple((attribute, value.format(name=name)) for attribute, value in filters.items()), unit)
+
+
+def unit_price(payload: Any, unit: str) -> Optional[float]:
+    """Lowest on-demand first-tier price in `unit` of a get_pricing result."""
+    shaped = payload if isinstance(payload, dict) and "products" in payload else shape_pricing(payload)
+    if not isinstance(shaped, dict):
+        return None
+
+    prices = []
+    for product in shaped.get("products", []):
+        for price in product["prices"]:
+            # tiered prices are compared by their first tier
+            if price.get("unit") != unit or (price.get("range") or ["0"])[0] not in ("0", None):
+                continue
+            try:
+                value = float(price["USD"])
+            except (TypeError, ValueError):
+                continue
+            if value > 0:
+                prices.append(value)
+    return min(prices) if prices else None
+
+
+@dataclass
+class RegionPrice:
+    unit_price: Optional[float]
+    # "pricing": looked up, "table": approximated from the local price table, "missing": not priced
+    source: str
+
+
+@dataclass
+class RegionComparison:
+    architecture: str
+    regions: list[str]
+    line_items: list[LineItem]
+    prices: dict[str, list[RegionPrice]] = field(default_factory=dict)
+    unpriced: list[str] = field(default_factory=list)
+
+    def monthly_cost(self, region: str, index: int) -> Optional[float]:
+        item, price = self.line_items[index], self.prices[region][index]
+        if price.unit_price is None:
+            return None
+        return item.quantity * price.unit_price * item.usage_per_month
+
+    def total(self, region: str) -> float:
+        return sum(cost for index in range(len(self.line_items)) if (cost := self.monthly_cost(region, index)) is not None)
+
+    def is_complete(self, region: str) -> bool:
+        return all(price.unit_price is not None for price in self.prices[region])
+
+    def cheapest_region(self) -> str:
+        # a region with unpriced line items only looks cheap
+        return min([region for region in self.regions if self.is_complete(region)] or self.regions, key=self.total)
+
+    def to_markdown(self) -> str:
+        lines = [
+            "## Architecture Description",
+            f"- {self.architecture.replace('[quick]', '').strip()}",
+            "",
+            "| Service | Configuration | " + " | ".join(self.regions) + " |",
+            "|---------|--------------|" + "--------------|" * len(self.regions),
+        ]
+        for index, item in enumerate(self.line_items):
+            quantity = f"{item.quantity:g} x " if item.unit == "hour" and item.quantity != 1 else ""
+            cells = []
+            for region in self.regions:
+                cost = self.monthly_cost(region, index)
+                marker = "*" if self.prices[region][index].source == "table" else ""
+                cells.append(f"${cost:.2f}{marker}" if cost is not None else "n/a")
+            lines.append(f"| {item.service} | {quantity}{item.configuration} | " + " | ".join(cells) + " |")
+        totals = [
+            f"**${self.total(region):.2f}**" + ("" if self.is_complete(region) else " (partial)")
+            for region in self.regions
+        ]
+        lines.append("| **Total** | | " + " | ".join(totals) + " |")
+
+        cheapest = self.cheapest_region()
+        lines += ["", "## Discussion Points", f"- Cheapest region: {cheapest} (${self.total(cheapest):.2f}/month)"]
+        for region in self.regions:
+            if region != cheapest and self.is_complete(region) and self.total(cheapest):
+                lines.append(f"- {region} costs {(self.total(region) / self.total(cheapest) - 1) * 100:+.1f}% compared to {cheapest}")
+        if any(price.source == "table" for prices in self.prices.values() for price in prices):
+            lines.append("- *: the price could not be looked up and is approximated from the local us-east-1 price table.")
+        if any(price.source == "missing" for prices in self.prices.values() for price in prices):
+            lines.append("- n/a: no price was found for the region; the total does not include it.")
+        lines.append("- Data transfer, requests and free tier are not included.")
+        for text in self.unpriced:
+            lines.append(f"- Not priced: {text}")
+        return "\n".join(lines)
+
+
+def _tool_payloads(result: dict) -> list[Any]:
+    payloads = []
+    for block in result.get("content", []):
+        if "json" in block:
+            payloads.append(block["json"])
+            continue
+        try:
+            payloads.append(json.loads(block.get("text", "")))
+        except ValueError:
+            pass
+    return payloads
+
+
+async def lookup_unit_price(tool: AgentTool, query: PricingQuery, region: str, semaphore: asyncio.Semaphore) -> Optional[float]:
+    """Price in `query.unit` of one get_pricing call, or None when the call fails or finds no price."""
+    tool_use = {"toolUseId": f"compare-{uuid.uuid4().hex[:8]}", "name": tool.tool_name, "input": query.tool_input(region)}
+    async with semaphore:
+        try:
+            result = None
+            async for event in tool.stream(tool_use, {}):
+                result = event
+        except Exception as e:
+            logger.warning(f"⚠️ Price lookup of {query.service_code} in {region} failed: {e}")
+            return None
+
+    if not isinstance(result, dict) or result.get("status") != "success":
+        return None
+    prices = [price for payload in _tool_payloads(result) if (price := unit_price(payload, query.unit)) is not None]
+    return min(prices) if prices else None
+
+
+async def compare_regions(
+    architecture: str,
+    regions: list[str],
+    pricing_tools: list[AgentTool],
+    max_concurrency: int = REGION_COMPARISON_MAX_CONCURRENCY
+) -> Optional[RegionComparison]:
+    """Price the architecture in every region, or None when nothing in it could be recognized."""
+    # parsed against the base region of the local price table, which is also the fallback
+    line_items, unpriced = parse_line_items(architecture, DEFAULT_REGION)
+    if not line_items:
+        return None
+
+    get_pricing = next((tool for tool in pricing_tools if tool.tool_name == "get_pricing"), None)
+    if get_pricing is None:
+        logger.warning("⚠️ No get_pricing tool, comparing regions from the local price table")
+
+    queries = [pricing_query(item) for item in line_items]
+    # identical line items (e.g. two clauses with the same instance type) share one lookup per region
+    lookups = {
+        (region, query): None
+        for region in regions
+        for query in queries
+        if query is not None and get_pricing is not None
+    }
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*(lookup_unit_price(get_pricing, query, region, semaphore) for region, query in lookups))
+    found = dict(zip(lookups, results))
+    logger.info(f"🌍 Looked up {len(lookups)} prices in {len(regions)} regions, {sum(r is not None for r in results)} found")
+
+    comparison = RegionComparison(architecture, regions, line_items, unpriced=unpriced)
+    for region in regions:
+        prices = []
+        for item, query in zip(line_items, queries):
+            price = found.get((region, query))
+            factor = REGION_PRICE_FACTORS.get(region)
+            if price is not None:
+                prices.append(RegionPrice(price, "pricing"))
+            elif factor is not None:
+                prices.append(RegionPrice(round(item.unit_price * factor, 6), "table"))
+            else:
+                prices.append(RegionPrice(None, "missing"))
+        comparison.prices[region] = prices
+    return comparison
@@ -0,0 +1,85 @@
+"""
+Whole-estimate result cache
+
+Caches finished estimate reports keyed on a canonical form of the
+architecture description, the region, the model ID and the version of the
+pricing data, so rewordings of the same request do not rerun the agent loop.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from typing import Optional
+
+from cost_estimator_agent.cache_store import DiskCache
+from cost_estimator_agent.config import (
+    RESULT_CACHE_PATH,
+    RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_MAX_ENTRIES,
+)
+from cost_estimator_agent.quick_estimate import NUMBER_WORDS
+
+logger = logging.getLogger(__name__)
+
+# phrasings that mean the same thing for pricing purposes
+SYNONYMS = [
+    (r"\b(hrs?|hours?)\b", "hours"),
+    (r"\bhours\s*(a|/|each)\s*day\b", "hours per day"),
+    (r"\b(24\s*/\s*7|24\s*x\s*7|always on|all day)\b", "24 hours per day"),
+    (r"\b(instances|servers?|machines?|vms?)\b", "instance"),
+    (r"\b(gib|gigabytes?)\b", "gb"),
+    (r"\b(tib|terabytes?)\b", "tb"),
+    (r"\bamazon\s+|\baws\s+", ""),
+]
+
+
+def canonicalize_architecture(architecture: str) -> str:
+    """Normalize casing, whitespace, punctuation, number words and common synonyms."""
+    text = architecture.lower()
+    for word, number in NUMBER_WORDS.items():
+        if word not in ("a", "an"):
+            text = re.sub(rf"\b{word}\b", str(number), text)
+    for pattern, replacement in SYNONYMS:
+        text = re.sub(pattern, replacement, text)
+    # keep the dots of instance types and decimals, drop other punctuation
+    text = re.sub(r"[^\w\s./-]|(?<!\w)\.|\.(?!\w)", " ", text)
+    return " ".join(text.split())
+
+
+class EstimateResultCache:
+    def __init__(
+        self,
+        path: str = RESULT_CACHE_PATH,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES
+    ):
+        self.store = DiskCache(path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    @staticmethod
+    def key(architecture: str, region: str, model_id: str, pricing_version: str) -> str:
+        payload = json.dumps([canonicalize_architecture(architecture), region, model_id, pricing_version])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, architecture: str, region: str, model_id: str, pricing_version: str) -> Optional[str]:
+        return self.store.get(self.key(architecture, region, model_id, pricing_version))
+
+    def set(self, architecture: str, region: str, model_id: str, pricing_version: str, result: str) -> None:
+        self.store.set(self.key(architecture, region, model_id, pricing_version), result)
+
+    def invalidate(
+        self,
+        architecture: Optional[str] = None,
+        region: Optional[str] = None,
+        model_id: Optional[str] = None,
+        pricing_version: Optional[str] = None
+    ) -> None:
+        """Drop one cached estimate, or every cached estimate when no architecture is given."""
+        if architecture is None:
+            logger.info("🧽 Clearing estimate result cache")
+            self.store.invalidate()
+        else:
+            self.store.invalidate(self.key(architecture, region, model_id, pricing_version))
+
+    def stats(self) -> dict[str, int]:
+        return self.store.stats()
@@ -0,0 +1,189 @@
+"""
+Shaping of pricing tool results before they reach the model
+
+`get_pricing` returns full price-list records (every attribute and every
+reserved term) and `get_pricing_attribute_values` can return thousands of
+values. Both are sent back to the model on every later turn, so their
+results are projected onto the fields needed for costing, de-duplicated and
+capped, with a summary of what was left out.
+
+Understands the records of the AWS Pricing MCP server (`product`/`terms`)
+as well as the flattened records of the offline price index (`prices`).
+"""
+
+import json
+from typing import Any, Optional
+
+from cost_estimator_agent.config import (
+    PRICING_RESULT_ATTRIBUTES,
+    PRICING_RESULT_TERM_TYPES,
+    PRICING_RESULT_MAX_PRODUCTS,
+    PRICING_RESULT_MAX_VALUES,
+)
+
+
+def _price_dimensions(record: dict[str, Any]) -> list[dict[str, Any]]:
+    """Flatten the price dimensions of one record, keeping only the configured term types."""
+    if "prices" in record:
+        dimensions = record["prices"]
+    else:
+        dimensions = [
+            {"termType": term_type, **dimension}
+            for term_type, offers in (record.get("terms") or {}).items()
+            for offer in offers.values()
+            for dimension in (offer.get("priceDimensions") or {}).values()
+        ]
+
+    prices = []
+    for dimension in dimensions:
+        if dimension.get("termType") not in PRICING_RESULT_TERM_TYPES:
+            continue
+        price = {
+            "unit": dimension.get("unit"),
+            "USD": (dimension.get("pricePerUnit") or {}).get("USD"),
+            "description": dimension.get("description"),
+        }
+        # tiered prices (S3, data transfer) need their range, flat prices do not
+        if dimension.get("beginRange") not in (None, "0") or dimension.get("endRange") not in (None, "Inf"):
+            price["range"] = [dimension.get("beginRange"), dimension.get("endRange")]
+        prices.append(price)
+    return prices
+
+
+def project_price_record(record: dict[str, Any]) -> dict[str, Any]:
+    product = record.get("product", record)
+    attributes = product.get("attributes") or {}
+    return {
+        "sku": product.get("sku"),
+        "productFamily": product.get("productFamily"),
+        "attributes": {name: attributes[name] for name in PRICING_RESULT_ATTRIBUTES if name in attributes},
+        "prices": _price_dimensions(record),
+    }
+
+
+def _unit_prices(records: list[dict[str, Any]]) -> list[float]:
+    prices = []
+    for record in records:
+        for price in record["prices"]:
+            try:
+                prices.append(float(price["USD"]))
+            except (TypeError, ValueError):
+                pass
+    return prices
+
+
+def shape_pricing(payload: Any, max_products: int = PRICING_RESULT_MAX_PRODUCTS) -> Any:
+    """Project, de-duplicate and cap the records of a get_pricing result."""
+    records = payload.get("data") if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        return payload
+
+    shaped: dict[str, dict[str, Any]] = {}
+    for record in records:
+        if isinstance(record, str):
+            record = json.loads(record)
+        projected = project_price_record(record)
+        # records that only differ in SKU and dropped attributes are the same price for costing
+        key = json.dumps([projected["attributes"], projected["prices"]], sort_keys=True)
+        if key in shaped:
+            shaped[key]["duplicates"] = shaped[key].get("duplicates", 0) + 1
+        else:
+            shaped[key] = projected
+
+    products = list(shaped.values())
+    result: dict[str, Any] = {"products": products[:max_products]}
+    if len(products) > max_products:
+        omitted = products[max_products:]
+        unit_prices = _unit_prices(omitted)
+        result["omitted"] = {
+            "count": len(omitted),
+            **({"min_USD": min(unit_prices), "max_USD": max(unit_prices)} if unit_prices else {}),
+            "hint": "Add filters (e.g. instanceType, operatingSystem, tenancy) to narrow the results.",
+        }
+
+    if isinstance(payload, dict):
+        result = {
+            **{key: value for key, value in payload.items() if key in ("status", "service_name", "next_token")},
+            **result,
+        }
+    return result
+
+
+def shape_attribute_values(payload: Any, max_values: int = PRICING_RESULT_MAX_VALUES) -> Any:
+    """Cap each value list of a get_pricing_attribute_values result."""
+    values_by_name = payload.get("data", payload) if isinstance(payload, dict) else payload
+    if not isinstance(values_by_name, dict):
+        return payload
+
+    shaped = {}
+    for name, values in values_by_name.items():
+        if isinstance(values, list) and len(values) > max_values:
+            shaped[name] = {"values": values[:max_values], "total": len(values)}
+        else:
+            shaped[name] = values
+    return shaped
+
+
+SHAPERS = {
+    "get_pricing": shape_pricing,
+    "get_pricing_attribute_values": shape_attribute_values,
+}
+
+
+def shape_tool_content(tool_name: str, content: list[dict[str, Any]]) -> Optional[list[dict[str, Any]]]:
+    """Shaped tool result content, or None if the result is not a pricing payload that can be shaped."""
+    shaper = SHAPERS.get(tool_name)
+    if shaper is None:
+        return None
+
+    shaped_content = []
+    for block in content:
+        if "json" in block:
+            shaped_content.append({"json": shaper(block["json"])})
+            continue
+        try:
+            payload = json.loads(block.get("text", ""))
+        except ValueError:
+            shaped_content.append(block)
+            continue
+        shaped_content.append({"text": json.dumps(shaper(payload), ensure_ascii=False, separators=(",", ":"))})
+    return shaped_content
+
+
+def _digest_product(product: dict[str, Any]) -> str:
+    attributes = " ".join(str(value) for value in product.get("attributes", {}).values())
+    prices = ", ".join(f"{price.get('USD')} USD/{price.get('unit')}" for price in product.get("prices", []))
+    return f"{product.get('sku')} {attributes}: {prices or 'no OnDemand price'}"
+
+
+def digest_payload(tool_name: str, payload: Any, max_items: int = 10) -> str:
+    """One-line-per-item summary of a pricing tool result that the model has already used."""
+    if tool_name == "get_pricing":
+        # results reach the conversation already shaped unless shaping is disabled
+        shaped = payload if isinstance(payload, dict) and "products" in payload else shape_pricing(payload)
+        if isinstance(shaped, dict) and "products" in shaped:
+            products = shaped["products"]
+            lines = [_digest_product(product) for product in products[:max_items]]
+            omitted = max(len(products) - max_items, 0) + shaped.get("omitted", {}).get("count", 0)
+            if omitted:
+                lines.append(f"... {omitted} more products")
+            return "\n".join(lines) or "no products"
+
+    if tool_name == "get_pricing_attribute_values":
+        shaped = shape_attribute_values(payload)
+        if isinstance(shaped, dict):
+            lines = []
+            for name, values in shaped.items():
+                total = values["total"] if isinstance(values, dict) else len(values) if isinstance(values, list) else 0
+                values = values["values"] if isinstance(values, dict) else values
+                if not isinstance(values, list):
+                    lines.append(f"{name}: {values}")
+                    continue
+                more = f" ... ({total} values)" if total > max_items else ""
+                lines.append(f"{name}: {', '.join(map(str, values[:max_items]))}{more}")
+            return "\n".join(lines)
+
+    if isinstance(payload, list) and len(payload) > max_items:
+        return f"{', '.join(map(str, payload[:max_items]))} ... ({len(payload)} items)"
+
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,390 @@
+"""
+Long-running HTTP estimation service
+
+Serves AWSCostEstimatorAgent over the Bedrock AgentCore runtime protocol
+(`POST /invocations`, `GET /ping`) from one process. A pool of estimators
+keeps warm sessions; each request borrows one for the length of its estimate
+and streams the estimate's progress events back as server-sent events.
+
+Backpressure:
+    - at most `max_queue` requests wait for a free estimator, further requests
+      are rejected with 503 and a Retry-After header before any work is done
+    - every request has a deadline that covers waiting and estimating
+    - `/ping` reports HealthyBusy while no estimator is free, so the runtime
+      routes new sessions elsewhere
+
+Request body:
+    {"prompt": "<architecture description>", "timeout": <seconds, optional>}
+The client's timeout can only shorten the server's request deadline (`--timeout`).
+A body without a prompt or with an invalid timeout is rejected with 400.
+
+Usage:
+    $ python -m cost_estimator_agent.server --pool-size 4 --max-queue 16
+    $ curl -N localhost:8080/invocations -d '{"prompt": "One t3.micro EC2 instance running 24/7"}'
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+from typing import AsyncGenerator, Callable, Optional
+
+from bedrock_agentcore.runtime import BedrockAgentCoreApp
+from bedrock_agentcore.runtime.models import PingStatus
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from cost_estimator_agent.cost_estimator_agent import AWSCostEstimatorAgent
+from cost_estimator_agent.instrumentation import MetricsCollector
+from cost_estimator_agent.config import (
+    DEFAULT_REGION,
+    QUICK_OPTION,
+    SERVER_POOL_SIZE,
+    SERVER_MAX_QUEUE,
+    SERVER_REQUEST_TIMEOUT_SECONDS,
+    SERVER_RETRY_AFTER_SECONDS,
+    SERVER_PORT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when a request arrives while the wait queue of the estimator pool is full."""
+
+
+class InvalidRequestError(ValueError):
+    """Raised for request payloads the service cannot estimate."""
+
+
+class EstimatorPool:
+    """Fixed set of warm estimators that are lent to one request at a time."""
+
+    def __init__(self, factory: Callable[[], AWSCostEstimatorAgent], size: int, max_queue: int):
+        self.factory = factory
+        self.size = size
+        self.max_queue = max_queue
+        self.estimators: list[AWSCostEstimatorAgent] = []
+        self.waiting = 0
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def start(self) -> None:
+        logger.info(f"🔥 Starting {self.size} warm estimator sessions...")
+        self.estimators = [self.factory() for _ in range(self.size)]
+        # session setup blocks on network calls, start all of them at the same time off the event loop
+        await asyncio.gather(*(asyncio.to_thread(estimator.start_session) for estimator in self.estimators))
+
+        self._idle = asyncio.Queue()
+        for estimator in self.estimators:
+            self._idle.put_nowait(estimator)
+        logger.info("✅ Estimator pool is ready")
+
+    async def stop(self) -> None:
+        await asyncio.gather(
+            *(asyncio.to_thread(estimator.stop_session) for estimator in self.estimators),
+            return_exceptions=True
+        )
+        self.estimators = []
+        self._idle = None
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize() if self._idle else 0
+
+    @property
+    def capacity(self) -> int:
+        """Requests that can be admitted at the same time: one per estimator plus the wait queue."""
+        return self.size + self.max_queue
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, timeout: float) -> AsyncGenerator[AWSCostEstimatorAgent, None]:
+        if self._idle is None:
+            raise RuntimeError("Estimator pool is not started")
+        if self.idle == 0 and self.waiting >= self.max_queue:
+            raise PoolExhaustedError(f"{self.waiting} requests are already waiting for an estimator")
+
+        self.waiting += 1
+        try:
+            estimator = await asyncio.wait_for(self._idle.get(), timeout)
+        finally:
+            self.waiting -= 1
+
+        try:
+            yield estimator
+        finally:
+            self._idle.put_nowait(estimator)
+
+
+class EstimationApp(BedrockAgentCoreApp):
+    """BedrockAgentCoreApp that lets `max_invocations` handler calls run at the same time.
+
+    bedrock-agentcore 0.1.1 rejects a third concurrent handler call with 503 through the private
+    `_invocation_semaphore`; admission is limited by LoadSheddingMiddleware instead, which lets the
+    pool queue bursts. Construction fails if a newer version no longer has the attribute, rather
+    than silently going back to the limit of 2.
+    """
+
+    def __init__(self, max_invocations: int, debug: bool = False):
+        super().__init__(debug=debug)
+        if not isinstance(getattr(self, "_invocation_semaphore", None), asyncio.Semaphore):
+            raise RuntimeError(
+                "BedrockAgentCoreApp has no _invocation_semaphore (written against bedrock-agentcore 0.1.1), "
+                "check how this version limits concurrent invocations"
+            )
+        self._invocation_semaphore = asyncio.Semaphore(max_invocations)
+
+
+class LoadSheddingMiddleware:
+    """Admit at most `pool.capacity` invocations and reject the rest with 503 before the body is read.
+
+    Admitted requests whose body the service cannot estimate are rejected with 400 before the
+    event stream starts. A streamed estimate is admitted until its last event has been sent.
+    """
+
+    def __init__(self, app, service: "EstimationService"):
+        self.app = app
+        self.service = service
+
+    @staticmethod
+    async def _send_json(send, status: int, content: dict, headers: tuple = ()) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), *headers],
+        })
+        await send({"type": "http.response.body", "body": json.dumps(content).encode()})
+
+    @staticmethod
+    async def _read_body(receive) -> Optional[bytes]:
+        """The whole request body, None if the client disconnected."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/invocations":
+            await self.app(scope, receive, send)
+            return
+
+        if self.service.admitted >= self.service.pool.capacity:
+            self.service.count("rejected")
+            await self._send_json(
+                send, 503, {"error": "Server busy - estimation queue is full"},
+                ((b"retry-after", str(SERVER_RETRY_AFTER_SECONDS).encode()),)
+            )
+            return
+
+        self.service.admitted += 1
+        try:
+            body = await self._read_body(receive)
+            if body is None:
+                return
+            error = self.service.validate_request(body)
+            if error:
+                self.service.count("invalid")
+                await self._send_json(send, 400, {"error": error})
+                return
+
+            body_sent = False
+
+            async def replay_body():
+                # the app reads the body again; later calls still see the client's disconnect
+                nonlocal body_sent
+                if body_sent:
+                    return await receive()
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            await self.app(scope, replay_body, send)
+        finally:
+            self.service.admitted -= 1
+
+
+class EstimationService:
+    """BedrockAgentCoreApp serving streamed estimates from an EstimatorPool."""
+
+    def __init__(
+        self,
+        region: str = DEFAULT_REGION,
+        pool_size: int = SERVER_POOL_SIZE,
+        max_queue: int = SERVER_MAX_QUEUE,
+        request_timeout: float = SERVER_REQUEST_TIMEOUT_SECONDS,
+        estimator_factory: Optional[Callable[[], AWSCostEstimatorAgent]] = None
+    ):
+        self.region = region
+        self.request_timeout = request_timeout
+        self.metrics = MetricsCollector()
+        self.requests: dict[str, int] = {}
+        self.admitted = 0
+        self.pool = EstimatorPool(estimator_factory or self._create_estimator, pool_size, max_queue)
+        self.app = self._create_app()
+
+    def _create_estimator(self) -> AWSCostEstimatorAgent:
+        estimator = AWSCostEstimatorAgent(region=self.region)
+        # all estimators report into the service's metrics
+        estimator.metrics = self.metrics
+        return estimator
+
+    def _create_app(self) -> EstimationApp:
+        app = EstimationApp(self.pool.capacity)
+        app.router.lifespan_context = self._lifespan
+        app.router.routes.append(Route("/metrics", self._handle_metrics, methods=["GET"]))
+        app.add_middleware(LoadSheddingMiddleware, service=self)
+
+        # the decorators set attributes on the handler, which bound methods do not allow
+        @app.entrypoint
+        async def invoke(payload: dict) -> AsyncGenerator[dict, None]:
+            async for event in self.invoke(payload):
+                yield event
+
+        @app.ping
+        def ping() -> PingStatus:
+            return self.ping_status()
+
+        return app
+
+    @contextlib.asynccontextmanager
+    async def _lifespan(self, app) -> AsyncGenerator[None, None]:
+        await self.pool.start()
+        try:
+            yield
+        finally:
+            logger.info("🧹 Stopping estimator pool...")
+            await self.pool.stop()
+
+    def count(self, status: str) -> None:
+        self.requests[status] = self.requests.get(status, 0) + 1
+
+    def ping_status(self) -> PingStatus:
+        return PingStatus.HEALTHY_BUSY if self.pool.idle == 0 else PingStatus.HEALTHY
+
+    def metrics_text(self) -> str:
+        lines = [
+            "# HELP cost_estimator_server_requests_total Finished requests by status.",
+            "# TYPE cost_estimator_server_requests_total counter",
+            *(f'cost_estimator_server_requests_total{{status="{status}"}} {count}' for status, count in sorted(self.requests.items())),
+            "# HELP cost_estimator_server_idle_estimators Estimators that are free to take a request.",
+            "# TYPE cost_estimator_server_idle_estimators gauge",
+            f"cost_estimator_server_idle_estimators {self.pool.idle}",
+            "# HELP cost_estimator_server_waiting_requests Requests waiting for a free estimator.",
+            "# TYPE cost_estimator_server_waiting_requests gauge",
+            f"cost_estimator_server_waiting_requests {self.pool.waiting}",
+        ]
+        return self.metrics.to_prometheus() + "\n".join(lines) + "\n"
+
+    async def _handle_metrics(self, request) -> PlainTextResponse:
+        return PlainTextResponse(self.metrics_text())
+
+    def _request_timeout_seconds(self, payload: dict) -> float:
+        """Deadline of the request in seconds; a client timeout may shorten the server's, not extend it."""
+        client_timeout = payload.get("timeout")
+        if client_timeout is None:
+            return self.request_timeout
+        try:
+            # bool is an int, but {"timeout": true} is not a number of seconds
+            if isinstance(client_timeout, bool):
+                raise TypeError
+            seconds = float(client_timeout)
+        except (TypeError, ValueError):
+            raise InvalidRequestError(f"'timeout' must be a number of seconds, got {client_timeout!r}")
+        if not math.isfinite(seconds) or seconds <= 0:
+            raise InvalidRequestError(f"'timeout' must be a positive number of seconds, got {client_timeout!r}")
+        return min(seconds, self.request_timeout)
+
+    @staticmethod
+    def _architecture_description(payload: dict) -> str:
+        architecture_description = payload.get("prompt") or payload.get("architecture")
+        if not architecture_description:
+            raise InvalidRequestError("Missing 'prompt' with the architecture description")
+        return architecture_description
+
+    def validate_request(self, body: bytes) -> Optional[str]:
+        """Why the request body cannot be estimated, or None; malformed JSON is left to BedrockAgentCoreApp."""
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return "Request body must be a JSON object"
+        try:
+            self._architecture_description(payload)
+            self._request_timeout_seconds(payload)
+        except InvalidRequestError as e:
+            return str(e)
+        return None
+
+    async def invoke(self, payload: dict) -> AsyncGenerator[dict, None]:
+        """Stream the events of `AWSCostEstimatorAgent.estimate_costs_stream`, or a single "error" event."""
+        loop = asyncio.get_running_loop()
+        architecture_description = ""
+        status = "error"
+        try:
+            architecture_description = self._architecture_description(payload)
+            deadline = loop.time() + self._request_timeout_seconds(payload)
+            async with self.pool.acquire(deadline - loop.time()) as estimator:
+                if QUICK_OPTION in architecture_description:
+                    quick = estimator.estimate_costs_quick(architecture_description)
+                    if quick:
+                        status = "success"
+                        yield {"type": "result", "data": quick}
+                        return
+
+                stream = estimator.estimate_costs_stream(architecture_description)
+                try:
+                    while True:
+                        try:
+                            event = await asyncio.wait_for(anext(stream), deadline - loop.time())
+                        except StopAsyncIteration:
+                            break
+                        yield event
+                    status = "success"
+                finally:
+                    await stream.aclose()
+        except InvalidRequestError as e:
+            status = "invalid"
+            yield {"type": "error", "error": str(e)}
+        except PoolExhaustedError as e:
+            status = "rejected"
+            yield {"type": "error", "error": f"Server busy: {e}"}
+        except asyncio.TimeoutError:
+            status = "timeout"
+            logger.warning(f"⌛ Estimate exceeded its deadline: {architecture_description[:80]}")
+            yield {"type": "error", "error": "Estimate exceeded its deadline"}
+        except Exception as e:
+            logger.exception(f"✖️ Estimate request failed: {e}")
+            yield {"type": "error", "error": str(e)}
+        finally:
+            self.count(status)
+
+
+def parse_argument():
+    parser = argparse.ArgumentParser(description="Serve AWS cost estimates over HTTP")
+    parser.add_argument('--region', default=DEFAULT_REGION, help=f'AWS region (default: {DEFAULT_REGION})')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help=f'Port to serve on (default: {SERVER_PORT})')
+    parser.add_argument('--host', help='Host to bind to (default: auto-detected)')
+    parser.add_argument('--pool-size', type=int, default=SERVER_POOL_SIZE, help=f'Warm estimator sessions (default: {SERVER_POOL_SIZE})')
+    parser.add_argument('--max-queue', type=int, default=SERVER_MAX_QUEUE, help=f'Requests that may wait for an estimator (default: {SERVER_MAX_QUEUE})')
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=SERVER_REQUEST_TIMEOUT_SECONDS,
+        help=f'Deadline of one request in seconds (default: {SERVER_REQUEST_TIMEOUT_SECONDS})'
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_argument()
+    service = EstimationService(args.region, args.pool_size, args.max_queue, args.timeout)
+    service.app.run(port=args.port, host=args.host)
+
+
+if __name__ == '__main__':
+    main()
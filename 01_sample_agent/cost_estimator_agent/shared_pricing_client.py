@@ -0,0 +1,138 @@
+"""
+Pooled client of the shared pricing daemon
+
+All estimators of a process share one MCP connection per daemon URL. The
+connection is opened on first use and kept for the lifetime of the process,
+so estimates that are not part of a warm session do not reconnect either.
+A call that fails in the transport (daemon restarted, connection dropped)
+reconnects once and is retried.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Any, Optional
+
+from strands.types.tools import AgentTool, ToolGenerator, ToolResult, ToolUse
+
+from cost_estimator_agent.tool_wrappers import DelegatingTool
+
+logger = logging.getLogger(__name__)
+
+# strands reports exceptions of the MCP transport as error results with this prefix
+TRANSPORT_ERROR_PREFIX = "Tool execution failed:"
+
+
+class SharedPricingClient:
+    """Process-wide MCP connection to one pricing daemon."""
+
+    _lock = threading.Lock()
+    _clients: dict[str, "SharedPricingClient"] = {}
+
+    def __init__(self, url: str):
+        self.url = url
+        self.generation = 0
+        self.mcp_client = None
+        self.tools: dict[str, AgentTool] = {}
+        self._connection_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, url: str) -> "SharedPricingClient":
+        with cls._lock:
+            if url not in cls._clients:
+                cls._clients[url] = cls(url)
+            return cls._clients[url]
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._lock:
+            clients = list(cls._clients.values())
+            cls._clients.clear()
+        for client in clients:
+            client.close()
+
+    def _connect(self) -> None:
+        from mcp.client.streamable_http import streamablehttp_client
+        from strands.tools.mcp import MCPClient
+
+        mcp_client = MCPClient(lambda: streamablehttp_client(self.url))
+        mcp_client.start()
+        self.tools = {tool.tool_name: tool for tool in mcp_client.list_tools_sync()}
+        self.mcp_client = mcp_client
+        logger.info(f"🔌 Connected to pricing daemon at {self.url} with {len(self.tools)} tools")
+
+    def _disconnect(self) -> None:
+        if self.mcp_client:
+            try:
+                # stopping a client whose background thread has already ended waits forever
+                if self.mcp_client._is_session_active():
+                    self.mcp_client.stop(None, None, None)
+            except Exception as e:
+                logger.warning(f"⚠️ Error closing pricing daemon connection: {e}")
+            finally:
+                self.mcp_client = None
+
+    def list_tools(self) -> list[AgentTool]:
+        with self._connection_lock:
+            if self.mcp_client is None:
+                self._connect()
+            return [ReconnectingPricingTool(self, tool) for tool in self.tools.values()]
+
+    def tool(self, name: str) -> Optional[AgentTool]:
+        return self.tools.get(name)
+
+    def reconnect(self, generation: int) -> None:
+        """Replace the connection, unless another caller already did since `generation`."""
+        with self._connection_lock:
+            if generation != self.generation:
+                return
+            logger.info(f"♻️ Reconnecting to pricing daemon at {self.url}")
+            self._disconnect()
+            self.generation += 1
+            self._connect()
+
+    def close(self) -> None:
+        with self._connection_lock:
+            self._disconnect()
+
+
+atexit.register(SharedPricingClient.close_all)
+
+
+class ReconnectingPricingTool(DelegatingTool):
+    """Call a daemon tool through the current connection, reconnecting once on transport errors."""
+
+    def __init__(self, shared_client: SharedPricingClient, tool: AgentTool):
+        super().__init__(tool)
+        self.shared_client = shared_client
+
+    async def _call(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolResult:
+        tool = self.shared_client.tool(self.tool_name)
+        try:
+            if tool is None:
+                raise Exception("not connected to the pricing daemon")
+            result = None
+            async for result in tool.stream(tool_use, invocation_state, **kwargs):
+                pass
+            return result
+        except Exception as e:
+            # e.g. the connection's background thread is gone
+            return {"toolUseId": tool_use["toolUseId"], "status": "error", "content": [{"text": f"{TRANSPORT_ERROR_PREFIX} {e}"}]}
+
+    @staticmethod
+    def _is_transport_error(result: ToolResult) -> bool:
+        return result["status"] == "error" and any(
+            block.get("text", "").startswith(TRANSPORT_ERROR_PREFIX) for block in result.get("content", [])
+        )
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        generation = self.shared_client.generation
+        result = await self._call(tool_use, invocation_state, **kwargs)
+        if self._is_transport_error(result):
+            try:
+                await asyncio.to_thread(self.shared_client.reconnect, generation)
+                result = await self._call(tool_use, invocation_state, **kwargs)
+            except Exception as e:
+                logger.warning(f"⚠️ Reconnecting to pricing daemon failed: {e}")
+        yield result
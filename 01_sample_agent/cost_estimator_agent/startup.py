@@ -0,0 +1,119 @@
+"""
+Concurrent bootstrap of the estimator components
+
+Setting up the calculation backend, resolving the AWS identity and starting
+the pricing MCP server do not depend on each other, so StartupOrchestrator
+runs them on a thread pool and records how long each step took. Resolved
+credentials and identities are cached process-wide until they expire.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from cost_estimator_agent.config import CREDENTIAL_CACHE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class StartupOrchestrator:
+    """Run independent setup steps concurrently and keep per-step timings."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+
+    def _timed(self, name: str, step: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return step()
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 3)
+            logger.info(f"⏱️ Startup step {name} took {self.timings[name]}s")
+
+    def run(self, steps: dict[str, Callable[[], Any]]) -> dict[str, Any]:
+        """Run all steps, wait for every one of them and raise the first failure."""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="startup") as executor:
+            futures = {name: executor.submit(self._timed, name, step) for name, step in steps.items()}
+
+        self.timings["total"] = round(time.perf_counter() - start, 3)
+        logger.info(f"⏱️ Startup finished in {self.timings['total']}s")
+
+        errors = [future.exception() for future in futures.values() if future.exception()]
+        if errors:
+            raise errors[0]
+        return {name: future.result() for name, future in futures.items()}
+
+
+class CredentialCache:
+    """Process-wide cache of frozen AWS credentials and the caller identity, per region."""
+
+    _lock = threading.Lock()
+    _credentials: dict[str, tuple[float, dict]] = {}
+    _identities: dict[str, tuple[float, dict]] = {}
+
+    @staticmethod
+    def _expires_at(credentials) -> float:
+        expires_at = time.time() + CREDENTIAL_CACHE_SECONDS
+        # refreshable credentials (SSO, assumed roles) know when they expire
+        expiry_time: Optional[datetime] = getattr(credentials, "_expiry_time", None)
+        if expiry_time is not None:
+            expires_at = min(expires_at, expiry_time.astimezone(timezone.utc).timestamp() - 60)
+        return expires_at
+
+    @classmethod
+    def credentials(cls, region: str) -> dict:
+        with cls._lock:
+            cached = cls._credentials.get(region)
+            if cached and cached[0] > time.time():
+                return cached[1]
+
+        import boto3
+
+        session = boto3.Session()
+        credentials = session.get_credentials()
+        if credentials is None:
+            raise Exception("✖️ No AWS credentials found")
+
+        frozen_credentials = credentials.get_frozen_credentials()
+        credential_dict = {
+            "AWS_ACCESS_KEY_ID": frozen_credentials.access_key,
+            "AWS_SECRET_ACCESS_KEY": frozen_credentials.secret_key,
+            "AWS_REGION": region
+        }
+        if frozen_credentials.token:
+            credential_dict["AWS_SESSION_TOKEN"] = frozen_credentials.token
+
+        with cls._lock:
+            cls._credentials[region] = (cls._expires_at(credentials), credential_dict)
+        return credential_dict
+
+    @classmethod
+    def expires_at(cls, region: str) -> Optional[float]:
+        """When the cached credentials of `region` expire, None if there are none."""
+        with cls._lock:
+            cached = cls._credentials.get(region)
+        return cached[0] if cached else None
+
+    @classmethod
+    def identity(cls, region: str) -> dict:
+        with cls._lock:
+            cached = cls._identities.get(region)
+            if cached and cached[0] > time.time():
+                return cached[1]
+
+        import boto3
+
+        identity = boto3.client('sts', region_name=region).get_caller_identity()
+        with cls._lock:
+            cls._identities[region] = (time.time() + CREDENTIAL_CACHE_SECONDS, identity)
+        return identity
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._credentials.clear()
+            cls._identities.clear()
@@ -0,0 +1,182 @@
+"""
+Wrappers around the estimator tools
+
+The tools returned by `MCPClient.list_tools_sync()` (and the calculation tool)
+are wrapped before they are handed to the agent, so behaviour such as caching,
+concurrency limits or instrumentation can be layered on top without touching
+the MCP client itself.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any
+
+from strands.types.tools import AgentTool, ToolGenerator, ToolResult, ToolSpec, ToolUse
+
+from cost_estimator_agent.cache_store import DiskCache
+from cost_estimator_agent.instrumentation import EstimateTrace
+from cost_estimator_agent.result_shaping import shape_tool_content
+
+logger = logging.getLogger(__name__)
+
+
+class DelegatingTool(AgentTool):
+    """An AgentTool that forwards everything to a wrapped tool."""
+
+    def __init__(self, tool: AgentTool):
+        super().__init__()
+        self.tool = tool
+
+    @property
+    def tool_name(self) -> str:
+        return self.tool.tool_name
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self.tool.tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return self.tool.tool_type
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+            yield event
+
+
+# list arguments whose order does not change the result, e.g. the filters of get_pricing are ANDed
+UNORDERED_ARGUMENTS = {"filters"}
+
+
+def normalize_arguments(value: Any, unordered: bool = False) -> Any:
+    """Normalize tool arguments so equivalent calls produce the same cache key.
+
+    Keys are sorted everywhere, lists only for `UNORDERED_ARGUMENTS`.
+    """
+    if isinstance(value, dict):
+        return {key: normalize_arguments(value[key], key in UNORDERED_ARGUMENTS) for key in sorted(value)}
+    if isinstance(value, (list, tuple)):
+        items = [normalize_arguments(item) for item in value]
+        return sorted(items, key=lambda item: json.dumps(item, sort_keys=True)) if unordered else items
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+class CachedPricingTool(DelegatingTool):
+    """Serve repeated pricing tool calls from a `DiskCache`.
+
+    Results are keyed on the tool name, the normalized arguments and the region.
+    Only successful results are cached.
+    """
+
+    def __init__(self, tool: AgentTool, cache: DiskCache, region: str):
+        super().__init__(tool)
+        self.cache = cache
+        self.region = region
+
+    def cache_key(self, tool_use: ToolUse) -> str:
+        payload = json.dumps(
+            {
+                "tool": self.tool_name,
+                "input": normalize_arguments(tool_use.get("input") or {}),
+                "region": self.region,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        key = self.cache_key(tool_use)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"💾 Pricing cache hit: {self.tool_name}")
+            yield ToolResult(toolUseId=tool_use["toolUseId"], status=cached["status"], content=cached["content"])
+            return
+
+        event = None
+        async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+            yield event
+
+        if isinstance(event, dict) and event.get("status") == "success":
+            self.cache.set(key, {"status": event["status"], "content": event["content"]})
+
+
+class ConcurrencyLimitedTool(DelegatingTool):
+    """Bound how many tool calls of one model turn run at the same time.
+
+    strands already runs all tool calls of a turn concurrently and returns their results
+    in request order; every tool of an agent shares one semaphore so at most
+    `max_parallel_tool_calls` of them hit the MCP server or interpreter at once.
+    """
+
+    def __init__(self, tool: AgentTool, semaphore: asyncio.Semaphore):
+        super().__init__(tool)
+        self.semaphore = semaphore
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        async with self.semaphore:
+            async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+                yield event
+
+
+def limit_concurrency(tools: list[AgentTool], max_parallel_tool_calls: int) -> list[AgentTool]:
+    semaphore = asyncio.Semaphore(max_parallel_tool_calls)
+    return [ConcurrencyLimitedTool(tool, semaphore) for tool in tools]
+
+
+class InstrumentedTool(DelegatingTool):
+    """Record the duration and status of every call in an `EstimateTrace`."""
+
+    def __init__(self, tool: AgentTool, trace: EstimateTrace, phase: str = "tool"):
+        super().__init__(tool)
+        self.trace = trace
+        self.phase = phase
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        with self.trace.span(self.phase, self.tool_name) as attributes:
+            event = None
+            async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+                yield event
+            attributes["status"] = event.get("status", "success") if isinstance(event, dict) else "success"
+
+
+def instrument_tools(tools: list[AgentTool], trace: EstimateTrace, calculation_tool_name: str) -> list[AgentTool]:
+    return [
+        InstrumentedTool(tool, trace, "calculation" if tool.tool_name == calculation_tool_name else "tool")
+        for tool in tools
+    ]
+
+
+class ShapedPricingTool(DelegatingTool):
+    """Project bulky pricing results onto the fields needed for costing, see `result_shaping`."""
+
+    async def stream(self, tool_use: ToolUse, invocation_state: dict[str, Any], **kwargs: Any) -> ToolGenerator:
+        # the last event of a tool stream is its ToolResult, hold each event back until the next one arrives
+        event = None
+        async for next_event in self.tool.stream(tool_use, invocation_state, **kwargs):
+            if event is not None:
+                yield event
+            event = next_event
+
+        if not isinstance(event, dict):
+            if event is not None:
+                yield event
+            return
+
+        content = None
+        if event.get("status") == "success":
+            try:
+                content = shape_tool_content(self.tool_name, event["content"])
+            except Exception as e:
+                logger.warning(f"⚠️ Could not shape {self.tool_name} result, passing it through: {e}")
+
+        if content is None:
+            yield event
+            return
+
+        before, after = len(json.dumps(event["content"])), len(json.dumps(content))
+        logger.info(f"✂️ Shaped {self.tool_name} result from {before} to {after} characters")
+        yield ToolResult(toolUseId=event["toolUseId"], status=event["status"], content=content)
@@ -1,7 +1,12 @@
 import base64
+import hashlib
 import json
 import logging
 import mimetypes
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from typing import Any, AsyncGenerator, Optional, Protocol, Type, TypedDict, TypeVar, Union, cast, Generator
 
 # import openai
@@ -12,7 +17,7 @@ from google.genai.types import Content, Part
 from pydantic import BaseModel
 from typing_extensions import Unpack, override
 
-from strands.types.content import ContentBlock, Messages
+from strands.types.content import ContentBlock, Message, Messages
 from strands.types.streaming import StreamEvent
 from strands.types.tools import ToolResult, ToolSpec, ToolUse
 from strands.models.model import Model
@@ -23,7 +28,7 @@ T = TypeVar("T", bound=BaseModel)
 
 class Client(Protocol):
     @property
-    def chat(self) -> Any:
+    def aio(self) -> Any:
         ...
 
 class GeminiModel(Model):
@@ -32,12 +37,35 @@ class GeminiModel(Model):
     class GeminiConfig(TypedDict, total=False):
         model_id: str
         params: Optional[dict[str, Any]]
+        # keep the system prompt and tool declarations in Gemini cached content instead of sending them every turn
+        cache_prefix: bool
+        cache_ttl_seconds: int
 
-    def __init__(self, client_args: Optional[dict[str, Any]] = None, **model_config: Unpack[GeminiConfig]) -> None:
+    # formatted messages are reused while the message and its content blocks are the same objects
+    FORMATTED_MESSAGE_CACHE_SIZE = 1024
+
+    # a prefix whose cached content could not be created for another reason is retried after this long
+    PREFIX_CACHE_RETRY_SECONDS = 60
+
+    # (cached content name, expiry) per static prefix, shared by all instances; the name is None while a
+    # failed creation is not retried, and the entry is None for prefixes below the minimum cacheable size
+    _prefix_caches: dict[str, Optional[tuple[Optional[str], float]]] = {}
+    _prefix_caches_lock = threading.Lock()
+
+    def __init__(
+        self,
+        client_args: Optional[dict[str, Any]] = None,
+        client: Optional[Client] = None,
+        **model_config: Unpack[GeminiConfig]
+    ) -> None:
         self.config = model_config
         logger.debug("config=<%s> | initialize", self.config)
         client_args = client_args or {}
-        self.client = genai.Client(**client_args)
+        self.client = client or genai.Client(**client_args)
+        self._tool_declarations: Optional[tuple[tuple, list[dict[str, Any]]]] = None
+        self._formatted_messages: OrderedDict[int, tuple[tuple, Any, dict[str, Any]]] = OrderedDict()
+        self._formatted_messages_lock = threading.Lock()
+        self._prefix_key_memo: Optional[tuple[Optional[str], tuple, str]] = None
 
     @override
     def update_config(self, **model_config: Unpack[GeminiConfig]) -> None:
@@ -50,91 +78,205 @@ class GeminiModel(Model):
     @classmethod
     def format_request_message_content(cls, content: ContentBlock) -> dict[str, Any]:
         # :TODO: Implements document and image types
-        return {"text": content["text"], "type": "text"}
+        return {"text": content["text"]}
 
     @classmethod
     def format_request_message_tool_call(cls, tool_use: ToolUse) -> dict[str, Any]:
         return {
-            "function": {
-                "arguments": json.dumps(tool_use['input']),
+            "function_call": {
+                "args": tool_use['input'],
                 "name": tool_use['name'],
-            },
-            "id": tool_use['toolUseId'],
-            "type": 'function'
+            }
         }
 
     @classmethod
-    def format_request_tool_message(cls, tool_result: ToolResult) -> dict[str, Any]:
-        contents = cast(
-            list[ContentBlock],
-            [
-                {'text': json.dumps(content['json'])} if 'json' in content else content
-                for content in tool_result['content']
-            ],
-        )
+    def format_request_tool_message(cls, tool_result: ToolResult, tool_name: str) -> dict[str, Any]:
+        contents = [
+            content['json'] if 'json' in content else content.get('text', '')
+            for content in tool_result['content']
+        ]
+        output = contents[0] if len(contents) == 1 else contents
 
         return {
-            'role': 'tool',
-            'tool_call_id': tool_result['toolUseId'],
-            'content': [cls.format_request_message_content(content) for content in contents],
+            'function_response': {
+                'name': tool_name,
+                'response': {'error': output} if tool_result.get('status') == 'error' else {'output': output},
+            }
         }
 
     @classmethod
-    def format_request_messages(cls, messages: Messages, system_prompt: Optional[str] = None) -> list[dict[str, Any]]:
-        formatted_messages: list[dict[str, Any]]
-        formatted_messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    def format_request_message(cls, message: Message, tool_names: dict[str, str]) -> Optional[dict[str, Any]]:
+        parts: list[dict[str, Any]] = []
 
-        for message in messages:
-            contents = message["content"]
-            formatted_contents = [
-                cls.format_request_message_content(content)
-                for content in contents
-                if not any(block_type in content for block_type in ['toolResult', 'toolUse'])
-            ]
-
-            formatted_tool_calls = [
-                cls.format_request_message_tool_call(content['toolUse']) for content  in contents if 'toolUse' in content
-            ]
-
-            formatted_tool_messages = [
-                cls.format_request_tool_message(content['toolResult'])
-                for content in contents
-                if 'toolResult' in content
-            ]
-
-            formatted_message = {
-                'role': message['role'],
-                'content': formatted_contents,
-                **({'tool_calls': formatted_tool_calls} if formatted_tool_calls else {}),
-            }
+        for content in message["content"]:
+            if 'toolUse' in content:
+                parts.append(cls.format_request_message_tool_call(content['toolUse']))
+            elif 'toolResult' in content:
+                tool_result = content['toolResult']
+                parts.append(cls.format_request_tool_message(tool_result, tool_names.get(tool_result['toolUseId'], '')))
+            elif 'text' in content:
+                parts.append(cls.format_request_message_content(content))
+
+        if not parts:
+            return None
+
+        return {
+            'role': 'model' if message['role'] == 'assistant' else 'user',
+            'parts': parts,
+        }
 
-            formatted_messages.append(formatted_message)
-            formatted_messages.extend(formatted_tool_messages)
+    @staticmethod
+    def _message_signature(message: Message) -> tuple:
+        # conversation managers replace content lists rather than editing strings in place
+        return tuple(
+            (content, content['toolResult']['content']) if 'toolResult' in content else (content,)
+            for content in message['content']
+        )
 
-        return [message for message in formatted_messages if message['content'] or 'tool_calls' in message]
+    def format_request_messages(self, messages: Messages) -> list[dict[str, Any]]:
+        """Format the conversation, reusing the formatting of messages seen on earlier turns."""
+        formatted_messages: list[dict[str, Any]] = []
+        # Gemini matches function responses by name, which strands only keeps on the tool use
+        tool_names: dict[str, str] = {}
+
+        for message in messages:
+            for content in message["content"]:
+                if 'toolUse' in content:
+                    tool_names[content['toolUse']['toolUseId']] = content['toolUse']['name']
+
+            signature = self._message_signature(message)
+            with self._formatted_messages_lock:
+                cached = self._formatted_messages.get(id(message))
+                if cached is not None:
+                    self._formatted_messages.move_to_end(id(message))
+
+            # the cache entry holds the message and its blocks, so their ids cannot be reused while it is cached
+            if (
+                cached is not None
+                and cached[1] is message
+                and len(cached[0]) == len(signature)
+                and all(a is b for old, new in zip(cached[0], signature) for a, b in zip(old, new))
+            ):
+                formatted = cached[2]
+            else:
+                formatted = self.format_request_message(message, tool_names)
+                with self._formatted_messages_lock:
+                    self._formatted_messages[id(message)] = (signature, message, formatted)
+                    while len(self._formatted_messages) > self.FORMATTED_MESSAGE_CACHE_SIZE:
+                        self._formatted_messages.popitem(last=False)
+
+            if formatted:
+                formatted_messages.append(formatted)
+
+        return formatted_messages
+
+    def format_tool_declarations(self, tool_specs: list[ToolSpec]) -> list[dict[str, Any]]:
+        """Gemini tool declarations, converted once per set of tools."""
+        key = tuple((tool_spec['name'], tool_spec['description']) for tool_spec in tool_specs)
+        if self._tool_declarations is None or self._tool_declarations[0] != key:
+            self._tool_declarations = (key, [{
+                'function_declarations': [
+                    {
+                        'name': tool_spec['name'],
+                        'description': tool_spec['description'],
+                        'parameters_json_schema': tool_spec['inputSchema']['json'],
+                    }
+                    for tool_spec in tool_specs
+                ]
+            }])
+        return self._tool_declarations[1]
 
     def format_request(
-        self, messages: Messages, tool_specs: Optional[list[ToolSpec]] = None, system_prompt: Optional[str] = None
+        self,
+        messages: Messages,
+        tool_specs: Optional[list[ToolSpec]] = None,
+        system_prompt: Optional[str] = None,
+        cached_content: Optional[str] = None,
     ) -> dict[str, Any]:
+        config: dict[str, Any] = cast(dict[str, Any], dict(self.config.get('params') or {}))
+
+        if cached_content:
+            # the system prompt and tools are part of the cached content and must not be sent again
+            config['cached_content'] = cached_content
+        else:
+            if system_prompt:
+                config['system_instruction'] = system_prompt
+            if tool_specs:
+                config['tools'] = self.format_tool_declarations(tool_specs)
+
+        if tool_specs:
+            # strands runs the tools itself
+            config['automatic_function_calling'] = {'disable': True}
+
         return {
-            'messages': self.format_request_messages(messages, system_prompt),
             'model': self.config['model_id'],
-            'stream': True,
-            'stream_options': {'included_usage': True},
-            'tools': [
-                {
-                    'type': 'function',
-                    'function': {
-                        'name': tool_spec['name'],
-                        'description': tool_spec['description'],
-                        'parameters': tool_spec['inputSchema']['json'],
-                    }
-                }
-                for tool_spec in tool_specs or []
-            ],
-            **cast(dict[str, Any], self.config.get('params', {})),
+            'contents': self.format_request_messages(messages),
+            'config': config,
         }
 
+    def _prefix_key(self, tool_specs: Optional[list[ToolSpec]], system_prompt: Optional[str]) -> str:
+        tools_key = tuple((tool_spec['name'], tool_spec['description']) for tool_spec in tool_specs or [])
+        if self._prefix_key_memo is None or self._prefix_key_memo[:2] != (system_prompt, tools_key):
+            payload = json.dumps([self.config['model_id'], system_prompt, tool_specs or []], sort_keys=True)
+            self._prefix_key_memo = (system_prompt, tools_key, hashlib.sha256(payload.encode()).hexdigest())
+        return self._prefix_key_memo[2]
+
+    async def cached_prefix(self, tool_specs: Optional[list[ToolSpec]], system_prompt: Optional[str]) -> Optional[str]:
+        """Name of the cached content holding the system prompt and tools, creating it if needed."""
+        if not self.config.get('cache_prefix') or not (system_prompt or tool_specs):
+            return None
+
+        key = self._prefix_key(tool_specs, system_prompt)
+        now = time.time()
+        with self._prefix_caches_lock:
+            if key in self._prefix_caches:
+                entry = self._prefix_caches[key]
+                if entry is None:
+                    return None
+                name, expires_at = entry
+                # refresh a minute early so a request never references an expired cache
+                if (expires_at - 60 if name else expires_at) > now:
+                    return name
+
+        ttl_seconds = self.config.get('cache_ttl_seconds', 3600)
+        try:
+            cached_content = await self.client.aio.caches.create(
+                model=self.config['model_id'],
+                config={
+                    **({'system_instruction': system_prompt} if system_prompt else {}),
+                    **({'tools': self.format_tool_declarations(tool_specs)} if tool_specs else {}),
+                    'ttl': f"{ttl_seconds}s",
+                    'display_name': 'strands-static-prefix',
+                },
+            )
+            entry = (cached_content.name, now + ttl_seconds)
+            logger.debug("cached_content=<%s> | created cached prefix", cached_content.name)
+        except Exception as e:
+            if self._is_below_minimum_cache_size(e):
+                logger.warning(f"⚠️ Gemini prompt prefix is too small to cache, sending it with every request: {e}")
+                entry = None
+            else:
+                logger.warning(
+                    f"⚠️ Gemini cached content unavailable, retrying in {self.PREFIX_CACHE_RETRY_SECONDS}s: {e}"
+                )
+                entry = (None, now + self.PREFIX_CACHE_RETRY_SECONDS)
+
+        with self._prefix_caches_lock:
+            self._prefix_caches[key] = entry
+        return entry[0] if entry else None
+
+    @staticmethod
+    def _is_below_minimum_cache_size(error: Exception) -> bool:
+        # e.g. "Cached content is too small. total_token_count=1200, min_total_token_count=4096"
+        message = str(error).lower()
+        return isinstance(error, genai.errors.ClientError) and ("too small" in message or "min_total_token_count" in message)
+
+    def _forget_cached_prefix(self, cached_content: str) -> None:
+        with self._prefix_caches_lock:
+            for key, entry in list(self._prefix_caches.items()):
+                if entry and entry[0] == cached_content:
+                    del self._prefix_caches[key]
+
     def format_chunk(self, event: dict[str, Any]) -> StreamEvent:
         match event['chunk_type']:
             case 'message_start':
@@ -146,8 +288,8 @@ class GeminiModel(Model):
                         'contentBlockStart': {
                             'start': {
                                 'toolUse': {
-                                    'name': event['data'].function.name,
-                                    'toolUseId': event['data'].id
+                                    'name': event['data'].name,
+                                    'toolUseId': event['data'].id or f"tooluse_{uuid.uuid4().hex}"
                                 }
                             }
                         }
@@ -159,11 +301,11 @@ class GeminiModel(Model):
                 if event['data_type'] == 'tool':
                     return {
                         'contentBlockDelta': {'delta': {'toolUse':{
-                            'input': event['data'].function.arguments or ''
+                            'input': json.dumps(event['data'].args or {})
                         }}}
                     }
-                
-                if event['data_type'] == 'reasoninig_content':
+
+                if event['data_type'] == 'reasoning_content':
                     return {
                         'contentBlockDelta': {'delta': {'reasoningContent': {'text': event['data']}}}
                     }
@@ -175,9 +317,9 @@ class GeminiModel(Model):
 
             case 'message_stop':
                 match event['data']:
-                    case 'tool_calls':
+                    case 'tool_use':
                         return {'messageStop': {'stopReason': 'tool_use'}}
-                    case 'length':
+                    case 'MAX_TOKENS':
                         return {'messageStop': {'stopReason': 'max_tokens'}}
                     case _:
                         return {'messageStop': {'stopReason': 'end_turn'}}
@@ -186,12 +328,12 @@ class GeminiModel(Model):
                 return {
                     'metadata': {
                         'usage': {
-                            'inputTokens': event['data'].prompt_tokens,
-                            'outputTokens': event['data'].completion_tokens,
-                            'totalTokens': event['data'].total_tokens,
+                            'inputTokens': event['data'].prompt_token_count or 0,
+                            'outputTokens': event['data'].candidates_token_count or 0,
+                            'totalTokens': event['data'].total_token_count or 0,
                         },
                         'metrics': {
-                            'latencyMs': 0,
+                            'latencyMs': event.get('latency_ms', 0),
                         }
                     }
                 }
@@ -208,61 +350,73 @@ class GeminiModel(Model):
         **kwargs: Any,
     ) -> AsyncGenerator[StreamEvent, None]:
         logger.debug('formatting request')
-        request = self.format_request(messages, tool_specs, system_prompt)
+        cached_content = await self.cached_prefix(tool_specs, system_prompt)
+        request = self.format_request(messages, tool_specs, system_prompt, cached_content)
         logger.debug("formatted request=<%s>", request)
 
         logger.debug('invoke model')
-        response = await self.client.models.generate_content('gemini-2.0-flash', **request)
+        start = time.perf_counter()
+        try:
+            response = await self.client.aio.models.generate_content_stream(**request)
+        except Exception as e:
+            if not cached_content:
+                raise
+            # the cached content may have been deleted or expired early; send the full prefix instead
+            logger.warning(f"⚠️ Request with cached content failed, retrying without it: {e}")
+            self._forget_cached_prefix(cached_content)
+            request = self.format_request(messages, tool_specs, system_prompt)
+            response = await self.client.aio.models.generate_content_stream(**request)
 
-        logger.debug("got response from model")
         yield self.format_chunk({"chunk_type": 'message_start'})
-        yield self.format_chunk({'chunk_type': 'content_start', 'data_type': 'text'})
 
-        tool_calls: dict[int, list[Any]] = {}
+        # text and reasoning blocks stay open until a different kind of part arrives
+        open_block: Optional[str] = None
+        finish_reason: Optional[str] = None
+        has_tool_calls = False
+        usage = None
 
-        async for event in response:
-            if not getattr(event, 'choices', None):
+        async for chunk in response:
+            usage = chunk.usage_metadata or usage
+            if not chunk.candidates:
                 continue
 
-            choice = event.choices[0]
+            candidate = chunk.candidates[0]
+            for part in (candidate.content.parts if candidate.content else None) or []:
+                if part.function_call:
+                    if open_block:
+                        yield self.format_chunk({'chunk_type': 'content_stop', 'data_type': open_block})
+                        open_block = None
 
-            if choice.delta.content:
-                yield self.format_chunk(
-                    {'chunk_type': 'content_delta', 'data_type': 'text', 'data': choice.delta.content}
-                )
-
-            if hasattr(choice.delta, 'reasoning_content') and choice.delta.reasoning_content:
-                yield self.format_chunk(
-                    {
-                        'chunk_type': 'content_delta',
-                        'data_type': 'reasoning_content',
-                        'data': choice.delta.reasoning_content
-                    }
-                )
-
-            for tool_call in choice.delta.tool_calls or []:
-                tool_calls.setdefault(tool_call.index, []).append(tool_call)
+                    # Gemini sends each function call complete, so its arguments arrive as a single delta
+                    has_tool_calls = True
+                    yield self.format_chunk({'chunk_type': 'content_start', 'data_type': 'tool', 'data': part.function_call})
+                    yield self.format_chunk({'chunk_type': 'content_delta', 'data_type': 'tool', 'data': part.function_call})
+                    yield self.format_chunk({'chunk_type': 'content_stop', 'data_type': 'tool'})
+                    continue
 
-            if choice.finish_reason:
-                break
+                if not part.text:
+                    continue
 
-        yield self.format_chunk({'chunk_type': 'content_stop', 'data_type': 'text'})
+                data_type = 'reasoning_content' if part.thought else 'text'
+                if open_block != data_type:
+                    if open_block:
+                        yield self.format_chunk({'chunk_type': 'content_stop', 'data_type': open_block})
+                    yield self.format_chunk({'chunk_type': 'content_start', 'data_type': data_type})
+                    open_block = data_type
 
-        for tool_deltas in tool_calls.values():
-            yield self.format_chunk({'chunk_type': 'content_start', 'data_type': 'tool', 'data': tool_deltas[0]})
+                yield self.format_chunk({'chunk_type': 'content_delta', 'data_type': data_type, 'data': part.text})
 
-            for tool_delta in tool_deltas:
-                yield self.format_chunk({'chunk_type': 'content_delta', 'data_type': 'tool', 'data': tool_delta})
+            if candidate.finish_reason:
+                finish_reason = candidate.finish_reason
 
-            yield self.format_chunk({'chunk_type': 'content_stop', 'data_type': 'tool'})
+        if open_block:
+            yield self.format_chunk({'chunk_type': 'content_stop', 'data_type': open_block})
 
-        yield self.format_chunk({'chunk_type': 'message_stop', 'data': choice.finish_reason})
+        yield self.format_chunk({'chunk_type': 'message_stop', 'data': 'tool_use' if has_tool_calls else finish_reason})
 
-        async for event in response:
-            _ = event
-
-        if event.usage:
-            yield self.format_chunk({'chunk_type': 'metadata', 'data': event.usage})
+        if usage:
+            latency_ms = int((time.perf_counter() - start) * 1000)
+            yield self.format_chunk({'chunk_type': 'metadata', 'data': usage, 'latency_ms': latency_ms})
 
         logger.debug('finished streaming response from model')
 
@@ -270,24 +424,23 @@ class GeminiModel(Model):
     async def structured_output(
         self, output_model: Type[T], prompt: Messages, system_prompt: Optional[str] = None, **kwargs: Any
     ) -> AsyncGenerator[dict[str, Union[T, Any]], None]:
-        response = await self.client.models.generate_contents('gemini-2.0-flash')
-
-        parsed: T | None = None
-        if len(response.choices) > 1:
-            raise ValueError('Multiple choices found in the Gemini response')
-        
-        for choice in response.choices:
-            if isinstance(choice.message.parsed, output_model):
-                parsed = choice.message.parsed
-                break
-
-        if parsed:
+        response = await self.client.aio.models.generate_content(
+            model=self.config['model_id'],
+            contents=self.format_request_messages(prompt),
+            config={
+                **({'system_instruction': system_prompt} if system_prompt else {}),
+                'response_mime_type': 'application/json',
+                'response_schema': output_model,
+            },
+        )
+
+        parsed = response.parsed
+        if isinstance(parsed, output_model):
             yield {'output': parsed}
         else:
             raise ValueError('no valid tool use or tool use input was found in the gemini response.')
-        
+
 
 
 if __name__ == '__main__':
     print("hello, gemini")
-
@@ -0,0 +1,68 @@
+import logging
+import time
+from typing import Any, AsyncGenerator, Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel
+from typing_extensions import override
+
+from strands.types.content import Messages
+from strands.types.streaming import StreamEvent
+from strands.types.tools import ToolSpec
+from strands.models.model import Model
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class InstrumentedModel(Model):
+    """Wraps a model and records every call as a "model" span of an `EstimateTrace`.
+
+    The span holds the time to the first streamed content delta, the total latency
+    and the token usage reported in the metadata event.
+    """
+
+    def __init__(self, model: Model, trace: Any) -> None:
+        self.model = model
+        self.trace = trace
+
+    @override
+    def update_config(self, **model_config: Any) -> None:
+        self.model.update_config(**model_config)
+
+    @override
+    def get_config(self) -> Any:
+        return self.model.get_config()
+
+    def _model_id(self) -> str:
+        config = self.model.get_config() or {}
+        return config.get('model_id', type(self.model).__name__)
+
+    @override
+    async def stream(
+        self,
+        messages: Messages,
+        tool_specs: Optional[list[ToolSpec]] = None,
+        system_prompt: Optional[str] = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[StreamEvent, None]:
+        with self.trace.span('model', self._model_id()) as attributes:
+            start = time.perf_counter()
+            async for event in self.model.stream(messages, tool_specs, system_prompt, **kwargs):
+                if 'contentBlockDelta' in event and 'time_to_first_token_seconds' not in attributes:
+                    attributes['time_to_first_token_seconds'] = round(time.perf_counter() - start, 6)
+                elif 'messageStop' in event:
+                    attributes['stop_reason'] = event['messageStop']['stopReason']
+                elif 'metadata' in event:
+                    usage = event['metadata'].get('usage', {})
+                    attributes['input_tokens'] = usage.get('inputTokens', 0)
+                    attributes['output_tokens'] = usage.get('outputTokens', 0)
+                yield event
+
+    @override
+    async def structured_output(
+        self, output_model: Type[T], prompt: Messages, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> AsyncGenerator[dict[str, Union[T, Any]], None]:
+        with self.trace.span('model', self._model_id(), structured_output=True):
+            async for event in self.model.structured_output(output_model, prompt, system_prompt, **kwargs):
+                yield event
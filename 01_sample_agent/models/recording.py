@@ -0,0 +1,136 @@
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel
+from typing_extensions import override
+
+from strands.types.content import Messages
+from strands.types.streaming import StreamEvent
+from strands.types.tools import ToolSpec
+from strands.models.model import Model
+
+from cost_estimator_agent.recording import MissingRecordingError, Recording, SessionRecorder, request_key
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def _stream_key(messages: Messages, tool_specs: Optional[list[ToolSpec]], system_prompt: Optional[str]) -> str:
+    # tool specs are keyed by name only, their descriptions do not change what the conversation was
+    return request_key(system_prompt, sorted(spec["name"] for spec in tool_specs or []), messages)
+
+
+def _structured_output_key(output_model: Type[BaseModel], prompt: Messages, system_prompt: Optional[str]) -> str:
+    return request_key(output_model.__name__, output_model.model_json_schema(), system_prompt, prompt)
+
+
+def _to_json_event(event: dict) -> dict:
+    # the last event carries the parsed output model instance
+    if isinstance(event.get('output'), BaseModel):
+        return {**event, 'output': event['output'].model_dump(mode='json')}
+    return event
+
+
+class RecordingModel(Model):
+    """Wraps a model and records every stream, chunk by chunk with its offset, to a `SessionRecorder`."""
+
+    def __init__(self, model: Model, recorder: SessionRecorder) -> None:
+        self.model = model
+        self.recorder = recorder
+
+    @override
+    def update_config(self, **model_config: Any) -> None:
+        self.model.update_config(**model_config)
+
+    @override
+    def get_config(self) -> Any:
+        return self.model.get_config()
+
+    @override
+    async def stream(
+        self,
+        messages: Messages,
+        tool_specs: Optional[list[ToolSpec]] = None,
+        system_prompt: Optional[str] = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[StreamEvent, None]:
+        # the key is computed up front, strands appends to the messages once the stream is done
+        key = _stream_key(messages, tool_specs, system_prompt)
+        chunks = []
+        start = time.perf_counter()
+        async for event in self.model.stream(messages, tool_specs, system_prompt, **kwargs):
+            chunks.append([round(time.perf_counter() - start, 6), event])
+            yield event
+        self.recorder.record("model", key=key, seconds=round(time.perf_counter() - start, 6), chunks=chunks)
+
+    @override
+    async def structured_output(
+        self, output_model: Type[T], prompt: Messages, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> AsyncGenerator[dict[str, Union[T, Any]], None]:
+        key = _structured_output_key(output_model, prompt, system_prompt)
+        chunks = []
+        start = time.perf_counter()
+        async for event in self.model.structured_output(output_model, prompt, system_prompt, **kwargs):
+            chunks.append([round(time.perf_counter() - start, 6), _to_json_event(event)])
+            yield event
+        self.recorder.record(
+            "structured_output",
+            key=key,
+            name=output_model.__name__,
+            seconds=round(time.perf_counter() - start, 6),
+            chunks=chunks
+        )
+
+
+class ReplayModel(Model):
+    """A model that streams the responses of a `Recording` instead of calling the model API."""
+
+    def __init__(self, recording: Recording) -> None:
+        self.recording = recording
+        self.config = {'model_id': 'replay'}
+
+    @override
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    @override
+    def get_config(self) -> dict[str, Any]:
+        return self.config
+
+    @override
+    async def stream(
+        self,
+        messages: Messages,
+        tool_specs: Optional[list[ToolSpec]] = None,
+        system_prompt: Optional[str] = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[StreamEvent, None]:
+        entry = self.recording.take("model", _stream_key(messages, tool_specs, system_prompt))
+        if entry is None:
+            raise MissingRecordingError(f"No recorded model response left to replay in {self.recording.path}")
+
+        async for event in self._replay_chunks(entry):
+            yield event
+
+    async def _replay_chunks(self, entry: dict) -> AsyncGenerator[dict, None]:
+        start = time.perf_counter()
+        for offset, event in entry["chunks"]:
+            if self.recording.realtime:
+                await asyncio.sleep(max(0.0, offset - (time.perf_counter() - start)))
+            yield event
+
+    @override
+    async def structured_output(
+        self, output_model: Type[T], prompt: Messages, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> AsyncGenerator[dict[str, Union[T, Any]], None]:
+        key = _structured_output_key(output_model, prompt, system_prompt)
+        entry = self.recording.take("structured_output", key, output_model.__name__)
+        if entry is None:
+            raise MissingRecordingError(
+                f"No recorded {output_model.__name__} structured output left to replay in {self.recording.path}"
+            )
+
+        async for event in self._replay_chunks(entry):
+            if 'output' in event:
+                event = {**event, 'output': output_model.model_validate(event['output'])}
+            yield event
@@ -18,6 +18,292 @@ def test_regular(architecture: str = "One EC2 t3.micro instance running 8 hours
             print(f"✖️ Test failed: {e}")
         return False
 
+async def test_async(architecture: str = "One EC2 t3.micro instance running 8 hours per day", verbose: bool=True) -> bool:
+    if verbose:
+        print('⚡Testing async cost estimation')
+    agent = AWSCostEstimatorAgent()
+
+    try:
+        result = await agent.estimate_costs_async(architecture)
+        if verbose:
+            print(f"📊Async response length: {len(result)} characters")
+            print(f"Result preview: {result[:150]}...")
+        if not result or result.startswith("🆖"):
+            return False
+
+        # concurrent estimates without a warm session share one session, stopped after the last of them
+        results = await asyncio.gather(*(agent.estimate_costs_async(architecture) for _ in range(2)))
+        if verbose:
+            print(f"📊Concurrent async response lengths: {[len(result) for result in results]}")
+        return (
+            all(result and not result.startswith("🆖") for result in results)
+            and not agent.session_active
+            and agent.aws_pricing_client is None
+        )
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
+async def test_streaming(architecture: str = "One EC2 t3.micro instance running 8 hours per day", verbose: bool=True) -> bool:
+    if verbose:
+        print('📡Testing streaming cost estimation')
+    agent = AWSCostEstimatorAgent()
+
+    try:
+        result = ""
+        event_counts = {}
+        async for event in agent.estimate_costs_stream(architecture):
+            event_counts[event['type']] = event_counts.get(event['type'], 0) + 1
+            if event['type'] == 'tool_start' and verbose:
+                print(f"🔧 {event['name']}")
+            if event['type'] == 'line_item' and verbose:
+                print(f"🧾 {' | '.join(event['cells'])}")
+            if event['type'] == 'result':
+                result = event['data']
+
+        if verbose:
+            print(f"📊Streaming events: {event_counts}")
+            print(f"Result preview: {result[:150]}...")
+        return len(result) > 0 and event_counts.get('text', 0) > 0
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
+async def test_regions(
+    architecture: str = "One EC2 t3.micro instance running 8 hours per day",
+    regions: list[str] = ["us-east-1", "eu-west-1"],
+    verbose: bool=True
+) -> bool:
+    if verbose:
+        print(f'🌍Testing region comparison: {", ".join(regions)}')
+    agent = AWSCostEstimatorAgent()
+
+    try:
+        result = await agent.estimate_costs_regions(architecture, regions)
+        if verbose:
+            print(result or "Architecture was not recognized")
+        return bool(result) and all(region in result for region in regions)
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
+async def test_reestimate(
+    architecture: str = "One EC2 t3.micro instance running 8 hours per day",
+    edited_architecture: str = "Two EC2 t3.micro instances running 8 hours per day and 100 GB of S3",
+    verbose: bool=True
+) -> bool:
+    if verbose:
+        print('🔁Testing incremental re-estimation')
+    agent = AWSCostEstimatorAgent()
+
+    try:
+        estimate = await agent.estimate_costs_itemized(architecture)
+        if estimate is None:
+            if verbose:
+                print("Architecture was not recognized")
+            return False
+        edited = await agent.reestimate_costs(estimate, edited_architecture)
+        if verbose:
+            print(estimate.to_markdown())
+            print(edited.to_markdown() if edited else "Edited architecture was not recognized")
+        return edited is not None and "reused" in edited.sources
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
+def test_planner(architecture: str = "One EC2 t3.micro instance running 8 hours per day", verbose: bool=True) -> bool:
+    from cost_estimator_agent.pricing_planner import plan_pricing
+
+    if verbose:
+        print('🧭Testing cost estimation with the pricing planner')
+    plan = plan_pricing(architecture)
+    if verbose:
+        print(plan.to_prompt() if plan else "Architecture was not recognized by the planner")
+    agent = AWSCostEstimatorAgent(use_pricing_planner=True, use_result_cache=False)
+
+    try:
+        result = agent.estimate_costs(architecture)
+        turns = agent.last_trace.phase_summary()["model"]["count"]
+        if verbose:
+            print(f"🔁Model turns: {turns}")
+            print(f"Result preview: {result[:150]}...")
+        return plan is not None and len(result) > 0
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
+def test_calculation_session(verbose: bool=True) -> bool:
+    """A pricing table pushed once and variables kept between calculations on the local backend."""
+    from cost_estimator_agent.calculation_backend import LocalCalculationBackend
+    from cost_estimator_agent.calculation_session import CalculationSession
+
+    if verbose:
+        print('🧮Testing calculation session state')
+    backend = LocalCalculationBackend(workers=2)
+
+    try:
+        backend.start()
+        session = CalculationSession(backend)
+        session.load_pricing([
+            {"service": "EC2", "configuration": "t3.small", "quantity": 2, "unit_price": 0.0208, "unit": "Hrs", "usage": 730},
+        ])
+        first = session.execute("total = monthly_costs()")
+        second = session.execute("print(round(total * 12, 2))", pricing_table=[
+            {"service": "S3", "configuration": "100 GB", "quantity": 100, "unit_price": 0.023, "unit": "GB-Mo", "usage": 1},
+        ])
+        third = session.execute("print(monthly_costs())")
+        # a pricing table over the state size limit is still carried over
+        session.load_pricing([
+            {"service": "EBS", "configuration": f"vol-{i:05d}", "quantity": 1, "unit_price": 0.08, "unit": "GB-Mo", "usage": 1}
+            for i in range(500)
+        ])
+        session.execute("print(len(pricing))")
+        fourth = session.execute("print(len(pricing))")
+        if verbose:
+            print(first, second, third, fourth, sep="\n")
+        return "$30.37" in first and second == "364.44" and third.endswith("32.67") and fourth == "502"
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+    finally:
+        backend.stop()
+
+def test_record_replay(architecture: str = "One EC2 t3.micro instance running 8 hours per day", verbose: bool=True) -> bool:
+    """Record a live estimate, then replay it offline; the replay has to produce the same answer."""
+    import os
+    import tempfile
+
+    if verbose:
+        print('📼Testing record and replay')
+    record_path = os.path.join(tempfile.mkdtemp(), "session.jsonl")
+
+    try:
+        recorded = AWSCostEstimatorAgent(record_path=record_path, replay_path=None).estimate_costs(architecture)
+        replayed = AWSCostEstimatorAgent(record_path=None, replay_path=record_path).estimate_costs(architecture)
+        if verbose:
+            with open(record_path) as f:
+                print(f"📼Recorded {sum(1 for _ in f)} entries to {record_path}")
+            print(f"Replay preview: {replayed[:150]}...")
+        return len(recorded) > 0 and replayed == recorded
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
+async def test_batch(architecture: str = "One EC2 t3.micro instance running 8 hours per day", verbose: bool=True) -> bool:
+    """Run a batch file with one malformed line; it fails on its own and the other items are estimated."""
+    import json
+    import os
+    import tempfile
+    from cost_estimator_agent.batch import run_batch
+    from cost_estimator_agent.config import QUICK_OPTION
+
+    if verbose:
+        print('📦Testing batch estimation with a malformed line')
+    directory = tempfile.mkdtemp()
+    input_path = os.path.join(directory, "architectures.jsonl")
+    output_path = os.path.join(directory, "results.jsonl")
+    with open(input_path, "w") as f:
+        f.write(json.dumps(f"{architecture} {QUICK_OPTION}") + "\n")
+        f.write('{"architecture": "One EC2 t3.micro\n')
+        f.write(json.dumps({"id": "second", "architecture": f"{architecture} {QUICK_OPTION}"}) + "\n")
+
+    try:
+        summary = await run_batch(input_path, output_path, "us-east-1", 2)
+        with open(output_path) as f:
+            results = {result["id"]: result for result in map(json.loads, f)}
+        if verbose:
+            print(f"📊Batch summary: {summary}")
+            print(f"Malformed line result: {results.get(2, {}).get('result')}")
+        return (
+            summary == {"success": 2, "error": 1}
+            and results[2]["status"] == "error"
+            and results[2]["line"] == 2
+        )
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
+async def test_cached_prefix(verbose: bool=True) -> bool:
+    """GeminiModel against a stub client: the static prefix is cached once and referenced afterwards."""
+    from types import SimpleNamespace
+    from google.genai import types
+    from models.gemini import GeminiModel
+
+    if verbose:
+        print('🗃️Testing Gemini cached prefix with a stub client')
+
+    requests = []
+    created = []
+    failures = []
+
+    async def create(model, config):
+        if failures:
+            raise failures.pop()
+        created.append(config)
+        return types.CachedContent(name=f"cachedContents/stub-{len(created)}", model=model)
+
+    async def generate_content_stream(model, contents, config):
+        requests.append({'contents': contents, 'config': config})
+
+        async def chunks():
+            yield types.GenerateContentResponse(
+                candidates=[types.Candidate(
+                    content=types.Content(role='model', parts=[types.Part(text='ok')]),
+                    finish_reason='STOP'
+                )],
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=1, candidates_token_count=1, total_token_count=2
+                ),
+            )
+        return chunks()
+
+    client = SimpleNamespace(aio=SimpleNamespace(
+        caches=SimpleNamespace(create=create),
+        models=SimpleNamespace(generate_content_stream=generate_content_stream),
+    ))
+    # a system prompt of its own keeps this test independent of prefixes cached by other models
+    system_prompt = f"stub system prompt {id(client)}"
+    model = GeminiModel(client=client, model_id='stub-model', cache_prefix=True)
+    tool_specs = [{'name': 'echo', 'description': 'Echo', 'inputSchema': {'json': {'type': 'object', 'properties': {}}}}]
+    messages = [{'role': 'user', 'content': [{'text': 'hello'}]}]
+
+    try:
+        for _ in range(2):
+            events = [event async for event in model.stream(messages, tool_specs, system_prompt)]
+            messages = messages + [{'role': 'assistant', 'content': [{'text': 'ok'}]}, {'role': 'user', 'content': [{'text': 'again'}]}]
+
+        passed = (
+            len(created) == 1
+            and all(request['config'].get('cached_content') == 'cachedContents/stub-1' for request in requests)
+            and not any('system_instruction' in request['config'] or 'tools' in request['config'] for request in requests)
+            and len(requests[1]['contents']) == 3
+            and requests[0]['contents'][0] is requests[1]['contents'][0]
+            and any('metadata' in event for event in events)
+        )
+
+        # a prefix that failed for another reason than its size is created again once the retry time passed
+        failures.append(ConnectionError("stub outage"))
+        retried_prompt = f"{system_prompt} retried"
+        failed = await model.cached_prefix(tool_specs, retried_prompt)
+        GeminiModel._prefix_caches[model._prefix_key(tool_specs, retried_prompt)] = (None, 0.0)
+        retried = await model.cached_prefix(tool_specs, retried_prompt)
+        passed = passed and failed is None and retried == 'cachedContents/stub-2'
+        if verbose:
+            print(f"📊Caches created: {len(created)}, requests: {len(requests)}")
+        return passed
+    except Exception as e:
+        if verbose:
+            print(f"✖️ Test failed: {e}")
+        return False
+
 def parse_argument():
     parser = argparse.ArgumentParser(description="Sample Agent: Calculate AWS Cost")
 
@@ -31,11 +317,25 @@ def parse_argument():
     parser.add_argument(
         '--tests',
         nargs='+',
-        choices=['regular', 'streaming', 'debug'],
+        choices=['regular', 'async', 'streaming', 'regions', 'reestimate', 'planner', 'calculation_session', 'record_replay', 'batch', 'cached_prefix', 'debug'],
         default=['regular'],
         help='Which tests to run (default: regular)'
     )
     
+    parser.add_argument(
+        '--regions',
+        nargs='+',
+        default=['us-east-1', 'eu-west-1'],
+        help='Regions to compare in the regions test (default: us-east-1 eu-west-1)'
+    )
+
+    parser.add_argument(
+        '--edited-architecture',
+        type=str,
+        default="Two EC2 t3.micro instances running 8 hours per day and 100 GB of S3",
+        help='Edited architecture of the reestimate test'
+    )
+
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -66,9 +366,33 @@ async def main() -> None:
     if 'regular' in args.tests:
         results['regular'] = test_regular(args.architecture, verbose)
     
+    if 'async' in args.tests:
+        results['async'] = await test_async(args.architecture, verbose)
+
     if 'streaming' in args.tests:
         results['streaming'] = await test_streaming(args.architecture, verbose)
 
+    if 'regions' in args.tests:
+        results['regions'] = await test_regions(args.architecture, args.regions, verbose)
+
+    if 'reestimate' in args.tests:
+        results['reestimate'] = await test_reestimate(args.architecture, args.edited_architecture, verbose)
+
+    if 'planner' in args.tests:
+        results['planner'] = test_planner(args.architecture, verbose)
+
+    if 'calculation_session' in args.tests:
+        results['calculation_session'] = test_calculation_session(verbose)
+
+    if 'record_replay' in args.tests:
+        results['record_replay'] = test_record_replay(args.architecture, verbose)
+
+    if 'batch' in args.tests:
+        results['batch'] = await test_batch(args.architecture, verbose)
+
+    if 'cached_prefix' in args.tests:
+        results['cached_prefix'] = await test_cached_prefix(verbose)
+
     if verbose:
         print("\n📈 Test Results:")
         for name, result in results.items():